@@ -0,0 +1,120 @@
+"""
+主從資料庫分流：班表、員工班表與匯出等讀取量大的 GET（READ_REPLICA_VIEWS）改讀唯讀副本，
+其餘 request 與所有寫入一律使用主資料庫，尖峰時段主資料庫留給寫入。
+
+使用者送出寫入後 DB_REPLICA_STICKY_SECONDS 秒內仍讀主資料庫（記在 session），
+避免新增班別後重新載入班表時，因副本複寫延遲而看不到剛才的變更。
+
+本機可用兩個 SQLite 檔模擬主資料庫與副本：
+
+    DATABASES = {
+        "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": "primary.sqlite3"},
+        "replica": {"ENGINE": "django.db.backends.sqlite3", "NAME": "replica.sqlite3"},
+    }
+
+    python manage.py migrate && python manage.py migrate --database replica
+
+兩個檔案不會互相同步，在其中一邊放入不同資料即可看出每個 request 讀的是哪一個。
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import Resolver404, resolve
+
+REPLICA_ALIAS = "replica"
+SESSION_KEY = "_db_primary_until"
+
+# 登入狀態與 session 不能有複寫延遲，一律讀主資料庫
+PRIMARY_ONLY_APPS = {"auth", "sessions", "contenttypes", "admin"}
+
+# 目前 request 的讀取資料庫；sync_to_async 會複製 context，async view 在執行緒中的查詢也適用
+_read_alias = contextvars.ContextVar("db_read_alias", default=None)
+
+
+@contextmanager
+def use_primary():
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        # 交易中的讀取（例如 select_for_update）必須與寫入走同一條連線
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # 從副本讀出的物件 save() 時也要寫回主資料庫
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA_ALIAS}
+
+
+class ReadReplicaMiddleware:
+    """需放在 SessionMiddleware 之後；未設定 replica 時不載入。"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if REPLICA_ALIAS not in settings.DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.views = set(settings.READ_REPLICA_VIEWS)
+        self.sticky_seconds = settings.DB_REPLICA_STICKY_SECONDS
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        alias = REPLICA_ALIAS if self.is_read_view(request) and not self.pinned(request) else None
+        token = _read_alias.set(alias)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        self.mark_write(request)
+        return response
+
+    async def __acall__(self, request):
+        use_replica = self.is_read_view(request) and not await sync_to_async(self.pinned)(request)
+        token = _read_alias.set(REPLICA_ALIAS if use_replica else None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        self.mark_write(request)
+        return response
+
+    def is_read_view(self, request):
+        if request.method not in ("GET", "HEAD"):
+            return False
+        try:
+            return resolve(request.path_info).view_name in self.views
+        except Resolver404:
+            return False
+
+    def pinned(self, request):
+        return request.session.get(SESSION_KEY, 0) > time.time()
+
+    def mark_write(self, request):
+        if request.method in ("GET", "HEAD", "OPTIONS"):
+            return
+        # 未登入或剛登出的 session 是空的，不為此多建一筆 session
+        if request.session.is_empty():
+            return
+        request.session[SESSION_KEY] = time.time() + self.sticky_seconds
@@ -0,0 +1,172 @@
+import contextvars
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends import django as django_backend
+from django.utils.functional import SimpleLazyObject, empty
+
+from .metrics import observe_request
+
+logger = logging.getLogger(__name__)
+
+# 目前 request 的統計；sync_to_async 會複製 context，async view 在執行緒中跑的查詢與樣板也會記到同一筆
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    __slots__ = ("queries", "sql_ms", "render_ms")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.render_ms = 0.0
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.sql_ms += (time.perf_counter() - started) * 1000
+
+
+def _install_query_recorder(sender, connection, **kwargs):
+    # CONN_MAX_AGE=0 時每個 request 都會重新連線，同一個 wrapper 只裝一次
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(_install_query_recorder, dispatch_uid="core.instrumentation.query_recorder")
+
+
+class TimedTemplate(django_backend.Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.render_ms += (time.perf_counter() - started) * 1000
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """與內建 backend 相同，另外記錄最外層樣板的 render 時間（include 的子樣板算在其中）。"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+def _can_view_timing(request):
+    if settings.DEBUG:
+        return True
+    # view 沒用到 request.user 時不為了這個 header 去查 session
+    user = getattr(request, "user", None)
+    if user is None or (isinstance(user, SimpleLazyObject) and user._wrapped is empty):
+        return False
+    if not user.is_authenticated:
+        return False
+    if user.is_staff:
+        return True
+    # 只看 view 已經載入的 userprofile，不為了這個 header 每個 request 多查一次
+    profile = user._state.fields_cache.get("userprofile")
+    return bool(profile and profile.is_manager())
+
+
+class RequestMetricsMiddleware:
+    """
+    記錄每個 request 的 view 名稱、總耗時、SQL 次數與時間、樣板 render 時間與回應大小，
+    並累計到 core.metrics（METRICS_ENABLED 時）。
+    依 REQUEST_METRICS_SAMPLE_RATE 抽樣；抽中的 request 寫一行 key=value log。
+    有收集統計的 request（METRICS_ENABLED 或抽中），主管（view 已載入 userprofile 時）、
+    staff 或 DEBUG 在回應加上 Server-Timing header，可在瀏覽器開發者工具查看，與 log 抽樣無關。
+    未抽中但超過 REQUEST_METRICS_SLOW_MS 的 request 仍會記錄總耗時。
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        self.slow_ms = settings.REQUEST_METRICS_SLOW_MS
+        self.collect_all = settings.METRICS_ENABLED
+        # 載入 middleware 前已建立的連線不會再觸發 connection_created
+        for connection in connections.all(initialized_only=True):
+            _install_query_recorder(None, connection)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started, metrics, sampled, token = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                _current.reset(token)
+        show_timing = metrics is not None and _can_view_timing(request)
+        self.finish(request, response, started, metrics, sampled, show_timing)
+        return response
+
+    async def __acall__(self, request):
+        started, metrics, sampled, token = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                _current.reset(token)
+        show_timing = metrics is not None and _can_view_timing(request)
+        self.finish(request, response, started, metrics, sampled, show_timing)
+        return response
+
+    def start(self):
+        started = time.perf_counter()
+        sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
+        if not (sampled or self.collect_all):
+            return started, None, False, None
+        metrics = RequestMetrics()
+        return started, metrics, sampled, _current.set(metrics)
+
+    def finish(self, request, response, started, metrics, sampled, show_timing):
+        total_ms = (time.perf_counter() - started) * 1000
+        match = getattr(request, "resolver_match", None)
+        view_name = match.view_name if match else "-"
+        if metrics is not None and self.collect_all:
+            observe_request(view_name, request.method, response.status_code, total_ms, metrics)
+        if show_timing:
+            response["Server-Timing"] = (
+                f'db;dur={metrics.sql_ms:.1f};desc="{metrics.queries} queries", '
+                f"render;dur={metrics.render_ms:.1f}, total;dur={total_ms:.1f}"
+            )
+        if not sampled and total_ms < self.slow_ms:
+            return
+        if response.streaming:
+            size = response.get("Content-Length", "-")
+        else:
+            size = len(response.content)
+        if not sampled:
+            logger.info(
+                "request view=%s method=%s status=%s total_ms=%.1f bytes=%s sampled=0",
+                view_name, request.method, response.status_code, total_ms, size,
+            )
+            return
+        logger.info(
+            "request view=%s method=%s status=%s total_ms=%.1f sql_count=%d sql_ms=%.1f render_ms=%.1f bytes=%s",
+            view_name, request.method, response.status_code, total_ms,
+            metrics.queries, metrics.sql_ms, metrics.render_ms, size,
+        )
@@ -0,0 +1,250 @@
+"""
+跨 gunicorn worker 的統計數據。
+
+每個 process 把自己的數值寫在 METRICS_DIR 下一個 mmap 檔（metrics_<pid>.db），
+/metrics/ 讀取目錄中所有檔案後加總，不論由哪個 worker 回應都能看到整體數字。
+counter 與 histogram 跨 process 加總（已結束的 worker 仍計入）；
+gauge 只列出仍在執行的 process，並加上 pid label。
+"""
+import json
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 名稱 -> (類型, 說明)
+METRICS = {
+    "http_requests_total": ("counter", "request 數（依 URL 名稱、method 與狀態碼）"),
+    "http_request_duration_seconds": ("histogram", "request 總耗時"),
+    "db_queries_total": ("counter", "SQL 查詢次數"),
+    "db_query_duration_seconds_total": ("counter", "SQL 查詢累計秒數"),
+    "template_render_seconds_total": ("counter", "樣板 render 累計秒數"),
+    "cache_requests_total": ("counter", "process 內快取查詢次數（result=hit/miss）"),
+    "worker_info": ("gauge", "執行中的 worker process"),
+    "worker_start_time_seconds": ("gauge", "worker 啟動時間（Unix 秒）"),
+    "worker_requests": ("gauge", "worker 啟動後處理的 request 數"),
+}
+
+_HEADER = struct.Struct("<I4x")
+_KEY_LENGTH = struct.Struct("<I")
+_VALUE = struct.Struct("<d")
+_INITIAL_SIZE = 64 * 1024
+
+
+def metrics_dir():
+    return settings.METRICS_DIR
+
+
+def reset_metrics_dir():
+    """master 啟動時呼叫，清除上一次執行留下的檔案。"""
+    path = metrics_dir()
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def _padded(length):
+    return (length + 7) // 8 * 8
+
+
+class _ProcessFile:
+    """單一 process 專用的 key -> float 對照，只有擁有者寫入。"""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = os.open(path, os.O_CREAT | os.O_RDWR | os.O_TRUNC, 0o644)
+        self._capacity = _INITIAL_SIZE
+        os.ftruncate(self._fd, self._capacity)
+        self._mm = mmap.mmap(self._fd, self._capacity)
+        self._used = _HEADER.size
+        _HEADER.pack_into(self._mm, 0, self._used)
+        self._positions = {}
+
+    def _position(self, key):
+        position = self._positions.get(key)
+        if position is None:
+            encoded = key.encode("utf-8")
+            key_size = _padded(_KEY_LENGTH.size + len(encoded))
+            entry_size = key_size + _VALUE.size
+            while self._used + entry_size > self._capacity:
+                self._grow()
+            start = self._used
+            _KEY_LENGTH.pack_into(self._mm, start, len(encoded))
+            self._mm[start + _KEY_LENGTH.size:start + _KEY_LENGTH.size + len(encoded)] = encoded
+            position = start + key_size
+            _VALUE.pack_into(self._mm, position, 0.0)
+            # 整筆寫完才更新長度，讀取端不會看到寫到一半的資料
+            self._used += entry_size
+            _HEADER.pack_into(self._mm, 0, self._used)
+            self._positions[key] = position
+        return position
+
+    def _grow(self):
+        self._capacity *= 2
+        os.ftruncate(self._fd, self._capacity)
+        self._mm.close()
+        self._mm = mmap.mmap(self._fd, self._capacity)
+
+    def inc(self, key, amount):
+        position = self._position(key)
+        _VALUE.pack_into(self._mm, position, _VALUE.unpack_from(self._mm, position)[0] + amount)
+
+    def set(self, key, value):
+        _VALUE.pack_into(self._mm, self._position(key), value)
+
+
+def _read_file(path):
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if len(data) < _HEADER.size:
+        return
+    used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+    offset = _HEADER.size
+    while offset < used:
+        (length,) = _KEY_LENGTH.unpack_from(data, offset)
+        key = data[offset + _KEY_LENGTH.size:offset + _KEY_LENGTH.size + length].decode("utf-8")
+        offset += _padded(_KEY_LENGTH.size + length)
+        yield key, _VALUE.unpack_from(data, offset)[0]
+        offset += _VALUE.size
+
+
+_lock = threading.Lock()
+_file = None
+_file_pid = None
+
+
+def _process_file():
+    global _file, _file_pid
+    pid = os.getpid()
+    if _file_pid != pid:
+        # preload 模式下 master 與 worker 共用模組狀態，fork 後各自開新檔
+        os.makedirs(metrics_dir(), exist_ok=True)
+        _file = _ProcessFile(os.path.join(metrics_dir(), f"metrics_{pid}.db"))
+        _file_pid = pid
+        _file.set(_key("worker_info", {"mode": settings.SERVER_MODE}), 1)
+        _file.set(_key("worker_start_time_seconds", {}), time.time())
+    return _file
+
+
+def _key(name, labels):
+    return json.dumps([name, sorted(labels.items())], ensure_ascii=False)
+
+
+def inc(name, amount=1, **labels):
+    if not settings.METRICS_ENABLED:
+        return
+    with _lock:
+        _process_file().inc(_key(name, labels), amount)
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    if not settings.METRICS_ENABLED:
+        return
+    with _lock:
+        values = _process_file()
+        for bound in buckets:
+            if value <= bound:
+                values.inc(_key(f"{name}_bucket", {**labels, "le": repr(bound)}), 1)
+        values.inc(_key(f"{name}_bucket", {**labels, "le": "+Inf"}), 1)
+        values.inc(_key(f"{name}_sum", labels), value)
+        values.inc(_key(f"{name}_count", labels), 1)
+
+
+def observe_request(view, method, status, total_ms, metrics):
+    if not settings.METRICS_ENABLED:
+        return
+    labels = {"view": view}
+    inc("http_requests_total", view=view, method=method, status=str(status))
+    observe("http_request_duration_seconds", total_ms / 1000, **labels)
+    inc("db_queries_total", metrics.queries, **labels)
+    inc("db_query_duration_seconds_total", metrics.sql_ms / 1000, **labels)
+    inc("template_render_seconds_total", metrics.render_ms / 1000, **labels)
+    inc("worker_requests")
+
+
+def _base_name(name):
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix) and name[: -len(suffix)] in METRICS:
+            return name[: -len(suffix)]
+    return name
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """讀取所有 process 的檔案，回傳 {(name, labels): value}。"""
+    samples = {}
+    path = metrics_dir()
+    try:
+        names = sorted(os.listdir(path))
+    except FileNotFoundError:
+        return samples
+    for file_name in names:
+        if not (file_name.startswith("metrics_") and file_name.endswith(".db")):
+            continue
+        pid = int(file_name[len("metrics_"):-len(".db")])
+        alive = None
+        for key, value in _read_file(os.path.join(path, file_name)):
+            name, labels = json.loads(key)
+            kind = METRICS.get(_base_name(name), ("counter",))[0]
+            if kind == "gauge":
+                if alive is None:
+                    alive = _is_alive(pid)
+                if not alive:
+                    continue
+                labels = labels + [["pid", str(pid)]]
+            sample = (name, tuple(sorted(tuple(item) for item in labels)))
+            samples[sample] = samples.get(sample, 0) + value
+    return samples
+
+
+def _format_value(value):
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_text(extra=()):
+    """Prometheus text exposition format (0.0.4)。extra 為 (名稱, 類型, 說明, labels, 值) 的額外樣本。"""
+    types = dict(METRICS)
+    grouped = {}
+    for (name, labels), value in collect().items():
+        grouped.setdefault(_base_name(name), []).append((name, labels, value))
+    for name, kind, help_text, labels, value in extra:
+        types[name] = (kind, help_text)
+        grouped.setdefault(name, []).append((name, tuple(sorted(labels.items())), value))
+
+    lines = []
+    for base in sorted(grouped):
+        kind, help_text = types.get(base, ("untyped", ""))
+        lines.append(f"# HELP {base} {help_text}")
+        lines.append(f"# TYPE {base} {kind}")
+        for name, labels, value in sorted(grouped[base], key=_sample_order):
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels)
+            lines.append(f"{name}{{{label_text}}} {_format_value(value)}" if label_text else f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _sample_order(sample):
+    name, labels, _ = sample
+    other = tuple(item for item in labels if item[0] != "le")
+    le = dict(labels).get("le")
+    bound = float("inf") if le in (None, "+Inf") else float(le)
+    return other, name, bound
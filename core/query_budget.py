@@ -0,0 +1,256 @@
+"""
+測試用的查詢預算工具。
+
+QueryBudgetTestCase 以每個角色呼叫 urls 模組中的每個網址，先在基本資料下執行一次，
+再加入更多員工、班表與文件後重跑；查詢數隨資料量增加（N+1）或超過預算都會失敗，
+訊息中列出重複的 SQL 與發出查詢的程式位置。
+"""
+import copy
+import re
+import traceback
+from collections import Counter
+from datetime import time, timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.utils.timezone import localdate
+
+from scheduling import cache
+from scheduling.models import SchedulingWindow, Shift, Store, WorkAvailability
+from users.models import SORT_ORDER_GAP, UserProfile, WorkerDocument
+
+TEST_PASSWORD = "budget-pass-123"
+_IN_LIST = re.compile(r"\((?:%s, )+%s\)")
+
+
+def normalize_sql(sql):
+    return _IN_LIST.sub("(...)", " ".join(sql.split()))
+
+
+def _caller_stack():
+    frames = []
+    base_dir = str(settings.BASE_DIR)
+    for frame in traceback.extract_stack()[:-2]:
+        if frame.filename.startswith(base_dir) and not frame.filename.endswith(("query_budget.py", "tests.py")):
+            frames.append(f"    {frame.filename[len(base_dir) + 1:]}:{frame.lineno} in {frame.name}\n      {frame.line}")
+    return "\n".join(frames[-6:])
+
+
+class QueryLog:
+    """記錄 with 區塊內的 SQL 與呼叫位置。async view 的 ORM 呼叫會回到目前執行緒執行，同樣會被記錄。"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((normalize_sql(sql), _caller_stack()))
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def counts(self):
+        return Counter(sql for sql, _ in self.queries)
+
+    def report(self, baseline=None):
+        counts = self.counts()
+        before = baseline.counts() if baseline else Counter()
+        lines = []
+        for sql, count in counts.most_common():
+            grew = count > before.get(sql, 0) and baseline is not None
+            marker = " <- 隨資料量增加" if grew else ""
+            lines.append(f"  {count}x {sql[:300]}{marker}")
+            if grew or (baseline is None and count > 1):
+                stack = next(stack for query, stack in self.queries if query == sql)
+                lines.append(stack or "    (無專案程式碼堆疊)")
+        return "\n".join(lines)
+
+
+def create_profiles(count, role="worker", prefix="budget", store=None):
+    """以 bulk_create 建立帳號與 UserProfile，所有帳號使用同一個密碼雜湊。"""
+    start = User.objects.count()
+    usernames = [f"{prefix}{start + index:05d}" for index in range(count)]
+    password = make_password(TEST_PASSWORD)
+    User.objects.bulk_create([User(username=name, password=password) for name in usernames])
+    users = User.objects.filter(username__in=usernames).order_by("id")
+    last = UserProfile.objects.order_by("-sort_order").values_list("sort_order", flat=True).first() or 0
+    profiles = [
+        UserProfile(
+            user=user,
+            role=role,
+            name=f"員工{user.username[-5:]}",
+            real_name=f"王{user.username[-5:]}",
+            mobile_phone=f"09{user.id:08d}",
+            primary_store=store,
+            sort_order=last + (index + 1) * SORT_ORDER_GAP,
+        )
+        for index, user in enumerate(users)
+    ]
+    UserProfile.objects.bulk_create(profiles)
+    return list(UserProfile.objects.filter(user__username__in=usernames).select_related("user").order_by("id"))
+
+
+def add_schedule_rows(profiles, stores, days, shifts_per_day=1, with_documents=True):
+    """替每位員工在 days 的每一天加上班表與可上班時段，並各加一份文件。"""
+    shifts = []
+    availabilities = []
+    documents = []
+    for index, profile in enumerate(profiles):
+        for day in days:
+            for slot in range(shifts_per_day):
+                hour = 9 + slot * 4
+                shifts.append(Shift(
+                    employee=profile,
+                    store=stores[(index + slot) % len(stores)] if stores else None,
+                    date=day,
+                    start_time=time(hour),
+                    end_time=time(hour + 3),
+                    is_published=True,
+                ))
+            availabilities.append(WorkAvailability(employee=profile, date=day, start_time=time(18), end_time=time(22)))
+        if with_documents:
+            documents.append(WorkerDocument(
+                profile=profile,
+                category="bankbook",
+                file=f"worker_documents/budget/{profile.id}.pdf",
+                original_name="bankbook.pdf",
+                file_size=1024,
+            ))
+    Shift.objects.bulk_create(shifts)
+    WorkAvailability.objects.bulk_create(availabilities)
+    WorkerDocument.objects.bulk_create(documents)
+
+
+def add_documents(profiles, categories):
+    WorkerDocument.objects.bulk_create([
+        WorkerDocument(
+            profile=profile,
+            category=category,
+            file=f"worker_documents/budget/{profile.id}-{category}.png",
+            original_name=f"{category}.png",
+            file_size=1024,
+        )
+        for profile in profiles
+        for category in categories
+    ])
+
+
+def week_days(anchor=None):
+    anchor = anchor or localdate()
+    start = anchor - timedelta(days=anchor.weekday())
+    return [start + timedelta(days=offset) for offset in range(7)]
+
+
+# 登入與改密碼會反覆驗證密碼，改用快速的雜湊
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class QueryBudgetTestCase(TestCase):
+    """
+    子類別設定 url_module 與 budgets（網址名稱 -> 查詢上限），並為每個網址實作
+    request_<網址名稱>(role)，回傳 dict(method=..., path=..., data=..., content_type=..., headers=...)。
+    request_ 方法內可以先建立需要的資料，這部分不計入查詢數；每次請求結束後資料都會 rollback。
+    budgets 的 key 也可以寫成 "<網址名稱>:<變化>"，此時呼叫 request_<網址名稱>(role, variant)。
+    """
+
+    url_module = None
+    budgets = {}
+    roles = ("anonymous", "worker", "supervisor", "manager")
+    base_workers = 3
+    grow_workers = 12
+
+    @classmethod
+    def setUpTestData(cls):
+        today = localdate()
+        cls.stores = [Store.objects.create(name=f"店{index}", color="#cfe8ff") for index in range(2)]
+        cls.days = week_days(today)
+        SchedulingWindow.objects.create(
+            start_date=cls.days[0],
+            end_date=cls.days[0] + timedelta(days=27),
+            allow_worker_view=True,
+            allow_worker_edit_shifts=True,
+            allow_worker_register=True,
+        )
+        cls.manager = create_profiles(1, role="manager", prefix="mgr")[0]
+        cls.supervisor = create_profiles(1, role="supervisor", prefix="sup")[0]
+        cls.worker = create_profiles(1, role="worker", prefix="me", store=cls.stores[0])[0]
+        cls.others = create_profiles(cls.base_workers, store=cls.stores[1])
+        add_schedule_rows([cls.worker, cls.supervisor, *cls.others], cls.stores, cls.days)
+        # 各類文件都先有一份，上傳時兩次執行都會走「取代舊文件」的路徑
+        add_documents([cls.worker, cls.supervisor], ("id_card_front", "id_card_back", "driver_license"))
+        cls.profiles = {"worker": cls.worker, "supervisor": cls.supervisor, "manager": cls.manager}
+        cache.forget_uncommitted()
+
+    def grow(self):
+        """加入更多資料；不受資料量影響的頁面查詢數應維持不變。"""
+        stores = [*self.stores, Store.objects.create(name="擴充店", color="#ffe0e0")]
+        extra = create_profiles(self.grow_workers, prefix="grow", store=stores[0])
+        add_schedule_rows(extra, stores, self.days, shifts_per_day=2)
+        later = [day + timedelta(days=7) for day in self.days]
+        add_schedule_rows([self.worker, self.supervisor], stores, later, with_documents=False)
+        add_documents(extra, ("id_card_front", "driver_license"))
+
+    def client_for(self, role):
+        client = Client()
+        if role != "anonymous":
+            client.force_login(self.profiles[role].user)
+        return client
+
+    def build_request(self, key, role):
+        url_name, _, variant = key.partition(":")
+        builder = getattr(self, f"request_{url_name}")
+        return builder(role, variant) if variant else builder(role)
+
+    def perform(self, client, key, role):
+        with transaction.atomic():
+            spec = self.build_request(key, role)
+            cookies = copy.deepcopy(client.cookies)
+            method = getattr(client, spec.get("method", "get"))
+            kwargs = {"data": spec.get("data"), "headers": spec.get("headers")}
+            if spec.get("content_type"):
+                kwargs["content_type"] = spec["content_type"]
+            with QueryLog() as log:
+                response = method(spec["path"], **kwargs)
+            # 登出、改密碼等會改變 session cookie，還原後下一次請求仍以相同身分進行
+            client.cookies = cookies
+            transaction.set_rollback(True)
+        return response, log
+
+    def assertQueryBudget(self, key, role):
+        budget = self.budgets[key]
+        client = self.client_for(role)
+        self.perform(client, key, role)  # 預熱 process 內快取（假日表、ContentType 等）
+        response, small = self.perform(client, key, role)
+        self.assertLess(response.status_code, 500, f"{key} as {role}")
+        with transaction.atomic():
+            self.grow()
+            _, large = self.perform(client, key, role)
+            transaction.set_rollback(True)
+        if len(large) > len(small):
+            self.fail(
+                f"{key} as {role}: 資料增加後查詢數 {len(small)} -> {len(large)}（疑似 N+1）\n"
+                + large.report(baseline=small)
+            )
+        if len(small) > budget:
+            self.fail(f"{key} as {role}: {len(small)} 次查詢，超過預算 {budget}\n" + small.report())
+
+    def test_every_url_has_budget(self):
+        names = {pattern.name for pattern in import_module(self.url_module).urlpatterns}
+        covered = {key.partition(":")[0] for key in self.budgets}
+        self.assertEqual(names - covered, set(), "以下網址沒有設定查詢預算")
+
+    def test_query_budgets(self):
+        for key in self.budgets:
+            for role in self.roles:
+                with self.subTest(url=key, role=role):
+                    self.assertQueryBudget(key, role)
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 import os
+import sys
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -54,8 +56,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.db_router.ReadReplicaMiddleware',
+    'scheduling.cache.CacheGenerationMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -67,7 +72,8 @@ ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # 內建 DjangoTemplates 加上 render 時間統計（見 core.instrumentation）
+        'BACKEND': 'core.instrumentation.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -84,6 +90,48 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'core.wsgi.application'
 
+# 每個 request 的效能紀錄：抽樣比例 (0~1) 與未抽中時仍記錄的慢 request 門檻 (ms)；
+# 預設不抽樣，只記錄慢 request，需要時再調高比例
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv("DJANGO_REQUEST_METRICS_SAMPLE_RATE", "0"))
+REQUEST_METRICS_SLOW_MS = float(os.getenv("DJANGO_REQUEST_METRICS_SLOW_MS", "1000"))
+
+# 跨 worker 的統計（core.metrics）：各 process 的 mmap 檔放在 METRICS_DIR，
+# /metrics/ 需帶 Authorization: Bearer <METRICS_TOKEN>；未設定 token 時只接受本機連線
+METRICS_ENABLED = _env_bool("DJANGO_METRICS_ENABLED", True)
+METRICS_DIR = os.getenv("DJANGO_METRICS_DIR", os.path.join(tempfile.gettempdir(), "scheduling_erp_metrics"))
+METRICS_TOKEN = os.getenv("DJANGO_METRICS_TOKEN", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "plain": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "plain"},
+    },
+    "loggers": {
+        "core.instrumentation": {
+            "handlers": ["console"],
+            "level": os.getenv("DJANGO_REQUEST_METRICS_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+ASGI_APPLICATION = 'core.asgi.application'
+
+# wsgi：gunicorn sync worker；asgi：gunicorn + uvicorn worker（見 gunicorn.conf.py）
+SERVER_MODE = os.getenv("DJANGO_SERVER_MODE", "wsgi")
+
+# 班表頁面即時更新（scheduling:changes）：ASGI 模式以 long-poll 最多等待的秒數；
+# WSGI 模式不等待以免佔住 sync worker，頁面每 SCHEDULE_CHANGES_POLL_MS 毫秒詢問一次
+SCHEDULE_CHANGES_WAIT_SECONDS = int(os.getenv(
+    "DJANGO_SCHEDULE_CHANGES_WAIT_SECONDS", "20" if SERVER_MODE == "asgi" else "0"
+))
+SCHEDULE_CHANGES_POLL_MS = int(os.getenv("DJANGO_SCHEDULE_CHANGES_POLL_MS", "5000"))
+# 班別異動紀錄保留天數，較舊的由 prune_schedule_changes 刪除；復原與差異比對只能用到這段期間內的紀錄
+SCHEDULE_CHANGES_RETENTION_DAYS = int(os.getenv("DJANGO_SCHEDULE_CHANGES_RETENTION_DAYS", "90"))
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -96,12 +144,38 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD', 'staging_pw'),
         'HOST': os.getenv('DB_HOST', '35.221.202.58'),
         'PORT': os.getenv('DB_PORT', '3307'),
+        # 每個 gunicorn worker（執行緒）保留一條連線跨 request 重複使用，
+        # 超過 CONN_MAX_AGE 秒後重建；取用前先檢查連線，失效時自動重新連線
+        # ASGI 模式下每個 request 可能在不同執行緒執行，保留的連線無法重複使用，預設不保留
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '0' if SERVER_MODE == 'asgi' else '300')),
+        'CONN_HEALTH_CHECKS': _env_bool('DB_CONN_HEALTH_CHECKS', True),
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5')),
+            'read_timeout': int(os.getenv('DB_READ_TIMEOUT', '30')),
+            'write_timeout': int(os.getenv('DB_WRITE_TIMEOUT', '30')),
         }
     }
 }
 
+# 唯讀副本：設定 DB_REPLICA_HOST 後，READ_REPLICA_VIEWS 的 GET 改讀副本（見 core.db_router），
+# 帳號、密碼與其他設定未指定時沿用主資料庫；寫入後 DB_REPLICA_STICKY_SECONDS 秒內仍讀主資料庫
+if os.getenv('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.getenv('DB_REPLICA_HOST'),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        # 測試時與主資料庫共用同一個測試資料庫
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+READ_REPLICA_VIEWS = ['scheduling:timeline', 'scheduling:worker_schedule', 'scheduling:export_excel']
+DB_REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', '10'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -129,9 +203,37 @@ USE_TZ = True # 啟用時區支持
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic 產生帶雜湊的檔名並預先壓縮 (.gz/.br)，nginx 以 immutable 長期快取提供；
+# 開發與跑測試時沒有先 collectstatic，沒有 manifest 可查，改用一般的 storage
+TESTING = sys.argv[1:2] == ["test"]
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": (
+            "django.contrib.staticfiles.storage.StaticFilesStorage"
+            if DEBUG or TESTING
+            else "core.storage.CompressedManifestStaticFilesStorage"
+        ),
+    },
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# 員工證件只經由 users:worker_document 檢查權限後提供；
+# 設定前綴時改由 nginx 的 internal location 傳檔 (X-Accel-Redirect)
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("DJANGO_MEDIA_ACCEL_PREFIX", "" if DEBUG else "/protected-media/")
+MEDIA_DOCUMENT_MAX_AGE = int(os.getenv("DJANGO_MEDIA_DOCUMENT_MAX_AGE", "3600"))
+
+# 證件分段上傳（可續傳）：暫存目錄、建議區塊大小、單一區塊上限與未完成上傳的保留秒數
+CHUNKED_UPLOAD_ROOT = Path(os.getenv("DJANGO_CHUNKED_UPLOAD_ROOT", str(MEDIA_ROOT / "chunked_uploads")))
+CHUNKED_UPLOAD_CHUNK_SIZE = int(os.getenv("DJANGO_CHUNKED_UPLOAD_CHUNK_SIZE", str(512 * 1024)))
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 2 * 1024 * 1024
+CHUNKED_UPLOAD_EXPIRE_SECONDS = int(os.getenv("DJANGO_CHUNKED_UPLOAD_EXPIRE_SECONDS", str(24 * 3600)))
+
+# process_worker_imports 計算密碼雜湊的 process 數（0 代表使用全部 CPU）
+WORKER_IMPORT_HASH_WORKERS = int(os.getenv("DJANGO_WORKER_IMPORT_HASH_WORKERS", "0")) or None
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
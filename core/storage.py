@@ -0,0 +1,45 @@
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    collectstatic 時產生帶內容雜湊的檔名，並預先壓縮成 .gz / .br，
+    讓 nginx 以 gzip_static / brotli_static 直接送出，不必每次請求即時壓縮。
+    """
+
+    compress_extensions = (".css", ".js", ".json", ".svg", ".txt", ".map", ".xml")
+    compress_min_size = 256
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(hashed_names):
+            if name.endswith(self.compress_extensions) and self.exists(name):
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, "rb") as fh:
+            data = fh.read()
+        if len(data) < self.compress_min_size:
+            return
+        variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append((".br", brotli.compress(data, mode=brotli.MODE_TEXT)))
+        for suffix, compressed in variants:
+            # 壓縮後沒有明顯變小就不保留，nginx 會改送原檔
+            if len(compressed) < len(data) * 0.95:
+                with open(path + suffix, "wb") as fh:
+                    fh.write(compressed)
@@ -0,0 +1,39 @@
+import calendar
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+from scheduling.views import get_active_window
+
+from . import metrics
+
+LOCAL_ADDRESSES = {"127.0.0.1", "::1"}
+
+
+def _metrics_allowed(request):
+    token = settings.METRICS_TOKEN
+    if token:
+        return request.headers.get("Authorization", "") == f"Bearer {token}"
+    # 未設定 token 時只接受本機直接連線（經 nginx 轉送的 request 不會是 127.0.0.1）
+    return request.META.get("REMOTE_ADDR") in LOCAL_ADDRESSES
+
+
+def _window_samples():
+    start, end, configured, allow_view, allow_edit, allow_register, _ = get_active_window()
+    return [
+        ("scheduling_window_configured", "gauge", "是否已設定排班期間", {}, int(configured)),
+        ("scheduling_window_start_seconds", "gauge", "目前排班期間起日（Unix 秒）", {}, calendar.timegm(start.timetuple())),
+        ("scheduling_window_end_seconds", "gauge", "目前排班期間迄日（Unix 秒）", {}, calendar.timegm(end.timetuple())),
+        ("scheduling_window_flag", "gauge", "目前排班期間的員工權限設定", {"flag": "allow_worker_view"}, int(allow_view)),
+        ("scheduling_window_flag", "gauge", "目前排班期間的員工權限設定", {"flag": "allow_worker_edit_shifts"}, int(allow_edit)),
+        ("scheduling_window_flag", "gauge", "目前排班期間的員工權限設定", {"flag": "allow_worker_register"}, int(allow_register)),
+    ]
+
+
+def metrics_view(request):
+    if not settings.METRICS_ENABLED or not _metrics_allowed(request):
+        raise Http404
+    return HttpResponse(
+        metrics.render_text(extra=_window_samples()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
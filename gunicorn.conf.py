@@ -0,0 +1,49 @@
+import os
+
+# DJANGO_SERVER_MODE=asgi 時改用 uvicorn worker 執行 core.asgi，
+# 非同步的班表頁面等待資料庫時不會佔住 worker
+server_mode = os.getenv("DJANGO_SERVER_MODE", "wsgi")
+
+if server_mode == "asgi":
+    wsgi_app = "core.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "core.wsgi:application"
+    worker_class = "sync"
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", "3"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+accesslog = "-"
+errorlog = "-"
+
+# 在 master 載入一次 application 再 fork，worker 共用已載入的模組（copy-on-write）
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in {"1", "true", "yes", "on"}
+
+
+def on_starting(server):
+    # core.metrics 各 worker 的統計檔從零開始，不沿用上一次執行留下的數字
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    from core.metrics import reset_metrics_dir
+
+    reset_metrics_dir()
+
+
+def when_ready(server):
+    import gc
+
+    if preload_app:
+        # URLconf 與各 app 的 views 預設在第一個 request 才載入，改在 fork 前先載入
+        from django.urls import get_resolver
+
+        get_resolver().url_patterns
+    # 將 master 已建立的物件移出 GC 追蹤，避免 worker 執行 GC 時寫入共用頁面
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # master 若在載入時開過資料庫連線，不可與 worker 共用
+    if preload_app:
+        from django.db import connections
+
+        connections.close_all()
@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import Holiday
+
+
+@admin.register(Holiday)
+class HolidayAdmin(admin.ModelAdmin):
+    list_display = ("date", "name", "is_recurring")
+    list_filter = ("is_recurring",)
+    search_fields = ("name",)
+    date_hierarchy = "date"
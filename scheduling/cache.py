@@ -0,0 +1,142 @@
+"""
+跨 process 的快取一致性：每個 gunicorn worker 各自把資料快取在記憶體，
+每個快取命名空間在資料庫有一個版本號 (CacheGeneration)。
+
+資料異動時呼叫 bump()（通常由 post_save / post_delete signal 觸發），版本號的 UPDATE
+與資料寫入在同一個交易內，提交後其他 worker 才會看到新版本。
+每個 request 第一次用到快取時以一次查詢讀取所有命名空間的版本號，
+版本號與快取內容不同時先清空再重新載入；沒用到快取的 request 不多查詢。
+"""
+import contextvars
+import threading
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F
+
+from core import db_router, metrics
+
+from .models import CacheGeneration
+
+_MISSING = object()
+_caches = {}
+
+# 目前 request 已讀取的版本號；request 外（管理指令等）每次都重新讀取
+_generations = contextvars.ContextVar("cache_generations", default=None)
+
+# 本執行緒在尚未提交的交易內 bump 過的命名空間：此時載入的資料可能被 rollback，不寫入快取
+_local = threading.local()
+
+
+def _uncommitted():
+    pending = getattr(_local, "pending", None)
+    if pending is None:
+        pending = _local.pending = set()
+    if pending and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        pending.clear()
+    return pending
+
+
+def forget_uncommitted():
+    # TestCase 的測試資料在類別層級的交易內永遠不會提交，建立完畢後由測試呼叫，視同已提交
+    _uncommitted().clear()
+
+
+def current_generation(namespace):
+    snapshot = _generations.get()
+    if snapshot is not None and namespace in snapshot:
+        return snapshot[namespace]
+    generations = dict(
+        CacheGeneration.objects.using(DEFAULT_DB_ALIAS).values_list("namespace", "generation")
+    )
+    if snapshot is not None:
+        # 尚未 bump 過的命名空間沒有資料列，視為版本 0
+        for name in (*_caches, namespace):
+            snapshot[name] = generations.get(name, 0)
+    return generations.get(namespace, 0)
+
+
+def bump(namespace):
+    generations = CacheGeneration.objects.using(DEFAULT_DB_ALIAS).filter(namespace=namespace)
+    if not generations.update(generation=F("generation") + 1):
+        _, created = CacheGeneration.objects.using(DEFAULT_DB_ALIAS).get_or_create(
+            namespace=namespace, defaults={"generation": 1}
+        )
+        if not created:
+            generations.update(generation=F("generation") + 1)
+
+    cache = _caches.get(namespace)
+    if cache is not None:
+        cache.clear()
+    snapshot = _generations.get()
+    if snapshot is not None:
+        snapshot.pop(namespace, None)
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        _uncommitted().add(namespace)
+        transaction.on_commit(lambda: _uncommitted().discard(namespace), using=DEFAULT_DB_ALIAS)
+
+
+class GenerationCache:
+    """process 內的快取，以 namespace 的版本號判斷是否過期。"""
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self._entries = {}
+        self._generation = None
+        self._lock = threading.Lock()
+        _caches[namespace] = self
+
+    def get(self, key, loader):
+        generation = current_generation(self.namespace)
+        with self._lock:
+            if self._generation != generation:
+                self._entries.clear()
+                self._generation = generation
+            value = self._entries.get(key, _MISSING)
+        metrics.inc("cache_requests_total", cache=self.namespace, result="miss" if value is _MISSING else "hit")
+        if value is not _MISSING:
+            return value
+        # 快取內容一律從主資料庫載入，避免把副本複寫延遲前的資料存成新版本
+        with db_router.use_primary():
+            value = loader()
+        if self.namespace not in _uncommitted():
+            with self._lock:
+                if self._generation == generation:
+                    self._entries[key] = value
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation = None
+
+    def invalidate(self):
+        bump(self.namespace)
+
+
+class CacheGenerationMiddleware:
+    """同一個 request 內只讀一次版本號。"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _generations.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _generations.reset(token)
+
+    async def __acall__(self, request):
+        token = _generations.set({})
+        try:
+            return await self.get_response(request)
+        finally:
+            _generations.reset(token)
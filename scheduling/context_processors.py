@@ -1,9 +1,9 @@
-from .models import SchedulingWindow
+from .windows import get_latest_window
 
 
 def worker_view_setting(request):
     if not request.user.is_authenticated:
         return {}
-    latest = SchedulingWindow.objects.order_by("-created_at").first()
+    latest = get_latest_window()
     allow_worker_view = latest.allow_worker_view if latest else False
     return {"allow_worker_view": allow_worker_view}
@@ -0,0 +1,47 @@
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import GenerationCache
+from .models import Holiday
+
+# 每個 process 依年份快取假日表，Holiday 異動時遞增版本號，各 worker 下一個 request 重新載入
+_holiday_cache = GenerationCache("holidays")
+
+
+def _load_holidays(year):
+    rows = Holiday.objects.filter(Q(date__year=year) | Q(is_recurring=True)).values_list(
+        "date", "name", "is_recurring"
+    )
+    holidays = {}
+    # 固定假日先放，當年度的單日設定可覆寫同一天的名稱
+    for holiday_date, name, is_recurring in sorted(rows, key=lambda row: not row[2]):
+        if is_recurring:
+            try:
+                holiday_date = holiday_date.replace(year=year)
+            except ValueError:
+                continue
+        holidays[holiday_date.strftime("%Y-%m-%d")] = name
+    return holidays
+
+
+def get_national_holidays(year):
+    return dict(_holiday_cache.get(year, lambda: _load_holidays(year)))
+
+
+def build_holiday_map(dates):
+    years = {d.year for d in dates}
+    holidays = {}
+    for year in years:
+        holidays.update(get_national_holidays(year))
+    return holidays
+
+
+def invalidate_holiday_cache():
+    _holiday_cache.invalidate()
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def _holiday_changed(sender, **kwargs):
+    invalidate_holiday_cache()
@@ -0,0 +1,85 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+
+from users.models import UserProfile
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "比較每個 request 重新連線（CONN_MAX_AGE=0）與重複使用連線的延遲。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="每種模式執行的 request 數")
+        parser.add_argument("--max-age", type=int, default=300, help="重複使用連線時的 CONN_MAX_AGE")
+        parser.add_argument("--url", help="改為實際請求此網址（需搭配 --username）")
+        parser.add_argument("--username", help="以此帳號登入後請求 --url")
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        connection = connections[alias]
+        workload = self.build_workload(options)
+        original_max_age = connection.settings_dict["CONN_MAX_AGE"]
+
+        connects = []
+
+        def count_connect(sender, connection, **kwargs):
+            if connection.alias == alias:
+                connects.append(1)
+
+        connection_created.connect(count_connect)
+        try:
+            workload()  # 預熱：載入 URLconf、樣板等與連線無關的成本
+            for label, max_age in (("per-request", 0), ("persistent", options["max_age"])):
+                connection.close()
+                connection.settings_dict["CONN_MAX_AGE"] = max_age
+                connects.clear()
+                timings = []
+                for _ in range(options["requests"]):
+                    started = time.perf_counter()
+                    # 與 Django handler 相同：request 開始與結束時各處理一次過期或失效的連線
+                    close_old_connections()
+                    workload()
+                    close_old_connections()
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"{label:<12} CONN_MAX_AGE={max_age:<4} connects={len(connects):<5} "
+                    f"p50={percentile(timings, 50):.2f}ms p95={percentile(timings, 95):.2f}ms "
+                    f"mean={statistics.mean(timings):.2f}ms"
+                )
+        finally:
+            connection_created.disconnect(count_connect)
+            connection.close()
+            connection.settings_dict["CONN_MAX_AGE"] = original_max_age
+
+    def build_workload(self, options):
+        if not options["url"]:
+            return lambda: list(UserProfile.objects.only("id", "name").order_by("sort_order")[:20])
+        # 以允許的主機名稱送出請求，正式環境設定下也不會被 ALLOWED_HOSTS 擋下
+        host = next((host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"), "localhost")
+        client = Client(HTTP_HOST=host)
+        if options["username"]:
+            user = User.objects.filter(username=options["username"]).first()
+            if not user:
+                raise CommandError(f"找不到帳號 {options['username']}")
+            client.force_login(user)
+        url = options["url"]
+
+        def request():
+            response = client.get(url)
+            if response.status_code >= 400:
+                raise CommandError(f"{url} 回應 {response.status_code}")
+
+        return request
@@ -0,0 +1,330 @@
+import json
+import logging
+import os
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from scheduling.models import SchedulingWindow, Shift, Store
+from users.models import UserProfile
+
+from .bench_db_connections import percentile
+
+# 產生的資料集不會使用這個時段（晚班到 22:00 結束），新增時不會與既有班表重疊
+FREE_START, FREE_END = "22:30", "23:30"
+# 每個 request 的紀錄與重疊檢查回傳的 400 警告會蓋過量測結果
+QUIET_LOGGERS = ("core.instrumentation", "django.request")
+
+
+def _json(path, payload):
+    return {"method": "post", "path": path, "data": json.dumps(payload), "content_type": "application/json"}
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        "量測班表頁、員工班表、新增/修改班表（含重疊檢查）、登記可上班時段與匯出 Excel 的延遲百分位數、"
+        "查詢次數與記憶體高峰，並與 baseline JSON 比較。"
+        "資料可用 generate_dataset 產生，或以 --scale 在每個規模重新產生。"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20, help="每項操作量測的次數")
+        parser.add_argument("--export-iterations", type=int, default=3, help="匯出 Excel 量測的次數")
+        parser.add_argument("--warmup", type=int, default=2, help="量測前先執行的次數（不計入）")
+        parser.add_argument(
+            "--scale",
+            action="append",
+            default=[],
+            help="資料規模 <員工數>x<月數>（例如 50x3），可重複；需搭配 --regenerate",
+        )
+        parser.add_argument("--stores", type=int, default=6, help="重新產生資料時的店別數")
+        parser.add_argument("--end-date", help="重新產生資料時的最後一天，固定後每次量測的資料相同")
+        parser.add_argument("--regenerate", action="store_true", help="允許 --scale 清除並重新產生資料庫中的資料")
+        parser.add_argument("--only", action="append", default=[], help="只量測名稱包含此字串的操作，可重複")
+        parser.add_argument("--output", help="將結果寫入此 JSON 檔，可作為之後的 baseline")
+        parser.add_argument("--baseline", help="與此 JSON 檔比較，有退步時以錯誤結束")
+        parser.add_argument("--tolerance", type=float, default=0.25, help="延遲與記憶體可容許的增加比例")
+        parser.add_argument("--min-delta-ms", type=float, default=5.0, help="延遲增加小於此值不視為退步")
+
+    def handle(self, *args, **options):
+        if options["scale"] and not options["regenerate"]:
+            raise CommandError("--scale 會清除並重新產生資料，請確認後加上 --regenerate")
+        scales = [self.parse_scale(value) for value in options["scale"]] or [None]
+        baseline = None
+        if options["baseline"]:
+            if not os.path.exists(options["baseline"]):
+                raise CommandError(f"找不到 baseline：{options['baseline']}")
+            with open(options["baseline"], encoding="utf-8") as fh:
+                baseline = json.load(fh)
+
+        levels = {name: logging.getLogger(name).level for name in QUIET_LOGGERS}
+        for name in QUIET_LOGGERS:
+            logging.getLogger(name).setLevel(logging.ERROR)
+        try:
+            results = self.run_scales(scales, options)
+        finally:
+            for name, level in levels.items():
+                logging.getLogger(name).setLevel(level)
+
+        report = {
+            "meta": {
+                "database": connection.vendor,
+                "created": timezone.now().isoformat(timespec="seconds"),
+                "iterations": options["iterations"],
+                "debug": settings.DEBUG,
+            },
+            "results": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                json.dump(report, fh, ensure_ascii=False, indent=2, sort_keys=True)
+            self.stdout.write(f"結果已寫入 {options['output']}")
+        if baseline:
+            regressions = self.compare(baseline, report, options)
+            if regressions:
+                raise CommandError(f"與 baseline 相比有 {regressions} 項退步")
+            self.stdout.write(self.style.SUCCESS("與 baseline 相比沒有退步。"))
+
+    def run_scales(self, scales, options):
+        results = {}
+        for scale in scales:
+            if scale:
+                label = f"{scale[0]}x{scale[1]}"
+                self.stdout.write(f"產生資料 {label} ...")
+                call_command(
+                    "generate_dataset",
+                    reset=True,
+                    workers=scale[0],
+                    months=scale[1],
+                    stores=options["stores"],
+                    end_date=options["end_date"],
+                    no_documents=True,
+                    stdout=self.stdout,
+                )
+            else:
+                label = "current"
+            results[label] = self.run_scale(label, options)
+        return results
+
+    def parse_scale(self, value):
+        try:
+            workers, months = (int(part) for part in value.lower().split("x"))
+        except ValueError:
+            raise CommandError(f"--scale 格式錯誤：{value}（需為 <員工數>x<月數>）")
+        return workers, months
+
+    def run_scale(self, label, options):
+        operations = self.build_operations()
+        if options["only"]:
+            operations = [op for op in operations if any(part in op[0] for part in options["only"])]
+        counts = {
+            "shifts": Shift.objects.count(),
+            "workers": UserProfile.objects.filter(role__in=("worker", "supervisor")).count(),
+        }
+        self.stdout.write(f"\n[{label}] {counts['workers']} 位員工、{counts['shifts']} 筆班表")
+        self.stdout.write(
+            f"{'操作':<24}{'狀態':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'查詢':>6}{'記憶體':>12}"
+        )
+        results = {"_dataset": counts}
+        for name, client, build in operations:
+            iterations = options["export_iterations"] if name.startswith("export") else options["iterations"]
+            result = self.measure(client, build, iterations, options["warmup"])
+            results[name] = result
+            self.stdout.write(
+                f"{name:<24}{result['status']:>6}{result['p50_ms']:>9.1f}ms{result['p95_ms']:>8.1f}ms"
+                f"{result['p99_ms']:>8.1f}ms{result['max_ms']:>8.1f}ms{result['queries']:>6}"
+                f"{result['peak_kib']:>9.0f}KiB"
+            )
+        return results
+
+    def measure(self, client, build, iterations, warmup):
+        for _ in range(warmup):
+            self.perform(client, build())
+
+        # 記憶體另外量一次：tracemalloc 開啟時執行速度會明顯變慢，不能與延遲一起量
+        tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            baseline_memory = tracemalloc.get_traced_memory()[0]
+            self.perform(client, build())
+            peak = tracemalloc.get_traced_memory()[1] - baseline_memory
+        finally:
+            tracemalloc.stop()
+
+        timings = []
+        queries = []
+        status = None
+        for _ in range(max(1, iterations)):
+            spec = build()
+            counter = QueryCounter()
+            started = time.perf_counter()
+            with connection.execute_wrapper(counter):
+                response = self.perform(client, spec)
+            timings.append((time.perf_counter() - started) * 1000)
+            queries.append(counter.count)
+            status = response.status_code
+        return {
+            "status": status,
+            "p50_ms": round(percentile(timings, 50), 2),
+            "p95_ms": round(percentile(timings, 95), 2),
+            "p99_ms": round(percentile(timings, 99), 2),
+            "max_ms": round(max(timings), 2),
+            "mean_ms": round(statistics.mean(timings), 2),
+            "queries": max(queries),
+            "peak_kib": round(peak / 1024, 1),
+        }
+
+    def perform(self, client, spec):
+        method = getattr(client, spec.get("method", "get"))
+        kwargs = {"data": spec.get("data")}
+        if spec.get("content_type"):
+            kwargs["content_type"] = spec["content_type"]
+        if spec.get("method") != "post":
+            response = method(spec["path"], **kwargs)
+        else:
+            # 寫入的操作在交易內執行後 rollback，每次量測的資料都相同
+            with transaction.atomic():
+                response = method(spec["path"], **kwargs)
+                transaction.set_rollback(True)
+        if response.status_code >= 500:
+            raise CommandError(f"{spec['path']} 回應 {response.status_code}")
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
+
+    def client_for(self, profile):
+        # 以允許的主機名稱送出請求，正式環境設定下也不會被 ALLOWED_HOSTS 擋下
+        host = next((host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"), "localhost")
+        client = Client(HTTP_HOST=host)
+        client.force_login(profile.user)
+        return client
+
+    def build_operations(self):
+        manager = UserProfile.objects.filter(role="manager").select_related("user").order_by("id").first()
+        window = SchedulingWindow.objects.order_by("-created_at").first()
+        anchor = window.start_date if window else timezone.localdate()
+        worker = (
+            UserProfile.objects.filter(role="worker", shift__date__gte=anchor)
+            .select_related("user")
+            .order_by("sort_order")
+            .first()
+        )
+        store = Store.objects.order_by("id").first()
+        if not manager or not worker or not store:
+            raise CommandError("資料庫中需要至少一位店長、一位有班表的員工與一間店，可先執行 generate_dataset")
+
+        manager_client = self.client_for(manager)
+        worker_client = self.client_for(worker)
+        timeline = reverse("scheduling:timeline")
+        schedule = reverse("scheduling:worker_schedule")
+        week = (anchor + timedelta(days=7)).isoformat()
+        existing = Shift.objects.filter(employee=worker, date__gte=anchor).order_by("date", "start_time").first()
+        # 同一天有兩個班的員工，用來量測修改時的重疊檢查
+        crowded = (
+            Shift.objects.values("employee_id", "date")
+            .annotate(total=Count("id"))
+            .filter(total__gte=2)
+            .order_by("-date")
+            .first()
+        )
+
+        shift_create = reverse("scheduling:shift_create")
+        shift_update = reverse("scheduling:shift_update")
+        operations = [
+            ("timeline_day", manager_client, lambda: {"path": timeline, "data": {"view": "day", "date": week}}),
+            ("timeline_week", manager_client, lambda: {"path": timeline, "data": {"view": "week", "date": week}}),
+            ("timeline_month", manager_client, lambda: {"path": timeline, "data": {"view": "month", "date": week}}),
+            ("timeline_week_store", manager_client, lambda: {
+                "path": timeline, "data": {"view": "week", "date": week, "store": store.id},
+            }),
+            ("timeline_month_store", manager_client, lambda: {
+                "path": timeline, "data": {"view": "month", "date": week, "store": [store.id, "unassigned"]},
+            }),
+            ("worker_schedule_week", worker_client, lambda: {"path": schedule, "data": {"view": "week", "date": week}}),
+            ("worker_schedule_month", worker_client, lambda: {"path": schedule, "data": {"view": "month", "date": week}}),
+            ("shift_create", manager_client, lambda: _json(shift_create, {
+                "employee_id": worker.id, "store_id": store.id, "date": week, "start": FREE_START, "end": FREE_END,
+            })),
+        ]
+        if existing:
+            operations += [
+                ("shift_create_conflict", manager_client, lambda: _json(shift_create, {
+                    "employee_id": worker.id,
+                    "store_id": store.id,
+                    "date": existing.date.isoformat(),
+                    "start": existing.start_time.strftime("%H:%M"),
+                    "end": existing.end_time.strftime("%H:%M"),
+                })),
+                ("shift_update", manager_client, lambda: _json(shift_update, {
+                    "id": existing.id,
+                    "start": existing.start_time.strftime("%H:%M"),
+                    "end": existing.end_time.strftime("%H:%M"),
+                    "store_id": store.id,
+                    "note": "量測",
+                })),
+            ]
+        if crowded:
+            first, second = Shift.objects.filter(
+                employee_id=crowded["employee_id"], date=crowded["date"]
+            ).order_by("start_time")[:2]
+            operations.append(("shift_update_conflict", manager_client, lambda: _json(shift_update, {
+                "id": first.id,
+                "start": first.start_time.strftime("%H:%M"),
+                "end": second.end_time.strftime("%H:%M"),
+                "store_id": store.id,
+            })))
+        operations += [
+            ("availability_create", worker_client, lambda: _json(reverse("scheduling:availability_create"), {
+                "date": anchor.isoformat(), "start": FREE_START, "end": FREE_END,
+            })),
+            ("export_excel", manager_client, lambda: {"path": reverse("scheduling:export_excel")}),
+        ]
+        return operations
+
+    def compare(self, baseline, report, options):
+        tolerance = 1 + options["tolerance"]
+        regressions = 0
+        self.stdout.write("\n與 baseline 比較：")
+        for label, operations in report["results"].items():
+            base_operations = baseline.get("results", {}).get(label)
+            if not base_operations:
+                self.stdout.write(f"[{label}] baseline 沒有此規模，略過")
+                continue
+            for name, current in operations.items():
+                base = base_operations.get(name)
+                if name.startswith("_") or not base:
+                    continue
+                problems = []
+                if current["p50_ms"] > base["p50_ms"] * tolerance and current["p50_ms"] - base["p50_ms"] > options["min_delta_ms"]:
+                    problems.append(f"p50 {base['p50_ms']:.1f} -> {current['p50_ms']:.1f}ms")
+                if current["p95_ms"] > base["p95_ms"] * tolerance and current["p95_ms"] - base["p95_ms"] > options["min_delta_ms"]:
+                    problems.append(f"p95 {base['p95_ms']:.1f} -> {current['p95_ms']:.1f}ms")
+                if current["queries"] > base["queries"]:
+                    problems.append(f"查詢 {base['queries']} -> {current['queries']}")
+                if current["peak_kib"] > base["peak_kib"] * tolerance and current["peak_kib"] - base["peak_kib"] > 64:
+                    problems.append(f"記憶體 {base['peak_kib']:.0f} -> {current['peak_kib']:.0f}KiB")
+                if current["status"] != base["status"]:
+                    problems.append(f"狀態碼 {base['status']} -> {current['status']}")
+                if problems:
+                    regressions += 1
+                    self.stdout.write(self.style.ERROR(f"[{label}] {name} 退步：{'；'.join(problems)}"))
+        return regressions
@@ -0,0 +1,273 @@
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from scheduling.models import ScheduleChange, SchedulingWindow, Shift, Store, WorkAvailability
+from scheduling.views import calculate_break_minutes
+from users.models import SORT_ORDER_GAP, DocumentUpload, UserProfile, WorkerDocument
+from users.storage import document_storage
+
+STORE_NAMES = ["林森店", "中正店", "信義店", "大安店", "松山店", "內湖店", "板橋店", "新莊店"]
+STORE_COLORS = ["#cfe8ff", "#ffe4c4", "#d9f2d9", "#f3d9ff", "#fff2b3", "#ffd6d6", "#d6f5f5", "#e6e6e6"]
+SURNAMES = "陳林黃張李王吳劉蔡楊許鄭謝郭洪曾邱廖賴周"
+GIVEN_NAMES = ["志明", "美玲", "建宏", "雅雯", "冠宇", "心怡", "宇軒", "佳穎", "家豪", "怡君", "俊傑", "淑芬"]
+EDUCATION_CHOICES = ["高中在學", "高中畢業", "大學在學", "大學畢業"]
+SHIFT_OPTIONS = [
+    (dt_time(9, 0), dt_time(13, 0)),   # 早班
+    (dt_time(13, 0), dt_time(17, 0)),  # 中班
+    (dt_time(17, 0), dt_time(22, 0)),  # 晚班
+    (dt_time(9, 0), dt_time(18, 0)),   # 全天
+]
+BREAK_RULES = [
+    {"min_hours": 4, "break_minutes": 30},
+    {"min_hours": 8, "break_minutes": 60},
+]
+SHIFT_NOTES = ["", "", "", "", "交接提醒", "注意補貨", "新人協助", "盤點支援", "臨時調班"]
+DOCUMENT_CATEGORIES = ("id_card_front", "id_card_back", "driver_license", "bankbook")
+
+
+def month_start(day, months_back=0):
+    month_index = day.year * 12 + day.month - 1 - months_back
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def month_end(day):
+    return month_start(day, -1) - timedelta(days=1)
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise CommandError(f"日期格式錯誤：{value}（需為 YYYY-MM-DD）")
+
+
+class Command(BaseCommand):
+    help = (
+        "產生壓力測試與效能量測用的資料：店別、員工、數個月的班表與可上班時段。"
+        "相同參數與 --seed 會產生相同的資料，全部以分批 bulk_create 寫入。"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stores", type=int, default=3, help="店別數")
+        parser.add_argument("--workers", type=int, default=50, help="員工數（含主管）")
+        parser.add_argument("--supervisor-ratio", type=float, default=0.05, help="員工中主管的比例")
+        parser.add_argument("--months", type=int, default=3, help="班表涵蓋的月數（含結束日所在月份）")
+        parser.add_argument("--end-date", help="資料的最後一天 YYYY-MM-DD，預設為本月最後一天")
+        parser.add_argument("--shift-density", type=float, default=0.55, help="每位員工每天有班的機率")
+        parser.add_argument("--double-shift-ratio", type=float, default=0.15, help="有班的日子排兩個班的機率")
+        parser.add_argument("--availability-density", type=float, default=0.3, help="每位員工每天登記可上班時段的機率")
+        parser.add_argument("--seed", type=int, default=20240101, help="亂數種子")
+        parser.add_argument("--prefix", default="worker", help="員工帳號前綴，帳號為 <prefix>1、<prefix>2 ...")
+        parser.add_argument("--password", default="123456", help="所有產生帳號的密碼")
+        parser.add_argument("--batch-size", type=int, default=2000, help="每次 bulk_create 的筆數")
+        parser.add_argument("--no-documents", action="store_true", help="不建立員工文件")
+        parser.add_argument("--reset", action="store_true", help="先清除班表、員工（保留超級使用者）、店別與排班期間")
+
+    def handle(self, *args, **options):
+        for name in ("shift_density", "double_shift_ratio", "availability_density", "supervisor_ratio"):
+            if not 0 <= options[name] <= 1:
+                raise CommandError(f"--{name.replace('_', '-')} 需介於 0 與 1 之間")
+        if options["stores"] < 1 or options["workers"] < 1 or options["months"] < 1:
+            raise CommandError("--stores、--workers 與 --months 需至少為 1")
+
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        end_date = parse_date(options["end_date"]) if options["end_date"] else month_end(timezone.localdate())
+        start_date = month_start(end_date, options["months"] - 1)
+        started = time.perf_counter()
+
+        if options["reset"]:
+            self.reset()
+            self.stdout.write(f"已清除既有資料（{time.perf_counter() - started:.1f} 秒）")
+
+        usernames = [f"{options['prefix']}{index}" for index in range(1, options["workers"] + 1)]
+        if User.objects.filter(username__in=usernames).exists():
+            raise CommandError(f"帳號 {options['prefix']}N 已存在，請加上 --reset 或改用 --prefix")
+
+        # 所有帳號共用同一個雜湊，不必對每位員工重新計算 PBKDF2
+        password_hash = make_password(options["password"])
+        with transaction.atomic():
+            self.ensure_manager(password_hash)
+            stores = self.create_stores(options["stores"])
+            profiles = self.create_profiles(
+                usernames, password_hash, stores, options["supervisor_ratio"], end_date
+            )
+            documents = 0 if options["no_documents"] else self.create_documents(profiles)
+            SchedulingWindow.objects.create(
+                start_date=month_start(end_date),
+                end_date=end_date,
+                allow_worker_view=True,
+                allow_worker_edit_shifts=True,
+                allow_worker_register=True,
+                break_rules=BREAK_RULES,
+            )
+            shifts, availabilities = self.create_schedule(profiles, stores, start_date, end_date, options)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"已建立 {len(stores)} 間店、{len(profiles)} 位員工、{documents} 份文件、"
+            f"{shifts} 筆班表、{availabilities} 筆可上班時段（{start_date} ~ {end_date}），"
+            f"耗時 {time.perf_counter() - started:.1f} 秒。"
+        ))
+
+    def reset(self):
+        # 由子資料表往上刪，沒有關聯或 signal 的資料表會以單一 DELETE 清除，不會逐筆載入
+        with transaction.atomic():
+            WorkAvailability.objects.all().delete()
+            ScheduleChange.objects.all().delete()
+            Shift.objects.all().delete()
+            DocumentUpload.objects.all().delete()
+            WorkerDocument.objects.all().delete()
+            UserProfile.objects.all().delete()
+            User.objects.filter(is_superuser=False).delete()
+            SchedulingWindow.objects.all().delete()
+            Store.objects.all().delete()
+
+    def bulk_insert(self, model, rows):
+        batch = []
+        total = 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch, batch_size=self.batch_size)
+                total += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch, batch_size=self.batch_size)
+            total += len(batch)
+        return total
+
+    def ensure_manager(self, password_hash):
+        if User.objects.filter(username="manager").exists():
+            return
+        user = User.objects.create(username="manager", password=password_hash)
+        UserProfile.objects.create(user=user, role="manager", name="店長")
+
+    def create_stores(self, count):
+        names = [STORE_NAMES[index] if index < len(STORE_NAMES) else f"分店{index + 1}" for index in range(count)]
+        existing = set(Store.objects.filter(name__in=names).values_list("name", flat=True))
+        Store.objects.bulk_create([
+            Store(name=name, color=STORE_COLORS[index % len(STORE_COLORS)])
+            for index, name in enumerate(names)
+            if name not in existing
+        ])
+        by_name = {store.name: store for store in Store.objects.filter(name__in=names)}
+        return [by_name[name] for name in names]
+
+    def create_profiles(self, usernames, password_hash, stores, supervisor_ratio, end_date):
+        rng = self.rng
+        # 主管排在最後，worker1 起的帳號都是員工，壓力測試可直接依序使用
+        supervisors = round(len(usernames) * supervisor_ratio)
+        self.bulk_insert(User, (User(username=username, password=password_hash) for username in usernames))
+        # MySQL 的 bulk_create 不會回填主鍵，以帳號重新取回
+        user_ids = dict(User.objects.filter(username__in=usernames).values_list("username", "id"))
+        last = UserProfile.objects.order_by("-sort_order").values_list("sort_order", flat=True).first() or 0
+
+        def rows():
+            for index, username in enumerate(usernames, start=1):
+                real_name = rng.choice(SURNAMES) + rng.choice(GIVEN_NAMES)
+                birthday = date(end_date.year - rng.randint(18, 40), rng.randint(1, 12), rng.randint(1, 28))
+                profile = UserProfile(
+                    user_id=user_ids[username],
+                    role="supervisor" if index > len(usernames) - supervisors else "worker",
+                    name=f"{real_name}{index}",
+                    real_name=real_name,
+                    gender=rng.choice(["男", "女"]),
+                    birthday=birthday,
+                    id_number=rng.choice("ABCDEFGHJKLMNPQRSTUVXYWZIO") + f"{rng.randint(100000000, 299999999)}",
+                    marital_status=rng.choice(["單身", "單身", "已婚"]),
+                    education=rng.choice(EDUCATION_CHOICES),
+                    contact_address=f"台北市中山區中山北路 {rng.randint(1, 7)} 段 {index} 號",
+                    registered_address="同通訊地址",
+                    mobile_phone=f"09{rng.randint(0, 99999999):08d}",
+                    emergency_contact_name="王小明",
+                    emergency_contact_relation="家人",
+                    emergency_contact_phone=f"09{rng.randint(0, 99999999):08d}",
+                    work_experience="飲料店 / 2022-2023 / 個人規劃",
+                    primary_store=stores[index % len(stores)],
+                    sort_order=last + SORT_ORDER_GAP * index,
+                )
+                # 約一成員工資料不完整，列表的「未完成」篩選才有資料
+                if rng.random() < 0.1:
+                    profile.work_experience = ""
+                profile.profile_complete = not profile.missing_required_info()
+                yield profile
+
+        self.bulk_insert(UserProfile, rows())
+        return list(
+            UserProfile.objects.filter(user__username__in=usernames)
+            .select_related("primary_store")
+            .order_by("sort_order")
+        )
+
+    def create_documents(self, profiles):
+        # 內容定址儲存：所有文件共用同一份檔案，只寫入一次
+        file_name = document_storage().save("worker_documents/dataset.txt", ContentFile(b"generated document"))
+        return self.bulk_insert(WorkerDocument, (
+            WorkerDocument(
+                profile=profile,
+                category=category,
+                file=file_name,
+                original_name=f"{category}.txt",
+                file_size=len(b"generated document"),
+                preview_status=WorkerDocument.PREVIEW_SKIPPED,
+            )
+            for profile in profiles
+            for category in DOCUMENT_CATEGORIES
+        ))
+
+    def create_schedule(self, profiles, stores, start_date, end_date, options):
+        rng = self.rng
+        today = timezone.localdate()
+        days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        break_minutes = {option: calculate_break_minutes(BREAK_RULES, *option) for option in SHIFT_OPTIONS}
+        non_overlapping = SHIFT_OPTIONS[:3]
+
+        def shift_rows():
+            for day in days:
+                for profile in profiles:
+                    if rng.random() >= options["shift_density"]:
+                        continue
+                    if rng.random() < options["double_shift_ratio"]:
+                        chosen = sorted(rng.sample(non_overlapping, 2))
+                    else:
+                        chosen = [rng.choice(SHIFT_OPTIONS)]
+                    for start, end in chosen:
+                        # 亂數的取用順序不可依執行日期而變，相同 seed 才會得到相同資料
+                        published = rng.random() < 0.9
+                        roll = rng.random()
+                        if roll < 0.75:
+                            store = profile.primary_store
+                        elif roll < 0.9:
+                            store = rng.choice(stores)
+                        else:
+                            store = None  # 員工自行登記的班
+                        yield Shift(
+                            employee_id=profile.id,
+                            store=store,
+                            date=day,
+                            start_time=start,
+                            end_time=end,
+                            break_minutes=break_minutes[(start, end)],
+                            is_published=published or day < today,
+                            note=rng.choice(SHIFT_NOTES),
+                        )
+
+        def availability_rows():
+            for day in days:
+                for profile in profiles:
+                    if rng.random() >= options["availability_density"]:
+                        continue
+                    start, end = rng.choice(SHIFT_OPTIONS)
+                    yield WorkAvailability(employee_id=profile.id, date=day, start_time=start, end_time=end)
+
+        shifts = self.bulk_insert(Shift, shift_rows())
+        availabilities = self.bulk_insert(WorkAvailability, availability_rows())
+        return shifts, availabilities
@@ -0,0 +1,111 @@
+import csv
+import json
+import os
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from scheduling.models import Holiday
+
+DATE_FORMATS = ("%Y%m%d", "%Y-%m-%d", "%Y/%m/%d")
+
+
+def parse_holiday_date(value):
+    text = (value or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_official_row(row):
+    """
+    行政機關辦公日曆表格式：西元日期、星期、是否放假、備註。
+    只取「放假且有備註」的日期，一般週末不匯入。
+    """
+    if str(row.get("是否放假", "")).strip() != "2":
+        return None
+    name = (row.get("備註") or "").strip()
+    if not name:
+        return None
+    return parse_holiday_date(row.get("西元日期")), name
+
+
+def read_rows(path, encoding):
+    if os.path.splitext(path)[1].lower() == ".json":
+        with open(path, encoding=encoding) as fh:
+            data = json.load(fh)
+        if not isinstance(data, list):
+            raise CommandError("JSON 檔案需為陣列。")
+        return data
+    with open(path, encoding=encoding, newline="") as fh:
+        reader = csv.reader(fh)
+        header = next(reader, None)
+        if header is None:
+            return []
+        header = [col.strip() for col in header]
+        if "西元日期" in header:
+            return [dict(zip(header, values)) for values in reader]
+        rows = [] if parse_holiday_date(header[0]) is None else [header]
+        rows.extend(reader)
+        return [{"date": values[0], "name": values[1] if len(values) > 1 else ""} for values in rows if values]
+
+
+class Command(BaseCommand):
+    help = "匯入國定假日（政府行政機關辦公日曆表 CSV/JSON，或 date,name 格式的 CSV）。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="日曆檔案路徑")
+        parser.add_argument("--encoding", default="utf-8-sig", help="檔案編碼，官方 CSV 可能為 big5")
+        parser.add_argument(
+            "--replace",
+            action="store_true",
+            help="先刪除檔案涵蓋年份中非固定的假日再匯入",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="只顯示結果，不寫入資料庫")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"找不到檔案：{path}")
+
+        holidays = {}
+        skipped = 0
+        for row in read_rows(path, options["encoding"]):
+            if "西元日期" in row:
+                parsed = parse_official_row(row)
+                if parsed is None:
+                    continue
+                holiday_date, name = parsed
+            else:
+                holiday_date = parse_holiday_date(row.get("date"))
+                name = (row.get("name") or "").strip()
+            if not holiday_date or not name:
+                skipped += 1
+                continue
+            holidays[holiday_date] = name[:50]
+
+        years = sorted({d.year for d in holidays})
+        if options["dry_run"]:
+            for holiday_date, name in sorted(holidays.items()):
+                self.stdout.write(f"{holiday_date} {name}")
+            self.stdout.write(f"共 {len(holidays)} 筆，略過 {skipped} 筆（未寫入）。")
+            return
+
+        with transaction.atomic():
+            if options["replace"] and years:
+                Holiday.objects.filter(date__year__in=years, is_recurring=False).delete()
+            created = 0
+            for holiday_date, name in holidays.items():
+                _, was_created = Holiday.objects.update_or_create(
+                    date=holiday_date,
+                    defaults={"name": name},
+                )
+                created += int(was_created)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"已匯入 {len(holidays)} 筆假日（新增 {created} 筆，年份：{', '.join(map(str, years)) or '-'}），略過 {skipped} 筆。"
+        ))
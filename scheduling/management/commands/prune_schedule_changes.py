@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from scheduling.models import ScheduleChange
+
+
+class Command(BaseCommand):
+    help = "刪除超過保留天數的班別異動紀錄（ScheduleChange）。"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.SCHEDULE_CHANGES_RETENTION_DAYS,
+            help="保留最近幾天的紀錄（預設 SCHEDULE_CHANGES_RETENTION_DAYS）",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--dry-run", action="store_true", help="只計算筆數，不刪除")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        stale = ScheduleChange.objects.filter(created_at__lt=cutoff)
+        if options["dry_run"]:
+            self.stdout.write(f"[dry-run] 將刪除 {stale.count()} 筆 {cutoff:%Y-%m-%d %H:%M} 之前的異動紀錄")
+            return
+
+        deleted = 0
+        # 分批刪除，避免單一交易鎖住大量資料列
+        while True:
+            ids = list(stale.order_by("id").values_list("id", flat=True)[:options["batch_size"]])
+            if not ids:
+                break
+            deleted += ScheduleChange.objects.filter(id__in=ids).delete()[1].get(ScheduleChange._meta.label, 0)
+        self.stdout.write(self.style.SUCCESS(f"已刪除 {deleted} 筆 {cutoff:%Y-%m-%d %H:%M} 之前的異動紀錄"))
@@ -0,0 +1,69 @@
+import os
+import re
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# 在子行程中模擬 gunicorn worker 啟動：載入 WSGI/ASGI application 並建立 URL resolver
+BOOT_SCRIPT = """
+import resource, time
+started = time.perf_counter()
+from {module} import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - started
+print("BOOT_MS=%.1f" % (elapsed * 1000))
+print("MAXRSS_KB=%d" % resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+class Command(BaseCommand):
+    help = "以 python -X importtime 量測 application 載入時間，列出最耗時的模組與記憶體用量。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--asgi", action="store_true", help="量測 core.asgi 而非 core.wsgi")
+        parser.add_argument("--top", type=int, default=20, help="列出前幾個模組")
+        parser.add_argument("--min-ms", type=float, default=1.0, help="忽略累計低於此毫秒數的模組")
+
+    def handle(self, *args, **options):
+        module = "core.asgi" if options["asgi"] else "core.wsgi"
+        env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", BOOT_SCRIPT.format(module=module)],
+            capture_output=True,
+            text=True,
+            env=env,
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1] if result.stderr else "啟動失敗")
+
+        stats = dict(line.split("=", 1) for line in result.stdout.split() if "=" in line)
+        modules = []
+        for line in result.stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            if match:
+                self_us, cumulative_us, indent, name = match.groups()
+                modules.append((int(cumulative_us), int(self_us), len(indent) // 2, name))
+
+        top_level = [item for item in modules if item[2] == 0]
+        total_ms = sum(item[0] for item in top_level) / 1000
+        self.stdout.write(
+            f"{module}: boot {stats.get('BOOT_MS', '?')}ms, imports {total_ms:.1f}ms, "
+            f"max RSS {int(stats.get('MAXRSS_KB', 0)) / 1024:.1f}MB"
+        )
+
+        self.stdout.write(f"\n{'cumulative':>12} {'self':>10}  module")
+        shown = 0
+        for cumulative_us, self_us, _, name in sorted(modules, reverse=True):
+            if cumulative_us / 1000 < options["min_ms"] or shown >= options["top"]:
+                break
+            self.stdout.write(f"{cumulative_us / 1000:>10.1f}ms {self_us / 1000:>8.1f}ms  {name}")
+            shown += 1
+
+        project = [item for item in modules if item[3].split(".")[0] in {"core", "users", "scheduling"}]
+        if project:
+            self.stdout.write(f"\n{'cumulative':>12} {'self':>10}  project module")
+            for cumulative_us, self_us, _, name in sorted(project, reverse=True)[: options["top"]]:
+                self.stdout.write(f"{cumulative_us / 1000:>10.1f}ms {self_us / 1000:>8.1f}ms  {name}")
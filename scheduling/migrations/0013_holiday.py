@@ -0,0 +1,62 @@
+from datetime import date
+
+from django.db import migrations, models
+
+
+# 固定日期的假日以 2024 年為基準，每年套用相同月日
+RECURRING_HOLIDAYS = [
+    (date(2024, 1, 1), "元旦"),
+    (date(2024, 2, 28), "和平紀念日"),
+    (date(2024, 4, 4), "兒童節"),
+    (date(2024, 4, 5), "清明節"),
+    (date(2024, 5, 1), "勞動節"),
+    (date(2024, 10, 10), "國慶日"),
+    (date(2024, 12, 25), "行憲紀念日"),
+]
+
+LUNAR_HOLIDAYS = [
+    (date(2024, 2, 10), "農曆新年"),
+    (date(2024, 6, 10), "端午節"),
+    (date(2025, 1, 29), "農曆新年"),
+    (date(2025, 5, 31), "端午節"),
+    (date(2026, 2, 15), "小年夜"),
+    (date(2026, 2, 16), "除夕"),
+    (date(2026, 2, 17), "初一"),
+    (date(2026, 2, 18), "初二"),
+    (date(2026, 2, 19), "初三"),
+    (date(2026, 2, 20), "初四"),
+    (date(2026, 2, 21), "初五"),
+    (date(2026, 6, 19), "端午節"),
+]
+
+
+def seed_holidays(apps, schema_editor):
+    Holiday = apps.get_model("scheduling", "Holiday")
+    rows = [Holiday(date=d, name=name, is_recurring=True) for d, name in RECURRING_HOLIDAYS]
+    rows += [Holiday(date=d, name=name) for d, name in LUNAR_HOLIDAYS]
+    Holiday.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduling", "0012_schedulingwindow_break_rules_shift_break_minutes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Holiday",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("date", models.DateField(unique=True, verbose_name="日期")),
+                ("name", models.CharField(max_length=50, verbose_name="名稱")),
+                ("is_recurring", models.BooleanField(default=False, verbose_name="每年固定")),
+            ],
+            options={
+                "verbose_name": "國定假日",
+                "verbose_name_plural": "國定假日",
+                "ordering": ["date"],
+            },
+        ),
+        migrations.RunPython(seed_holidays, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0018_userprofile_search_indexes"),
+        ("scheduling", "0014_cachegeneration"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScheduleChange",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("shift_id", models.BigIntegerField()),
+                ("date", models.DateField()),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[("create", "新增"), ("update", "修改"), ("delete", "刪除")], max_length=10
+                    ),
+                ),
+                ("data", models.JSONField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "employee",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="+", to="users.userprofile"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "班表異動",
+                "verbose_name_plural": "班表異動",
+                "ordering": ["id"],
+            },
+        ),
+    ]
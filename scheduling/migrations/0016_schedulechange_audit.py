@@ -0,0 +1,53 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0018_userprofile_search_indexes"),
+        ("scheduling", "0015_schedulechange"),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name="schedulechange",
+            old_name="data",
+            new_name="after",
+        ),
+        migrations.AddField(
+            model_name="schedulechange",
+            name="before",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="schedulechange",
+            name="actor",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="users.userprofile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="schedulechange",
+            name="reverts",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="scheduling.schedulechange",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="schedulechange",
+            index=models.Index(fields=["created_at"], name="schedchange_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="schedulechange",
+            index=models.Index(fields=["employee", "date"], name="schedchange_employee_date_idx"),
+        ),
+    ]
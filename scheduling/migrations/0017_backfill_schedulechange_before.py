@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def backfill_before(apps, schema_editor):
+    # 0016 之前的修改 / 刪除沒有記錄 before，以同一班別前一筆紀錄的 after 補上
+    ScheduleChange = apps.get_model("scheduling", "ScheduleChange")
+    legacy = ScheduleChange.objects.filter(before__isnull=True).exclude(action="create").order_by("id")
+    for change in legacy.iterator():
+        previous = (
+            ScheduleChange.objects.filter(shift_id=change.shift_id, id__lt=change.id)
+            .order_by("-id")
+            .values_list("after", flat=True)
+            .first()
+        )
+        if previous is not None:
+            ScheduleChange.objects.filter(id=change.id).update(before=previous)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduling", "0016_schedulechange_audit"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_before, migrations.RunPython.noop),
+    ]
@@ -14,6 +14,29 @@ class Store(models.Model):
         return self.name
 
 
+class Holiday(models.Model):
+    date = models.DateField("日期", unique=True)
+    name = models.CharField("名稱", max_length=50)
+    is_recurring = models.BooleanField("每年固定", default=False)
+
+    class Meta:
+        ordering = ["date"]
+        verbose_name = "國定假日"
+        verbose_name_plural = "國定假日"
+
+    def __str__(self):
+        return f"{self.date} {self.name}"
+
+
+class CacheGeneration(models.Model):
+    # 各 process 內快取的版本號；資料異動時在同一個交易內遞增（見 scheduling.cache）
+    namespace = models.CharField(max_length=50, unique=True)
+    generation = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.namespace}@{self.generation}"
+
+
 class SchedulingWindow(models.Model):
     start_date = models.DateField()
     end_date = models.DateField()
@@ -86,3 +109,53 @@ class Shift(models.Model):
 
     def __str__(self):
         return f"{self.employee.display_name()} {self.date} ({self.start_time}-{self.end_time})"
+
+
+class ScheduleChange(models.Model):
+    """
+    班別異動紀錄，只新增不修改。before / after 為異動前後的班別內容（shift_snapshot），
+    新增時 before 為 null、刪除時 after 為 null。
+
+    班表頁面依 id 遊標取得其他人做的異動並就地更新（scheduling:changes）；
+    復原 / 重做是把某筆異動反向套用並記成新的一筆（scheduling:shift_revert）；
+    兩個時間點之間的差異只需讀取期間內的紀錄（scheduling:changes_diff）。
+    """
+
+    ACTION_CREATE = "create"
+    ACTION_UPDATE = "update"
+    ACTION_DELETE = "delete"
+    ACTION_CHOICES = (
+        (ACTION_CREATE, "新增"),
+        (ACTION_UPDATE, "修改"),
+        (ACTION_DELETE, "刪除"),
+    )
+
+    # 班別刪除後仍要保留紀錄，不使用外鍵；復原刪除時以同一個 id 重建班別
+    shift_id = models.BigIntegerField()
+    employee = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name="+")
+    date = models.DateField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    before = models.JSONField(null=True, blank=True)
+    after = models.JSONField(null=True, blank=True)
+    actor = models.ForeignKey(
+        UserProfile,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    # 由復原 / 重做產生時指向被反向套用的那筆
+    reverts = models.ForeignKey("self", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["created_at"], name="schedchange_created_idx"),
+            models.Index(fields=["employee", "date"], name="schedchange_employee_date_idx"),
+        ]
+        verbose_name = "班表異動"
+        verbose_name_plural = "班表異動"
+
+    def __str__(self):
+        return f"#{self.id} {self.get_action_display()} {self.shift_id} {self.date}"
@@ -0,0 +1,1142 @@
+const timelineConfig = document.currentScript.dataset;
+const shiftCreateUrl = timelineConfig.shiftCreateUrl;
+const shiftUpdateUrl = timelineConfig.shiftUpdateUrl;
+const shiftDeleteUrl = timelineConfig.shiftDeleteUrl;
+const allowedEmployeeId = timelineConfig.allowedEmployeeId || "";
+const canEditOwnOnly = timelineConfig.canEditOwnOnly === "True";
+const canManageStore = timelineConfig.canManageStore === "True";
+const readOnly = timelineConfig.readOnly === "True";
+const timelineView = timelineConfig.view;
+const todayStr = timelineConfig.today || "";
+const breakRules = JSON.parse(document.getElementById("breakRulesData").textContent || "[]");
+const shiftRevertUrl = timelineConfig.shiftRevertUrl || "";
+const changesUrl = timelineConfig.changesUrl || "";
+const changesStart = timelineConfig.changesStart || "";
+const changesEnd = timelineConfig.changesEnd || "";
+let changesCursor = Number(timelineConfig.changesCursor || 0);
+// 遊標之後的異動伺服器每次都會重讀，已套用的 id 記在這裡
+const appliedChanges = new Set();
+let changesSeen = changesCursor;
+// 可編輯時由下方設定：新加入頁面的班別綁定點擊事件、通知開啟中的編輯視窗
+let bindShiftLine = null;
+let onShiftChanged = null;
+const rememberScroll = () => {
+    try {
+        sessionStorage.setItem("timelineScrollY", String(window.scrollY || 0));
+        const weekScroll = document.querySelector(".week-scroll");
+        const monthScroll = document.querySelector(".month-scroll");
+        if (weekScroll) {
+            sessionStorage.setItem("timelineWeekScrollTop", String(weekScroll.scrollTop || 0));
+        }
+        if (monthScroll) {
+            sessionStorage.setItem("timelineMonthScrollTop", String(monthScroll.scrollTop || 0));
+        }
+    } catch (e) {}
+};
+const restoreScroll = () => {
+    try {
+        const stored = sessionStorage.getItem("timelineScrollY");
+        const weekStored = sessionStorage.getItem("timelineWeekScrollTop");
+        const monthStored = sessionStorage.getItem("timelineMonthScrollTop");
+        sessionStorage.removeItem("timelineScrollY");
+        sessionStorage.removeItem("timelineWeekScrollTop");
+        sessionStorage.removeItem("timelineMonthScrollTop");
+        if (stored !== null) {
+            const y = parseInt(stored, 10);
+            if (!Number.isNaN(y)) {
+                window.scrollTo(0, y);
+            }
+        }
+        const weekScroll = document.querySelector(".week-scroll");
+        if (weekScroll && weekStored !== null) {
+            const top = parseInt(weekStored, 10);
+            if (!Number.isNaN(top)) {
+                weekScroll.scrollTop = top;
+            }
+        }
+        const monthScroll = document.querySelector(".month-scroll");
+        if (monthScroll && monthStored !== null) {
+            const top = parseInt(monthStored, 10);
+            if (!Number.isNaN(top)) {
+                monthScroll.scrollTop = top;
+            }
+        }
+    } catch (e) {}
+};
+window.addEventListener("load", () => {
+    setTimeout(restoreScroll, 0);
+});
+const canEditAssignedShift = (el) => {
+    if (canManageStore) return true;
+    const storeId = (el.dataset.storeId || "").trim().toLowerCase();
+    const storeName = (el.dataset.storeName || "").trim();
+    if (storeName) return false;
+    return !storeId || storeId === "none" || storeId === "null" || storeId === "0";
+};
+let activeCreateTarget = null;
+const setCreateTarget = (el) => {
+    if (activeCreateTarget) {
+        activeCreateTarget.classList.remove("create-target");
+    }
+    activeCreateTarget = el || null;
+    if (activeCreateTarget) {
+        activeCreateTarget.classList.add("create-target");
+    }
+};
+const clearCreateTarget = () => {
+    if (activeCreateTarget) {
+        activeCreateTarget.classList.remove("create-target");
+        activeCreateTarget = null;
+    }
+};
+const canEditEmployee = (employeeId) => {
+    if (!canEditOwnOnly) return true;
+    if (!allowedEmployeeId) return false;
+    return String(employeeId) === String(allowedEmployeeId);
+};
+if (!readOnly) {
+    function buildTimeOptions(selectEl) {
+        const pad = (value) => String(value).padStart(2, "0");
+        selectEl.innerHTML = "";
+        for (let hour = 8; hour <= 23; hour += 1) {
+            const label = pad(hour);
+            const opt = document.createElement("option");
+            opt.value = label;
+            opt.textContent = label;
+            selectEl.appendChild(opt);
+        }
+    }
+
+    function buildMinuteOptions(selectEl) {
+        selectEl.innerHTML = "";
+        ["00", "15", "30", "45"].forEach((minute) => {
+            const opt = document.createElement("option");
+            opt.value = minute;
+            opt.textContent = minute;
+            selectEl.appendChild(opt);
+        });
+    }
+
+    function buildBreakOptions(selectEl) {
+        selectEl.innerHTML = "";
+        [0, 30, 60, 90, 120].forEach((minutes) => {
+            const opt = document.createElement("option");
+            const hours = String(Math.floor(minutes / 60)).padStart(2, "0");
+            const mins = String(minutes % 60).padStart(2, "0");
+            opt.value = String(minutes);
+            opt.textContent = `${hours}:${mins}`;
+            selectEl.appendChild(opt);
+        });
+    }
+
+    buildTimeOptions(document.getElementById("m-start-hour"));
+    buildTimeOptions(document.getElementById("m-end-hour"));
+    buildMinuteOptions(document.getElementById("m-start-minute"));
+    buildMinuteOptions(document.getElementById("m-end-minute"));
+    const breakSelect = document.getElementById("m-break");
+    if (breakSelect) {
+        buildBreakOptions(breakSelect);
+        breakSelect.addEventListener("change", () => {
+            manualBreakOverride = true;
+        });
+    }
+    ["m-start-hour", "m-start-minute", "m-end-hour", "m-end-minute"].forEach((id) => {
+        const el = document.getElementById(id);
+        if (el) {
+            el.addEventListener("change", updateBreakFromTimes);
+        }
+    });
+    if (canManageStore) {
+        buildTimeOptions(document.getElementById("m-split-start-hour"));
+        buildTimeOptions(document.getElementById("m-split-end-hour"));
+        buildMinuteOptions(document.getElementById("m-split-start-minute"));
+        buildMinuteOptions(document.getElementById("m-split-end-minute"));
+    }
+
+    const splitToggle = document.getElementById("m-split-toggle");
+    const splitSection = document.getElementById("m-split-section");
+    if (canManageStore && splitToggle && splitSection) {
+        splitToggle.addEventListener("change", () => {
+            splitSection.classList.toggle("d-none", !splitToggle.checked);
+        });
+    }
+
+    function setModalMode(mode) {
+        const deleteBtn = document.getElementById("deleteShiftBtn");
+        const updateBtn = document.getElementById("updateShiftBtn");
+        const createBtn = document.getElementById("createShiftBtn");
+        const titleEl = document.getElementById("shiftModalTitle");
+        hideAlert();
+
+        if (mode === "create") {
+            deleteBtn.classList.add("d-none");
+            updateBtn.classList.add("d-none");
+            createBtn.classList.remove("d-none");
+            titleEl.textContent = "新增班表";
+            return;
+        }
+
+        deleteBtn.classList.remove("d-none");
+        updateBtn.classList.remove("d-none");
+        createBtn.classList.add("d-none");
+        titleEl.textContent = "排班資訊";
+    }
+
+    function timeToMinutes(timeStr) {
+        const [h, m] = timeStr.split(":").map(Number);
+        return (h * 60) + m;
+    }
+
+    function addHoursToTime(timeStr, hoursToAdd = 1) {
+        const total = timeToMinutes(timeStr) + (hoursToAdd * 60);
+        const minutes = ((total % (24 * 60)) + (24 * 60)) % (24 * 60);
+        const h = String(Math.floor(minutes / 60)).padStart(2, "0");
+        const m = String(minutes % 60).padStart(2, "0");
+        return `${h}:${m}`;
+    }
+
+    function setTimeSelects(prefix, timeStr) {
+        const [hour, minute] = timeStr.split(":");
+        const hourEl = document.getElementById(`${prefix}-hour`);
+        const minuteEl = document.getElementById(`${prefix}-minute`);
+        if (!hourEl || !minuteEl) {
+            return;
+        }
+        hourEl.value = hour;
+        minuteEl.value = minute;
+    }
+
+    function getTimeValues() {
+        const startHour = document.getElementById("m-start-hour").value;
+        const startMinute = document.getElementById("m-start-minute").value;
+        const endHour = document.getElementById("m-end-hour").value;
+        const endMinute = document.getElementById("m-end-minute").value;
+        if (!startHour || !startMinute || !endHour || !endMinute) {
+            showAlert("請選擇開始與結束時間。");
+            return null;
+        }
+        const startValue = `${startHour}:${startMinute}`;
+        const endValue = `${endHour}:${endMinute}`;
+        if (timeToMinutes(endValue) <= timeToMinutes(startValue)) {
+            showAlert("結束時間需晚於開始時間。");
+            return null;
+        }
+        return { startValue, endValue };
+    }
+
+    function getBreakValue() {
+        const breakEl = document.getElementById("m-break");
+        if (!breakEl) {
+            return 0;
+        }
+        const value = parseInt(breakEl.value || "0", 10);
+        return Number.isNaN(value) ? 0 : value;
+    }
+
+    function getDefaultBreakMinutes(startValue, endValue) {
+        const duration = timeToMinutes(endValue) - timeToMinutes(startValue);
+        if (duration <= 0 || !Array.isArray(breakRules)) {
+            return 0;
+        }
+        let result = 0;
+        breakRules.forEach((rule) => {
+            const threshold = Number(rule.min_hours) * 60;
+            const minutes = Number(rule.break_minutes);
+            if (!Number.isNaN(threshold) && !Number.isNaN(minutes) && duration >= threshold) {
+                result = Math.max(result, minutes);
+            }
+        });
+        return result;
+    }
+
+    let manualBreakOverride = false;
+
+    function updateBreakFromTimes() {
+        const breakEl = document.getElementById("m-break");
+        if (!breakEl) {
+            return;
+        }
+        if (manualBreakOverride) {
+            return;
+        }
+        const startHour = document.getElementById("m-start-hour").value;
+        const startMinute = document.getElementById("m-start-minute").value;
+        const endHour = document.getElementById("m-end-hour").value;
+        const endMinute = document.getElementById("m-end-minute").value;
+        if (!startHour || !startMinute || !endHour || !endMinute) {
+            breakEl.value = "0";
+            return;
+        }
+        const startValue = `${startHour}:${startMinute}`;
+        const endValue = `${endHour}:${endMinute}`;
+        breakEl.value = String(getDefaultBreakMinutes(startValue, endValue));
+    }
+
+    function getStoreValue() {
+        if (!canManageStore) {
+            return null;
+        }
+        const storeEl = document.getElementById("m-store");
+        if (!storeEl) {
+            showAlert("請選擇店別。");
+            return null;
+        }
+        return storeEl.value;
+    }
+
+    function getSplitValues() {
+        if (!canManageStore || !splitToggle || !splitToggle.checked) {
+            return null;
+        }
+        const startHour = document.getElementById("m-split-start-hour").value;
+        const startMinute = document.getElementById("m-split-start-minute").value;
+        const endHour = document.getElementById("m-split-end-hour").value;
+        const endMinute = document.getElementById("m-split-end-minute").value;
+        const storeEl = document.getElementById("m-split-store");
+        if (!startHour || !startMinute || !endHour || !endMinute || !storeEl || !storeEl.value) {
+            showAlert("請填寫分段時間與店別。");
+            return null;
+        }
+        const startValue = `${startHour}:${startMinute}`;
+        const endValue = `${endHour}:${endMinute}`;
+        if (timeToMinutes(endValue) <= timeToMinutes(startValue)) {
+            showAlert("分段結束時間需晚於開始時間。");
+            return null;
+        }
+        return { startValue, endValue, storeId: storeEl.value };
+    }
+
+    function openShiftModal(el) {
+        clearCreateTarget();
+        setModalMode("edit");
+        document.getElementById("m-id").value = el.dataset.id;
+        document.getElementById("m-employee").innerText = el.dataset.employee;
+        document.getElementById("m-date").innerText = el.dataset.date;
+        document.getElementById("m-employee-id").value = el.dataset.employeeId || "";
+        document.getElementById("m-date-hidden").value = el.dataset.date;
+        setTimeSelects("m-start", el.dataset.start);
+        setTimeSelects("m-end", el.dataset.end);
+        manualBreakOverride = false;
+        const breakEl = document.getElementById("m-break");
+        if (breakEl) {
+            breakEl.value = el.dataset.breakMinutes || "0";
+        }
+        const noteEl = document.getElementById("m-note");
+        if (noteEl) {
+            noteEl.value = el.dataset.note || "";
+        }
+        const storeEl = document.getElementById("m-store");
+        if (storeEl) {
+            storeEl.value = el.dataset.storeId || "";
+        }
+        const splitStoreEl = document.getElementById("m-split-store");
+        if (splitStoreEl) {
+            splitStoreEl.value = el.dataset.storeId || "";
+        }
+        setTimeSelects("m-split-start", el.dataset.end);
+        setTimeSelects("m-split-end", addHoursToTime(el.dataset.end, 1));
+        if (splitToggle && splitSection) {
+            splitToggle.checked = false;
+            splitSection.classList.add("d-none");
+        }
+        hideAlert();
+        bootstrap.Modal.getOrCreateInstance(document.getElementById("shiftModal")).show();
+    }
+
+    function openCreateModal(payload) {
+        clearCreateTarget();
+        setModalMode("create");
+        document.getElementById("m-id").value = "";
+        document.getElementById("m-employee").innerText = payload.employeeName;
+        document.getElementById("m-date").innerText = payload.dateStr;
+        document.getElementById("m-employee-id").value = payload.employeeId;
+        document.getElementById("m-date-hidden").value = payload.dateStr;
+        setTimeSelects("m-start", payload.startValue);
+        setTimeSelects("m-end", payload.endValue);
+        manualBreakOverride = false;
+        updateBreakFromTimes();
+        const noteEl = document.getElementById("m-note");
+        if (noteEl) {
+            noteEl.value = "";
+        }
+        const storeEl = document.getElementById("m-store");
+        if (storeEl && storeEl.options.length) {
+            const firstReal = Array.from(storeEl.options).find((opt) => opt.value);
+            storeEl.value = firstReal ? firstReal.value : "";
+        }
+        const splitStoreEl = document.getElementById("m-split-store");
+        if (splitStoreEl) {
+            splitStoreEl.value = storeEl ? storeEl.value : "";
+        }
+        if (canManageStore && splitToggle && splitSection) {
+            splitToggle.checked = false;
+            splitSection.classList.add("d-none");
+        }
+        hideAlert();
+        bootstrap.Modal.getOrCreateInstance(document.getElementById("shiftModal")).show();
+    }
+
+    function showAlert(message) {
+        const alertBox = document.getElementById("shiftAlert");
+        if (!alertBox) return;
+        alertBox.textContent = message;
+        alertBox.classList.remove("d-none");
+    }
+
+    function showViewAlert(message) {
+        const alertBox = document.getElementById("shiftViewAlert");
+        if (!alertBox) return;
+        alertBox.textContent = message;
+        alertBox.classList.remove("d-none");
+    }
+
+    function hideAlert() {
+        const alertBox = document.getElementById("shiftAlert");
+        if (!alertBox) return;
+        alertBox.textContent = "";
+        alertBox.classList.add("d-none");
+    }
+
+    bindShiftLine = (block) => {
+        block.addEventListener("mouseenter", function() {
+            const grid = this.closest(".timeline-grid");
+            if (grid) {
+                grid.classList.add("no-grid-outline");
+            }
+            const cell = this.closest(".shift-cell");
+            if (cell) {
+                cell.classList.add("no-cell-outline");
+            }
+        });
+        block.addEventListener("mouseleave", function() {
+            const grid = this.closest(".timeline-grid");
+            if (grid) {
+                grid.classList.remove("no-grid-outline");
+            }
+            const cell = this.closest(".shift-cell");
+            if (cell) {
+                cell.classList.remove("no-cell-outline");
+            }
+        });
+        block.addEventListener("click", function(e) {
+            e.stopPropagation();
+            if (!canEditEmployee(this.dataset.employeeId)) {
+                return;
+            }
+            if (!canEditAssignedShift(this)) {
+                showViewAlert("店長排定班表不可修改");
+                return;
+            }
+            openShiftModal(this);
+        });
+    };
+    document.querySelectorAll(".shift-block, .shift-line").forEach(bindShiftLine);
+
+    onShiftChanged = (change, line) => {
+        const modalEl = document.getElementById("shiftModal");
+        if (!modalEl || !modalEl.classList.contains("show")) return;
+        if (document.getElementById("m-id").value !== String(change.shift_id)) return;
+        if (line) {
+            openShiftModal(line);
+            showAlert("此班別剛被其他人修改，已載入最新內容。");
+        } else {
+            showAlert("此班別已被其他人刪除或移出目前的畫面。");
+        }
+    };
+
+    // 每個項目是一次操作產生的異動 id；復原與重做都是把該次異動反向套用，伺服器回傳新的異動 id
+    const undoStack = [];
+    const redoStack = [];
+    const undoBtn = document.getElementById("undoShiftBtn");
+    const redoBtn = document.getElementById("redoShiftBtn");
+    let reverting = false;
+
+    const updateUndoButtons = () => {
+        if (undoBtn) undoBtn.disabled = reverting || !undoStack.length;
+        if (redoBtn) redoBtn.disabled = reverting || !redoStack.length;
+    };
+
+    const recordUndo = (changeIds) => {
+        if (!changeIds || !changeIds.length) return;
+        undoStack.push(changeIds);
+        redoStack.length = 0;
+        updateUndoButtons();
+    };
+
+    const revertChanges = (fromStack, toStack) => {
+        if (reverting || !shiftRevertUrl || !fromStack.length) return;
+        reverting = true;
+        const changeIds = fromStack.pop();
+        updateUndoButtons();
+        fetch(shiftRevertUrl, {
+            method: "POST",
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({ change_ids: changeIds })
+        })
+        .then(async (r) => {
+            const data = await r.json().catch(() => ({}));
+            if (!r.ok || data.ok === false) {
+                throw new Error(data.error || "復原失敗，請稍後再試。");
+            }
+            return data;
+        })
+        .then((data) => {
+            toStack.push(data.change_ids);
+            refreshAfterEdit();
+        })
+        .catch((err) => showViewAlert(err.message || "復原失敗，請稍後再試。"))
+        .finally(() => {
+            reverting = false;
+            updateUndoButtons();
+        });
+    };
+
+    if (undoBtn) undoBtn.addEventListener("click", () => revertChanges(undoStack, redoStack));
+    if (redoBtn) redoBtn.addEventListener("click", () => revertChanges(redoStack, undoStack));
+    document.addEventListener("keydown", (e) => {
+        if (!(e.ctrlKey || e.metaKey) || e.altKey) return;
+        if (e.target.closest("input, textarea, select, .modal")) return;
+        const key = e.key.toLowerCase();
+        if (key === "z" && !e.shiftKey) {
+            e.preventDefault();
+            revertChanges(undoStack, redoStack);
+        } else if (key === "y" || (key === "z" && e.shiftKey)) {
+            e.preventDefault();
+            revertChanges(redoStack, undoStack);
+        }
+    });
+
+    document.getElementById("deleteShiftBtn").addEventListener("click", function() {
+        fetch(shiftDeleteUrl, {
+            method: "POST",
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({ id: document.getElementById("m-id").value })
+        })
+        .then(async (r) => {
+            const data = await r.json().catch(() => ({}));
+            if (!r.ok || data.ok === false) {
+                throw new Error(data.error || "刪除失敗");
+            }
+            return data;
+        })
+        .then((data) => {
+            const modalEl = document.getElementById("shiftModal");
+            const modal = bootstrap.Modal.getInstance(modalEl);
+            if (modal) modal.hide();
+            document.getElementById("m-id").value = "";
+            recordUndo(data.change_ids);
+            refreshAfterEdit();
+        })
+        .catch((err) => showAlert(err.message || "刪除失敗，請稍後再試。"));
+    });
+
+    document.getElementById("updateShiftBtn").addEventListener("click", function() {
+        const timeValues = getTimeValues();
+        if (!timeValues) {
+            return;
+        }
+        const payload = {
+            id: document.getElementById("m-id").value,
+            start: timeValues.startValue,
+            end: timeValues.endValue,
+            break_minutes: getBreakValue(),
+        };
+        if (canManageStore) {
+            const storeId = getStoreValue();
+            if (!storeId) {
+                payload.store_id = null;
+            } else {
+                payload.store_id = storeId;
+            }
+            const splitValues = getSplitValues();
+            if (splitToggle && splitToggle.checked && !splitValues) {
+                return;
+            }
+            payload.split_start = splitValues ? splitValues.startValue : null;
+            payload.split_end = splitValues ? splitValues.endValue : null;
+            payload.split_store_id = splitValues ? splitValues.storeId : null;
+            const noteEl = document.getElementById("m-note");
+            if (noteEl) {
+                payload.note = noteEl.value.trim();
+            }
+        }
+        fetch(shiftUpdateUrl, {
+            method: "POST",
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(payload)
+        })
+        .then(async (r) => {
+            const data = await r.json().catch(() => ({}));
+            if (!r.ok || data.ok === false) {
+                throw new Error(data.error || "更新失敗，請稍後再試。");
+            }
+            return data;
+        })
+        .then((data) => {
+            const modalEl = document.getElementById("shiftModal");
+            const modal = bootstrap.Modal.getInstance(modalEl);
+            if (modal) modal.hide();
+            document.getElementById("m-id").value = "";
+            recordUndo(data.change_ids);
+            refreshAfterEdit();
+        })
+        .catch((err) => showAlert(err.message || "更新失敗，請稍後再試。"));
+    });
+
+    document.getElementById("createShiftBtn").addEventListener("click", function() {
+        const timeValues = getTimeValues();
+        if (!timeValues) {
+            return;
+        }
+        const payload = {
+            employee_id: document.getElementById("m-employee-id").value,
+            date: document.getElementById("m-date-hidden").value,
+            start: timeValues.startValue,
+            end: timeValues.endValue,
+            break_minutes: getBreakValue(),
+        };
+        if (canManageStore) {
+            const storeId = getStoreValue();
+            if (!storeId) {
+                payload.store_id = null;
+            } else {
+                payload.store_id = storeId;
+            }
+            const noteEl = document.getElementById("m-note");
+            if (noteEl) {
+                payload.note = noteEl.value.trim();
+            }
+        }
+        fetch(shiftCreateUrl, {
+            method: "POST",
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(payload)
+        })
+        .then(async (r) => {
+            const data = await r.json().catch(() => ({}));
+            if (!r.ok || data.ok === false) {
+                throw new Error(data.error || "新增失敗，請稍後再試。");
+            }
+            return data;
+        })
+        .then((data) => {
+            const modalEl = document.getElementById("shiftModal");
+            const modal = bootstrap.Modal.getInstance(modalEl);
+            if (modal) modal.hide();
+            document.getElementById("m-id").value = "";
+            recordUndo(data.change_ids);
+            refreshAfterEdit();
+        })
+        .catch((err) => showAlert(err.message || "新增失敗，請稍後再試。"));
+    });
+
+    const defaultStart = "08:00";
+    const defaultEnd = "08:15";
+
+    document.querySelectorAll(".timeline-grid").forEach(grid => {
+        grid.addEventListener("click", function(e) {
+            if (e.target.closest(".shift-block")) {
+                return;
+            }
+            const row = this.closest(".timeline-row");
+            if (!row) {
+                return;
+            }
+            if (!canEditEmployee(row.dataset.employeeId)) {
+                return;
+            }
+            setCreateTarget(this);
+            openCreateModal({
+                employeeName: row.dataset.employeeName,
+                employeeId: row.dataset.employeeId,
+                dateStr: this.dataset.date,
+                startValue: defaultStart,
+                endValue: defaultEnd
+            });
+        });
+    });
+
+    document.querySelectorAll(".shift-cell").forEach(cell => {
+        cell.addEventListener("click", function(e) {
+            if (e.target.closest(".shift-line")) {
+                return;
+            }
+            if (!canEditEmployee(this.dataset.employeeId)) {
+                return;
+            }
+            setCreateTarget(this);
+            openCreateModal({
+                employeeName: this.dataset.employeeName,
+                employeeId: this.dataset.employeeId,
+                dateStr: this.dataset.date,
+                startValue: defaultStart,
+                endValue: defaultEnd
+            });
+        });
+    });
+
+    const shiftModalEl = document.getElementById("shiftModal");
+    if (shiftModalEl) {
+        shiftModalEl.addEventListener("hidden.bs.modal", () => {
+            clearCreateTarget();
+        });
+    }
+}
+
+const dateInput = document.getElementById("dateInput");
+if (dateInput) {
+    const syncDateInputFromUrl = () => {
+        const params = new URLSearchParams(window.location.search);
+        const urlDate = params.get("date");
+        if (urlDate) {
+            dateInput.value = urlDate;
+        }
+    };
+    syncDateInputFromUrl();
+    window.addEventListener("popstate", syncDateInputFromUrl);
+    window.addEventListener("pageshow", syncDateInputFromUrl);
+    dateInput.addEventListener("change", function() {
+        this.form.submit();
+    });
+}
+
+const showEmptyRowsInput = document.getElementById("showEmptyRows");
+if (showEmptyRowsInput) {
+    showEmptyRowsInput.addEventListener("change", function() {
+        this.form.submit();
+    });
+}
+
+const monthInput = document.getElementById("monthInput");
+if (monthInput) {
+    const syncMonthInputFromUrl = () => {
+        const params = new URLSearchParams(window.location.search);
+        const urlMonth = params.get("month");
+        if (urlMonth) {
+            monthInput.value = urlMonth;
+        }
+    };
+    syncMonthInputFromUrl();
+    window.addEventListener("popstate", syncMonthInputFromUrl);
+    window.addEventListener("pageshow", syncMonthInputFromUrl);
+    monthInput.addEventListener("change", function() {
+        this.form.submit();
+    });
+}
+
+const storeInputs = document.querySelectorAll("input[name=\"store\"]");
+const selectAllInput = document.getElementById("storeSelectAll");
+const storeFilterKey = "timelineStoreFilter";
+const readStoreFilter = () => {
+    try {
+        const raw = sessionStorage.getItem(storeFilterKey);
+        if (!raw) return null;
+        const parsed = JSON.parse(raw);
+        return Array.isArray(parsed) ? parsed : null;
+    } catch (err) {
+        return null;
+    }
+};
+const persistStoreFilter = () => {
+    const values = Array.from(storeInputs)
+        .filter((input) => input.checked)
+        .map((input) => input.value);
+    sessionStorage.setItem(storeFilterKey, JSON.stringify(values));
+};
+const updateShiftCellHeights = () => {
+    document.querySelectorAll(".shift-cell").forEach((cell) => {
+        const visibleCount = Array.from(cell.querySelectorAll(".shift-line"))
+            .filter((line) => !line.classList.contains("d-none"))
+            .length;
+        cell.classList.toggle("shift-cell-expand", visibleCount > 2);
+    });
+};
+const applyStoreFilter = () => {
+    const values = Array.from(storeInputs)
+        .filter((input) => input.checked)
+        .map((input) => input.value);
+    const showAll = values.length === 0;
+    const allowUnassigned = values.includes("unassigned");
+    const storeSet = new Set(values.filter((v) => v !== "unassigned"));
+
+    document.querySelectorAll(".shift-block, .shift-line").forEach((el) => {
+        const storeId = (el.dataset.storeId || "").trim().toLowerCase();
+        const storeName = (el.dataset.storeName || "").trim();
+        const isUnassigned = !storeName && (!storeId || storeId === "none" || storeId === "null" || storeId === "0");
+        const match = showAll
+            || (!isUnassigned && storeSet.has(storeId))
+            || (isUnassigned && allowUnassigned);
+        el.classList.toggle("d-none", !match);
+    });
+
+    document.querySelectorAll(".shift-cell").forEach((cell) => {
+        const visible = cell.querySelector(".shift-line:not(.d-none)");
+        let placeholder = cell.querySelector(".row-empty");
+        if (!visible) {
+            if (!placeholder) {
+                placeholder = document.createElement("span");
+                placeholder.className = "row-empty";
+                placeholder.textContent = "—";
+                cell.appendChild(placeholder);
+            }
+            placeholder.classList.remove("d-none");
+        } else if (placeholder) {
+            placeholder.classList.add("d-none");
+        }
+    });
+
+    const allowEmptyRows = showEmptyRowsInput && showEmptyRowsInput.checked;
+    document.querySelectorAll(".timeline-row").forEach((row) => {
+        if (allowEmptyRows) {
+            row.classList.remove("d-none");
+            return;
+        }
+        const visible = row.querySelector(".shift-block:not(.d-none), .shift-line:not(.d-none)");
+        row.classList.toggle("d-none", !visible);
+    });
+    document.querySelectorAll(".week-table tbody tr, .month-table tbody tr").forEach((row) => {
+        if (allowEmptyRows) {
+            row.classList.remove("d-none");
+            return;
+        }
+        const visible = row.querySelector(".shift-line:not(.d-none)");
+        row.classList.toggle("d-none", !visible);
+    });
+
+    updateShiftCellHeights();
+};
+
+if (storeInputs.length) {
+    const storedValues = readStoreFilter();
+    if (storedValues) {
+        storeInputs.forEach((input) => {
+            input.checked = storedValues.includes(input.value);
+        });
+    }
+    const updateSelectAll = () => {
+        if (!selectAllInput) return;
+        const checkedCount = document.querySelectorAll("input[name=\"store\"]:checked").length;
+        if (checkedCount === 0) {
+            selectAllInput.checked = true;
+            selectAllInput.indeterminate = false;
+            return;
+        }
+        if (checkedCount === storeInputs.length) {
+            selectAllInput.checked = true;
+            selectAllInput.indeterminate = false;
+            return;
+        }
+        selectAllInput.checked = false;
+        selectAllInput.indeterminate = true;
+    };
+    updateSelectAll();
+    applyStoreFilter();
+    updateShiftCellHeights();
+    persistStoreFilter();
+    storeInputs.forEach((input) => {
+        input.addEventListener("change", function() {
+            updateSelectAll();
+            applyStoreFilter();
+            persistStoreFilter();
+        });
+    });
+    if (selectAllInput) {
+        selectAllInput.addEventListener("change", function() {
+            storeInputs.forEach((input) => {
+                input.checked = selectAllInput.checked;
+            });
+            updateSelectAll();
+            applyStoreFilter();
+            persistStoreFilter();
+        });
+    }
+}
+
+updateShiftCellHeights();
+
+const prevBtn = document.getElementById("prevBtn");
+const nextBtn = document.getElementById("nextBtn");
+const todayBtn = document.getElementById("todayBtn");
+const dayLinks = document.querySelectorAll("[data-day-link]");
+
+function toDateParts(dateStr) {
+    const [y, m, d] = dateStr.split("-").map(Number);
+    return {y, m, d};
+}
+
+function formatDate(dateObj) {
+    const y = dateObj.getFullYear();
+    const m = String(dateObj.getMonth() + 1).padStart(2, "0");
+    const d = String(dateObj.getDate()).padStart(2, "0");
+    return `${y}-${m}-${d}`;
+}
+
+if (prevBtn && nextBtn) {
+    prevBtn.addEventListener("click", function() {
+        if (monthInput) {
+            const [y, m] = monthInput.value.split("-").map(Number);
+            const dt = new Date(y, m - 2, 1);
+            monthInput.value = `${dt.getFullYear()}-${String(dt.getMonth() + 1).padStart(2, "0")}`;
+            monthInput.form.submit();
+            return;
+        }
+
+        const current = document.getElementById("dateInput").value;
+        if (!current) return;
+        const {y, m, d} = toDateParts(current);
+        const dt = new Date(y, m - 1, d);
+        if (timelineView === "week") {
+            dt.setDate(dt.getDate() - 7);
+        } else {
+            dt.setDate(dt.getDate() - 1);
+        }
+        document.getElementById("dateInput").value = formatDate(dt);
+        document.getElementById("dateInput").form.submit();
+    });
+
+    nextBtn.addEventListener("click", function() {
+        if (monthInput) {
+            const [y, m] = monthInput.value.split("-").map(Number);
+            const dt = new Date(y, m, 1);
+            monthInput.value = `${dt.getFullYear()}-${String(dt.getMonth() + 1).padStart(2, "0")}`;
+            monthInput.form.submit();
+            return;
+        }
+
+        const current = document.getElementById("dateInput").value;
+        if (!current) return;
+        const {y, m, d} = toDateParts(current);
+        const dt = new Date(y, m - 1, d);
+        if (timelineView === "week") {
+            dt.setDate(dt.getDate() + 7);
+        } else {
+            dt.setDate(dt.getDate() + 1);
+        }
+        document.getElementById("dateInput").value = formatDate(dt);
+        document.getElementById("dateInput").form.submit();
+    });
+}
+
+if (todayBtn) {
+    todayBtn.addEventListener("click", function() {
+        if (monthInput) {
+            const today = todayStr;
+            if (today) {
+                const [y, m] = today.split("-").map(Number);
+                monthInput.value = `${y}-${String(m).padStart(2, "0")}`;
+                monthInput.form.submit();
+            }
+            return;
+        }
+        const dateInput = document.getElementById("dateInput");
+        if (!dateInput) return;
+        dateInput.value = todayStr;
+        dateInput.form.submit();
+    });
+}
+
+if (dayLinks.length) {
+    dayLinks.forEach((link) => {
+        link.addEventListener("click", function(event) {
+            event.preventDefault();
+            const date = this.dataset.date;
+            if (!date) return;
+            const url = new URL(window.location.href);
+            url.searchParams.set("view", "day");
+            url.searchParams.set("date", date);
+            url.searchParams.delete("month");
+            window.location.href = url.toString();
+        });
+    });
+}
+
+const minutesOf = (timeStr) => {
+    const [h, m] = String(timeStr || "0:0").split(":").map(Number);
+    return h * 60 + m;
+};
+
+const serverStoreFilter = new URLSearchParams(window.location.search).getAll("store");
+const matchesServerStoreFilter = (shift) => {
+    if (!serverStoreFilter.length) return true;
+    if (!shift.store_id) return serverStoreFilter.includes("unassigned");
+    return serverStoreFilter.includes(String(shift.store_id));
+};
+
+const buildShiftLine = (shift, cell) => {
+    const el = document.createElement("span");
+    el.className = "shift-line";
+    Object.assign(el.dataset, {
+        id: String(shift.id),
+        employee: cell.dataset.employeeName || "",
+        employeeId: String(shift.employee_id),
+        date: shift.date,
+        start: shift.start,
+        end: shift.end,
+        note: shift.note || "",
+        breakMinutes: String(shift.break_minutes || 0),
+        storeId: shift.store_id ? String(shift.store_id) : "",
+        storeName: shift.store_name || "",
+    });
+    el.title = shift.note || "";
+    el.style.setProperty("--shift-bg", shift.store_color);
+    el.style.setProperty("--shift-fg", shift.store_text_color);
+    if (timelineView === "month") {
+        el.textContent = `${shift.start}-${shift.end} ${shift.store_name || ""}`.trim();
+    } else {
+        el.textContent = `${shift.start}–${shift.end}${shift.store_name ? ` ${shift.store_name}` : ""}`;
+    }
+    return el;
+};
+
+const refreshShiftCell = (cell) => {
+    const hasShift = Boolean(cell.querySelector(".shift-line"));
+    cell.classList.toggle("shift-cell-empty", !hasShift);
+    let placeholder = cell.querySelector(".row-empty");
+    if (hasShift && placeholder) {
+        placeholder.remove();
+    } else if (!hasShift && !placeholder) {
+        placeholder = document.createElement("span");
+        placeholder.className = "row-empty";
+        placeholder.textContent = "—";
+        cell.appendChild(placeholder);
+    }
+};
+
+const refreshScheduledHours = (row) => {
+    const hoursEl = row && row.querySelector(".hours-cell span");
+    if (!hoursEl) return;
+    let total = 0;
+    row.querySelectorAll(".shift-line").forEach((line) => {
+        if (!line.dataset.storeId) return;
+        let minutes = minutesOf(line.dataset.end) - minutesOf(line.dataset.start);
+        if (minutes <= 0) minutes += 24 * 60;
+        total += minutes;
+    });
+    const pad = (value) => String(value).padStart(2, "0");
+    hoursEl.textContent = `${pad(Math.floor(total / 60))}:${pad(total % 60)}`;
+};
+
+// 套用一筆班別異動；班別應顯示但畫面上沒有對應的格子（例如該員工的列未顯示）時回傳 false
+const applyScheduleChange = (change) => {
+    const touched = new Set();
+    document.querySelectorAll(`.shift-line[data-id="${change.shift_id}"]`).forEach((el) => {
+        touched.add(el.closest(".shift-cell"));
+        el.remove();
+    });
+    const shift = change.shift;
+    let line = null;
+    let placed = true;
+    if (change.action !== "delete" && shift && shift.is_published && matchesServerStoreFilter(shift)) {
+        const cell = document.querySelector(
+            `.shift-cell[data-employee-id="${shift.employee_id}"][data-date="${shift.date}"]`
+        );
+        if (cell) {
+            line = buildShiftLine(shift, cell);
+            const next = Array.from(cell.querySelectorAll(".shift-line"))
+                .find((el) => minutesOf(el.dataset.start) > minutesOf(shift.start));
+            cell.insertBefore(line, next || cell.querySelector(".row-empty"));
+            if (bindShiftLine) bindShiftLine(line);
+            touched.add(cell);
+        } else {
+            placed = false;
+        }
+    }
+    touched.forEach((cell) => {
+        if (!cell) return;
+        refreshShiftCell(cell);
+        refreshScheduledHours(cell.closest("tr"));
+    });
+    if (onShiftChanged) onShiftChanged(change, line);
+    return placed;
+};
+
+const fetchScheduleChanges = () => {
+    const params = new URLSearchParams({
+        after: String(changesCursor),
+        seen: String(changesSeen),
+        start: changesStart,
+        end: changesEnd,
+    });
+    return fetch(`${changesUrl}?${params}`, { headers: { "Accept": "application/json" } })
+        .then(async (r) => {
+            const data = await r.json().catch(() => ({}));
+            if (!r.ok || data.ok === false) {
+                throw new Error(data.error || "無法取得班表異動");
+            }
+            let allPlaced = true;
+            data.changes.forEach((change) => {
+                // 重讀或同時有兩個請求時，已經套用過
+                if (change.id <= changesCursor || appliedChanges.has(change.id)) return;
+                allPlaced = applyScheduleChange(change) && allPlaced;
+                appliedChanges.add(change.id);
+                changesSeen = Math.max(changesSeen, change.id);
+            });
+            changesCursor = Math.max(changesCursor, data.cursor);
+            appliedChanges.forEach((id) => {
+                if (id <= changesCursor) appliedChanges.delete(id);
+            });
+            if (data.changes.length) {
+                if (storeInputs.length) {
+                    applyStoreFilter();
+                } else {
+                    updateShiftCellHeights();
+                }
+            }
+            return { allPlaced, retryMs: data.retry_ms };
+        });
+};
+
+const showStaleNotice = () => {
+    const alertBox = document.getElementById("shiftViewAlert");
+    if (!alertBox || alertBox.dataset.stale) return;
+    alertBox.dataset.stale = "1";
+    alertBox.textContent = "班表有新的異動，";
+    const link = document.createElement("a");
+    link.href = "#";
+    link.textContent = "重新整理";
+    link.addEventListener("click", (event) => {
+        event.preventDefault();
+        rememberScroll();
+        location.reload();
+    });
+    alertBox.append(link, "後即可看到。");
+    alertBox.classList.remove("d-none");
+};
+
+const refreshAfterEdit = () => {
+    const reload = () => {
+        rememberScroll();
+        location.reload();
+    };
+    if (!changesUrl) {
+        reload();
+        return;
+    }
+    fetchScheduleChanges()
+        .then((result) => {
+            if (!result.allPlaced) reload();
+        })
+        .catch(reload);
+};
+
+// 其他人（店長或員工）異動班別時就地更新；long-poll 時伺服器會等到有異動才回應
+const watchScheduleChanges = async () => {
+    const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+    while (true) {
+        let retryMs = 5000;
+        if (!document.hidden) {
+            try {
+                const result = await fetchScheduleChanges();
+                if (!result.allPlaced) showStaleNotice();
+                retryMs = result.retryMs;
+            } catch (err) {
+                retryMs = 10000;
+            }
+        }
+        await sleep(Math.max(retryMs, 500));
+    }
+};
+
+if (changesUrl && changesStart && changesEnd) {
+    watchScheduleChanges();
+}
@@ -0,0 +1,265 @@
+const availabilityUrls = document.currentScript.dataset;
+const alertBox = document.getElementById("availAlert");
+const successBox = document.getElementById("availSuccess");
+let availabilityData = JSON.parse(document.getElementById("availabilityData").textContent || "[]");
+const shiftData = JSON.parse(document.getElementById("shiftData").textContent || "[]");
+const availDayList = document.getElementById("availDayList");
+const modalAlert = document.getElementById("availModalAlert");
+
+function buildTimeOptions(selectEl) {
+  const pad = (value) => String(value).padStart(2, "0");
+  selectEl.innerHTML = "";
+  for (let hour = 8; hour <= 23; hour += 1) {
+    const opt = document.createElement("option");
+    opt.value = pad(hour);
+    opt.textContent = pad(hour);
+    selectEl.appendChild(opt);
+  }
+}
+
+function buildMinuteOptions(selectEl) {
+  selectEl.innerHTML = "";
+  ["00", "15", "30", "45"].forEach((minute) => {
+    const opt = document.createElement("option");
+    opt.value = minute;
+    opt.textContent = minute;
+    selectEl.appendChild(opt);
+  });
+}
+
+function timeToMinutes(timeStr) {
+  const [h, m] = timeStr.split(":").map(Number);
+  return (h * 60) + m;
+}
+
+function setTimeSelects(prefix, timeStr) {
+  const [hour, minute] = timeStr.split(":");
+  document.getElementById(`${prefix}Hour`).value = hour;
+  document.getElementById(`${prefix}Minute`).value = minute;
+}
+
+function getTimeValue(prefix) {
+  const hour = document.getElementById(`${prefix}Hour`).value;
+  const minute = document.getElementById(`${prefix}Minute`).value;
+  if (!hour || !minute) return null;
+  return `${hour}:${minute}`;
+}
+
+function showError(msg) {
+  if (alertBox) {
+    alertBox.textContent = msg;
+    alertBox.classList.remove("d-none");
+  }
+  if (successBox) successBox.classList.add("d-none");
+}
+
+function showSuccess(msg = "已更新") {
+  if (successBox) {
+    successBox.textContent = msg;
+    successBox.classList.remove("d-none");
+  }
+  if (alertBox) alertBox.classList.add("d-none");
+}
+
+function showModalError(msg) {
+  if (!modalAlert) return;
+  modalAlert.textContent = msg;
+  modalAlert.classList.remove("d-none");
+}
+
+function hideModalError() {
+  if (!modalAlert) return;
+  modalAlert.textContent = "";
+  modalAlert.classList.add("d-none");
+}
+
+function renderDayAvailabilities(dateStr) {
+  if (!availDayList) return;
+  availDayList.innerHTML = "";
+  const items = availabilityData.filter((item) => item.date === dateStr);
+  const shifts = shiftData.filter((item) => item.date === dateStr);
+  items.forEach((item) => {
+    const badge = document.createElement("span");
+    badge.className = "badge bg-secondary";
+    badge.textContent = `${item.start}-${item.end}`;
+    availDayList.appendChild(badge);
+  });
+  shifts.forEach((item) => {
+    const badge = document.createElement("span");
+    badge.className = "badge bg-dark";
+    badge.textContent = `${item.start}-${item.end}`;
+    availDayList.appendChild(badge);
+  });
+}
+
+[
+  "availStartHour",
+  "availEndHour",
+  "modalStartHour",
+  "modalEndHour",
+].forEach((id) => {
+  const el = document.getElementById(id);
+  if (el) buildTimeOptions(el);
+});
+
+[
+  "availStartMinute",
+  "availEndMinute",
+  "modalStartMinute",
+  "modalEndMinute",
+].forEach((id) => {
+  const el = document.getElementById(id);
+  if (el) buildMinuteOptions(el);
+});
+
+setTimeSelects("availStart", "10:00");
+setTimeSelects("availEnd", "14:00");
+
+document.getElementById("availForm")?.addEventListener("submit", (e) => {
+  e.preventDefault();
+  const date = document.getElementById("availDate").value;
+  const start = getTimeValue("availStart");
+  const end = getTimeValue("availEnd");
+  if (!date || !start || !end) {
+    showError("請填寫完整日期與時間");
+    return;
+  }
+  if (timeToMinutes(end) <= timeToMinutes(start)) {
+    showError("結束時間需晚於開始時間");
+    return;
+  }
+  fetch(availabilityUrls.createUrl, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ date, start, end }),
+  })
+    .then(async (r) => {
+      const data = await r.json().catch(() => ({}));
+      if (!r.ok || data.ok === false) {
+        throw new Error(data.error || "新增失敗，請再試一次");
+      }
+      showSuccess("已新增");
+      setTimeout(() => window.location.reload(), 400);
+    })
+    .catch((err) => showError(err.message || "新增失敗，請再試一次"));
+});
+
+document.querySelectorAll(".edit-entry").forEach((btn) => {
+  btn.addEventListener("click", (e) => {
+    const row = e.target.closest("tr");
+    if (!row) return;
+    document.getElementById("availModalId").value = row.dataset.id;
+    document.getElementById("availModalKind").value = row.dataset.kind;
+    document.getElementById("availModalDate").innerText = row.dataset.date;
+    setTimeSelects("modalStart", row.dataset.start);
+    setTimeSelects("modalEnd", row.dataset.end);
+    hideModalError();
+    bootstrap.Modal.getOrCreateInstance(document.getElementById("availabilityModal")).show();
+  });
+});
+
+document.getElementById("availModalSave")?.addEventListener("click", () => {
+  const id = document.getElementById("availModalId").value;
+  const kind = document.getElementById("availModalKind").value;
+  const start = getTimeValue("modalStart");
+  const end = getTimeValue("modalEnd");
+  if (!id || !start || !end) {
+    showModalError("請填寫完整時間");
+    return;
+  }
+  if (timeToMinutes(end) <= timeToMinutes(start)) {
+    showModalError("結束時間需晚於開始時間");
+    return;
+  }
+  const updateUrl = kind === "shift"
+    ? availabilityUrls.shiftUpdateUrl
+    : availabilityUrls.updateUrl;
+  fetch(updateUrl, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ id, start, end }),
+  })
+    .then(async (r) => {
+      const data = await r.json().catch(() => ({}));
+      if (!r.ok || data.ok === false) {
+        throw new Error(data.error || "更新失敗，請再試一次");
+      }
+      return data;
+    })
+    .then(() => {
+      const row = document.querySelector(`tr[data-id="${id}"]`);
+      if (row) {
+        row.dataset.start = start;
+        row.dataset.end = end;
+        row.querySelector("td:nth-child(2)").textContent = `${start} - ${end}`;
+      }
+      if (kind === "shift") {
+        const item = shiftData.find((entry) => String(entry.id) === String(id));
+        if (item) {
+          item.start = start;
+          item.end = end;
+        }
+      } else {
+        const item = availabilityData.find((entry) => String(entry.id) === String(id));
+        if (item) {
+          item.start = start;
+          item.end = end;
+        }
+      }
+      const currentDate = document.getElementById("availDate")?.value;
+      if (currentDate) {
+        renderDayAvailabilities(currentDate);
+      }
+      const modalEl = document.getElementById("availabilityModal");
+      const modal = bootstrap.Modal.getInstance(modalEl);
+      if (modal) modal.hide();
+      showSuccess("已更新");
+    })
+    .catch((err) => showModalError(err.message || "更新失敗，請再試一次"));
+});
+
+document.querySelectorAll(".delete-entry").forEach((btn) => {
+  btn.addEventListener("click", (e) => {
+    const row = e.target.closest("tr");
+    const id = row?.dataset.id;
+    if (!id) return;
+    const kind = row.dataset.kind;
+    const deleteUrl = kind === "shift"
+      ? availabilityUrls.shiftDeleteUrl
+      : availabilityUrls.deleteUrl;
+    fetch(deleteUrl, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ id }),
+    })
+      .then(async (r) => {
+        const data = await r.json().catch(() => ({}));
+        if (!r.ok || data.ok === false) {
+          throw new Error(data.error || "刪除失敗，請再試一次");
+        }
+        row.remove();
+        showSuccess("已刪除");
+        if (kind === "shift") {
+          const idx = shiftData.findIndex((item) => String(item.id) === String(id));
+          if (idx >= 0) {
+            shiftData.splice(idx, 1);
+          }
+        } else {
+          availabilityData = availabilityData.filter((item) => String(item.id) !== String(id));
+        }
+        const currentDate = document.getElementById("availDate")?.value;
+        if (currentDate) {
+          renderDayAvailabilities(currentDate);
+        }
+      })
+      .catch((err) => showError(err.message || "刪除失敗，請再試一次"));
+  });
+});
+
+const availDateInput = document.getElementById("availDate");
+if (availDateInput) {
+  renderDayAvailabilities(availDateInput.value);
+  availDateInput.addEventListener("change", () => {
+    renderDayAvailabilities(availDateInput.value);
+  });
+}
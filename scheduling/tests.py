@@ -0,0 +1,418 @@
+import importlib
+import json
+import re
+from datetime import date, time, timedelta
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.db import transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import clear_url_caches, resolve, reverse
+from django.utils import timezone
+
+from core import db_router, query_budget
+from scheduling import cache, views
+from scheduling.models import CacheGeneration, ScheduleChange, SchedulingWindow, Shift, Store, WorkAvailability
+from scheduling.views import SCHEDULE_CHANGES_SETTLE_SECONDS, record_shift_change
+from scheduling.windows import get_latest_window
+
+
+def _json(path, payload):
+    return {"method": "post", "path": path, "data": payload, "content_type": "application/json"}
+
+
+class SchedulingQueryBudgetTests(query_budget.QueryBudgetTestCase):
+    url_module = "scheduling.urls"
+    budgets = {
+        "list": 3,
+        "timeline:day": 9,
+        "timeline:week": 9,
+        "timeline:month": 9,
+        "manage_window": 6,
+        "worker_schedule": 8,
+        "shift_create": 10,
+        "shift_delete": 8,
+        "shift_update": 11,
+        "availability_create": 7,
+        "availability_delete": 4,
+        "availability_update": 8,
+        "worker_shift_create": 9,
+        "worker_shift_update": 11,
+        "worker_shift_delete": 9,
+        "export_excel": 6,
+        "changes": 6,
+        "shift_revert": 10,
+        "changes_diff": 4,
+    }
+
+    def own_shift(self, role, store=None):
+        # 員工自行排的班不屬於任何店別，才可由員工修改或刪除
+        profile = self.profiles.get(role, self.worker)
+        return Shift.objects.create(
+            employee=profile if profile.role != "manager" else self.worker,
+            store=store,
+            date=self.days[2],
+            start_time=time(6),
+            end_time=time(8),
+            is_published=True,
+        )
+
+    def own_availability(self, role):
+        profile = self.profiles.get(role, self.worker)
+        return WorkAvailability.objects.create(
+            employee=profile, date=self.days[3], start_time=time(6), end_time=time(8)
+        )
+
+    def request_list(self, role):
+        return {"path": reverse("scheduling:list")}
+
+    def request_timeline(self, role, view):
+        return {"path": reverse("scheduling:timeline"), "data": {"view": view, "date": self.days[0].isoformat()}}
+
+    def request_manage_window(self, role):
+        return {"path": reverse("scheduling:manage_window")}
+
+    def request_worker_schedule(self, role):
+        return {"path": reverse("scheduling:worker_schedule"), "data": {"date": self.days[0].isoformat()}}
+
+    def request_shift_create(self, role):
+        return _json(reverse("scheduling:shift_create"), {
+            "employee_id": self.worker.id,
+            "store_id": self.stores[0].id,
+            "date": self.days[1].isoformat(),
+            "start": "06:00",
+            "end": "08:00",
+        })
+
+    def request_shift_delete(self, role):
+        return _json(reverse("scheduling:shift_delete"), {"id": self.own_shift(role, self.stores[0]).id})
+
+    def request_shift_update(self, role):
+        shift = self.own_shift(role, self.stores[0])
+        return _json(reverse("scheduling:shift_update"), {
+            "id": shift.id,
+            "start": "06:30",
+            "end": "08:00",
+            "store_id": self.stores[1].id,
+            "note": "調整",
+        })
+
+    def request_availability_create(self, role):
+        return _json(reverse("scheduling:availability_create"), {
+            "date": self.days[4].isoformat(),
+            "start": "06:00",
+            "end": "08:00",
+        })
+
+    def request_availability_delete(self, role):
+        return _json(reverse("scheduling:availability_delete"), {"id": self.own_availability(role).id})
+
+    def request_availability_update(self, role):
+        return _json(reverse("scheduling:availability_update"), {
+            "id": self.own_availability(role).id,
+            "start": "06:30",
+            "end": "08:00",
+        })
+
+    def request_worker_shift_create(self, role):
+        return _json(reverse("scheduling:worker_shift_create"), {
+            "date": self.days[5].isoformat(),
+            "start": "06:00",
+            "end": "08:00",
+        })
+
+    def request_worker_shift_update(self, role):
+        return _json(reverse("scheduling:worker_shift_update"), {
+            "id": self.own_shift(role).id,
+            "start": "06:30",
+            "end": "08:00",
+        })
+
+    def request_worker_shift_delete(self, role):
+        return _json(reverse("scheduling:worker_shift_delete"), {"id": self.own_shift(role).id})
+
+    def request_export_excel(self, role):
+        return {"path": reverse("scheduling:export_excel")}
+
+    def request_shift_revert(self, role):
+        profile = self.profiles.get(role, self.worker)
+        change = record_shift_change(ScheduleChange.ACTION_CREATE, self.own_shift(role), profile)
+        return _json(reverse("scheduling:shift_revert"), {"change_ids": [change.id]})
+
+    def request_changes_diff(self, role):
+        return {"path": reverse("scheduling:changes_diff"), "data": {"since": self.days[0].isoformat()}}
+
+    def request_changes(self, role):
+        return {"path": reverse("scheduling:changes"), "data": {
+            "after": 0,
+            "start": self.days[0].isoformat(),
+            "end": self.days[-1].isoformat(),
+        }}
+
+
+class ReadReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(settings.DATABASES, {db_router.REPLICA_ALIAS: settings.DATABASES["default"]})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = db_router.ReplicaRouter()
+        self.session = SessionStore()
+        self.session["_auth_user_id"] = "1"
+
+    def route(self, method, name, model=Shift):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(model))
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)(reverse(name))
+        request.session = self.session
+        db_router.ReadReplicaMiddleware(view)(request)
+        return seen[0]
+
+    def test_read_heavy_views_use_replica(self):
+        for name in settings.READ_REPLICA_VIEWS:
+            self.assertEqual(self.route("get", name), "replica")
+        self.assertEqual(self.route("get", "scheduling:manage_window"), "default")
+        self.assertEqual(self.route("get", "scheduling:timeline", model=User), "default")
+        self.assertEqual(self.router.db_for_read(Shift), "default")
+
+    def test_writes_pin_session_to_primary(self):
+        self.assertEqual(self.route("post", "scheduling:shift_create"), "default")
+        self.assertEqual(self.route("get", "scheduling:timeline"), "default")
+        self.session[db_router.SESSION_KEY] = 0
+        self.assertEqual(self.route("get", "scheduling:timeline"), "replica")
+
+    def test_anonymous_post_does_not_create_session(self):
+        self.session = SessionStore()
+        self.route("post", "scheduling:shift_create")
+        self.assertTrue(self.session.is_empty())
+
+
+class GenerationCacheTests(TestCase):
+    def setUp(self):
+        self.cache = cache.GenerationCache("test")
+        self.loads = 0
+        cache.forget_uncommitted()
+
+    def load(self):
+        self.loads += 1
+        return self.loads
+
+    def test_other_process_bump_drops_entries(self):
+        self.assertEqual([self.cache.get("key", self.load) for _ in range(2)], [1, 1])
+        # 其他 worker 提交的 bump 只會反映在資料庫的版本號
+        CacheGeneration.objects.create(namespace="test", generation=5)
+        self.assertEqual(self.cache.get("key", self.load), 2)
+
+    def test_uncommitted_bump_is_not_cached(self):
+        with transaction.atomic():
+            self.cache.invalidate()
+            self.assertEqual([self.cache.get("key", self.load) for _ in range(2)], [1, 2])
+
+    def test_window_changes_bump_generation(self):
+        self.assertIsNone(get_latest_window())
+        window = SchedulingWindow.objects.create(start_date=date(2025, 1, 1), end_date=date(2025, 1, 31))
+        self.assertEqual(get_latest_window(), window)
+        self.assertEqual(CacheGeneration.objects.get(namespace="window").generation, 1)
+
+
+class ScheduleChangeFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(name="店", color="#cfe8ff")
+        SchedulingWindow.objects.create(start_date=date(2025, 1, 1), end_date=date(2025, 1, 31))
+        cls.manager = query_budget.create_profiles(1, role="manager", prefix="mgr")[0]
+        cls.worker, cls.other = query_budget.create_profiles(2)
+
+    def changes(self, profile, after=0):
+        self.client.force_login(profile.user)
+        response = self.client.get(reverse("scheduling:changes"), {
+            "after": after, "start": "2025-01-01", "end": "2025-01-31",
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def create_shift(self, profile):
+        self.client.force_login(self.manager.user)
+        response = self.client.post(reverse("scheduling:shift_create"), {
+            "employee_id": profile.id,
+            "store_id": self.store.id,
+            "date": "2025-01-10",
+            "start": "09:00",
+            "end": "12:00",
+        }, content_type="application/json")
+        return response.json()["id"]
+
+    def settle(self, seconds=SCHEDULE_CHANGES_SETTLE_SECONDS + 1):
+        ScheduleChange.objects.update(created_at=timezone.now() - timedelta(seconds=seconds))
+
+    def test_mutations_are_streamed_after_cursor(self):
+        shift_id = self.create_shift(self.worker)
+        feed = self.changes(self.manager)
+        self.assertEqual([c["action"] for c in feed["changes"]], ["create"])
+        self.assertEqual(feed["changes"][0]["shift"]["store_name"], "店")
+
+        self.client.post(reverse("scheduling:shift_delete"), {"id": shift_id}, content_type="application/json")
+        later = self.changes(self.manager, after=feed["cursor"])
+        # 剛寫入的紀錄可能還有較小的 id 未 commit，遊標不前進，下次重讀
+        self.assertEqual(later["cursor"], 0)
+        self.assertEqual(
+            [(c["action"], c["shift_id"], c["shift"]) for c in later["changes"]],
+            [("create", shift_id, feed["changes"][0]["shift"]), ("delete", shift_id, None)],
+        )
+        self.settle()
+        settled = self.changes(self.manager, after=later["cursor"])
+        self.assertEqual(settled["cursor"], ScheduleChange.objects.latest("id").id)
+        self.assertEqual(self.changes(self.manager, after=settled["cursor"])["changes"], [])
+
+    def test_undo_redo_and_diff(self):
+        since = timezone.now()
+        shift_id = self.create_shift(self.worker)
+        self.client.force_login(self.manager.user)
+        response = self.client.post(reverse("scheduling:shift_update"), {
+            "id": shift_id, "start": "10:00", "end": "12:00", "store_id": self.store.id,
+        }, content_type="application/json")
+        update_ids = response.json()["change_ids"]
+
+        def revert(change_ids):
+            response = self.client.post(
+                reverse("scheduling:shift_revert"), {"change_ids": change_ids}, content_type="application/json"
+            )
+            return response.status_code, response.json().get("change_ids")
+
+        status, undo_ids = revert(update_ids)
+        self.assertEqual(status, 200)
+        self.assertEqual(Shift.objects.get(id=shift_id).start_time, time(9))
+        status, _ = revert(undo_ids)
+        self.assertEqual(Shift.objects.get(id=shift_id).start_time, time(10))
+        # 被重做蓋過的復原不能再套用一次
+        self.assertEqual(revert(undo_ids)[0], 409)
+
+        diff = self.client.get(reverse("scheduling:changes_diff"), {"since": since.isoformat()}).json()["changes"]
+        self.assertEqual([(d["shift_id"], d["action"], d["after"]["start"]) for d in diff], [(shift_id, "create", "10:00")])
+        self.assertEqual(ScheduleChange.objects.filter(shift_id=shift_id).count(), 4)
+
+    def test_undo_delete_restores_same_shift(self):
+        shift_id = self.create_shift(self.worker)
+        response = self.client.post(reverse("scheduling:shift_delete"), {"id": shift_id}, content_type="application/json")
+        response = self.client.post(
+            reverse("scheduling:shift_revert"),
+            {"change_ids": response.json()["change_ids"]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Shift.objects.get(id=shift_id).store, self.store)
+        # 只能復原自己的異動
+        self.client.force_login(self.other.user)
+        response = self.client.post(
+            reverse("scheduling:shift_revert"), {"change_ids": response.json()["change_ids"]}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_workers_without_view_permission_only_see_own_changes(self):
+        self.create_shift(self.worker)
+        self.create_shift(self.other)
+        self.settle()
+        feed = self.changes(self.worker)
+        self.assertEqual([c["employee_id"] for c in feed["changes"]], [self.worker.id])
+        # 其他人的異動仍推進遊標，下次不必再讀
+        self.assertEqual(feed["cursor"], ScheduleChange.objects.latest("id").id)
+
+    def test_long_poll_backs_off_between_checks(self):
+        clock = [0.0]
+        sleeps = []
+
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+            clock[0] += seconds
+
+        request = RequestFactory().get(reverse("scheduling:changes"), {
+            "after": 0, "start": "2025-01-01", "end": "2025-01-31",
+        })
+        request.user = self.manager.user
+        with override_settings(SCHEDULE_CHANGES_WAIT_SECONDS=20), \
+                mock.patch("scheduling.views.asyncio.sleep", fake_sleep), \
+                mock.patch("scheduling.views.time.monotonic", lambda: clock[0]):
+            response = async_to_sync(views.aschedule_changes)(request)
+        self.assertEqual(json.loads(response.content)["changes"], [])
+        self.assertEqual(sleeps, [1, 2, 4, 5, 5, 3])
+
+    def test_prune_keeps_recent_changes(self):
+        self.create_shift(self.worker)
+        self.settle(seconds=91 * 24 * 3600)
+        self.create_shift(self.other)
+        call_command("prune_schedule_changes", days=90, stdout=StringIO())
+        self.assertEqual(list(ScheduleChange.objects.values_list("employee_id", flat=True)), [self.other.id])
+
+    def test_legacy_update_without_before_is_not_reported_as_create(self):
+        since = timezone.now()
+        shift_id = self.create_shift(self.worker)
+        ScheduleChange.objects.filter(shift_id=shift_id).update(created_at=since - timedelta(days=1))
+        legacy = ScheduleChange.objects.create(
+            shift_id=shift_id,
+            employee=self.worker,
+            date=date(2025, 1, 10),
+            action=ScheduleChange.ACTION_UPDATE,
+            after=ScheduleChange.objects.get(shift_id=shift_id).after,
+            actor=self.manager,
+        )
+        diff = self.client.get(reverse("scheduling:changes_diff"), {"since": since.isoformat()}).json()["changes"]
+        self.assertEqual(diff, [])
+        response = self.client.post(
+            reverse("scheduling:shift_revert"), {"change_ids": [legacy.id]}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(Shift.objects.filter(id=shift_id).exists())
+
+
+def _reload_urls():
+    importlib.reload(importlib.import_module("scheduling.urls"))
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+class AsgiViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.store = Store.objects.create(name="店", color="#cfe8ff")
+        SchedulingWindow.objects.create(
+            start_date=date(2025, 1, 1), end_date=date(2025, 1, 31), allow_worker_view=True
+        )
+        cls.manager = query_budget.create_profiles(1, role="manager", prefix="mgr")[0]
+        cls.worker = query_budget.create_profiles(1)[0]
+        Shift.objects.create(
+            employee=cls.worker, store=cls.store, date=date(2025, 1, 10), start_time=time(9), end_time=time(12)
+        )
+
+    def pages(self):
+        requests = [
+            (self.manager, "scheduling:timeline", {"date": "2025-01-10"}),
+            (self.manager, "scheduling:timeline", {"view": "month", "month": "2025-01", "store": [self.store.id]}),
+            (self.worker, "scheduling:worker_schedule", {"date": "2025-01-10"}),
+            (self.worker, "scheduling:changes", {"after": 0, "start": "2025-01-01", "end": "2025-01-31"}),
+        ]
+        contents = []
+        for profile, name, params in requests:
+            self.client.force_login(profile.user)
+            response = self.client.get(reverse(name), params)
+            self.assertEqual(response.status_code, 200, name)
+            contents.append(re.sub(rb'name="csrfmiddlewaretoken" value="[^"]*"', b"", response.content))
+        return contents
+
+    def test_async_views_match_sync_views(self):
+        sync_pages = self.pages()
+        self.addCleanup(_reload_urls)
+        override = override_settings(SERVER_MODE="asgi")
+        override.enable()
+        self.addCleanup(override.disable)
+        _reload_urls()
+        self.assertIs(resolve(reverse("scheduling:timeline")).func, views.ascheduling_timeline)
+        self.assertEqual(self.pages(), sync_pages)
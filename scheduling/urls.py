@@ -1,15 +1,30 @@
 # scheduling/urls.py (修正後)
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# ASGI 模式使用 async view（async ORM、long-poll）；預設的 WSGI 模式使用同步版本，省去每個 request 的執行緒切換
+if settings.SERVER_MODE == "asgi":
+    timeline_view, worker_schedule_view, changes_view = (
+        views.ascheduling_timeline,
+        views.aworker_schedule,
+        views.aschedule_changes,
+    )
+else:
+    timeline_view, worker_schedule_view, changes_view = (
+        views.scheduling_timeline,
+        views.worker_schedule,
+        views.schedule_changes,
+    )
+
 app_name = 'scheduling'
 urlpatterns = [
     # 總班表日曆頁面 (店長專用) -> 轉到員工班表
     path('list/', views.scheduling_list, name='list'),
     # 員工班表頁面 (店長專用)
-    path('timeline/', views.scheduling_timeline, name='timeline'),
+    path('timeline/', timeline_view, name='timeline'),
     path('window/', views.manage_window, name='manage_window'),
-    path('my-availability/', views.worker_schedule, name='worker_schedule'),
+    path('my-availability/', worker_schedule_view, name='worker_schedule'),
     
     path("shift/create/", views.create_shift, name="shift_create"),
     path("shift/delete/", views.delete_shift, name="shift_delete"),
@@ -20,6 +35,9 @@ urlpatterns = [
     path("shift/worker/update/", views.update_worker_shift, name="worker_shift_update"),
     path("shift/worker/delete/", views.delete_worker_shift, name="worker_shift_delete"),
     path("shift/worker/create/", views.create_worker_shift, name="worker_shift_create"),
+    path("shift/revert/", views.revert_shift_changes, name="shift_revert"),
+    path("changes/", changes_view, name="changes"),
+    path("changes/diff/", views.schedule_changes_diff, name="changes_diff"),
 
 
     # 匯出 Excel 報表
@@ -1,31 +1,34 @@
 # scheduling/views.py
 from django.shortcuts import render
+from django.conf import settings
+from django.db import connection, transaction
 from django.db.models import Q
 from django.db.models.deletion import ProtectedError
 from django.urls import reverse
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.auth.views import redirect_to_login
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
 from django.shortcuts import redirect
 from datetime import datetime, timedelta
 import calendar as month_calendar
-from django.utils.timezone import localtime, now
-import time
-import logging
+from django.utils.timezone import is_naive, localtime, make_aware, now
+from functools import wraps
 
-from users.models import UserProfile
-from .models import Shift, SchedulingWindow, WorkAvailability, Store
-from django.utils.dateparse import parse_date
+from asgiref.sync import sync_to_async
 
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
+from users.models import UserProfile
+from .models import ScheduleChange, Shift, SchedulingWindow, WorkAvailability, Store
+from .holidays import build_holiday_map
+from .windows import get_latest_window
+from django.utils.dateparse import parse_date, parse_datetime
 
 from django.views.decorators.csrf import csrf_exempt
 
+import asyncio
 import json
 import math
-
-logger = logging.getLogger(__name__)
+import time
 
 
 def pick_text_color(hex_color):
@@ -43,51 +46,44 @@ def pick_text_color(hex_color):
 
 
 def get_store_display(shift):
-    if shift.store_id and shift.store:
-        color = shift.store.color
-        return shift.store.name, color, pick_text_color(color)
+    return store_display(shift.store if shift.store_id else None)
+
+
+def store_display(store):
+    if store:
+        return store.name, store.color, pick_text_color(store.color)
     return "", "#e5e7eb", "#374151"
 
-def get_national_holidays(year):
-    lunar_based = {
-        2024: {
-            "2024-02-10": "農曆新年",
-            "2024-06-10": "端午節",
-        },
-        2025: {
-            "2025-01-29": "農曆新年",
-            "2025-05-31": "端午節",
-        },
-        2026: {
-            "2026-02-15": "小年夜",
-            "2026-02-16": "除夕",
-            "2026-02-17": "初一",
-            "2026-02-18": "初二",
-            "2026-02-19": "初三",
-            "2026-02-20": "初四",
-            "2026-02-21": "初五",
-            "2026-06-19": "端午節",
-        },
-    }
-    holidays = {
-        f"{year}-01-01": "元旦",
-        f"{year}-02-28": "和平紀念日",
-        f"{year}-04-04": "兒童節",
-        f"{year}-04-05": "清明節",
-        f"{year}-05-01": "勞動節",
-        f"{year}-10-10": "國慶日",
-        f"{year}-12-25": "行憲紀念日",
+
+def shift_snapshot(shift):
+    # 異動紀錄保存的班別內容；員工與日期不會被修改，記在 ScheduleChange 本身
+    return {
+        "start": shift.start_time.strftime("%H:%M"),
+        "end": shift.end_time.strftime("%H:%M"),
+        "store_id": shift.store_id,
+        "break_minutes": shift.break_minutes,
+        "note": shift.note,
+        "is_published": shift.is_published,
     }
-    for date_str, name in lunar_based.get(year, {}).items():
-        holidays[date_str] = name
-    return holidays
 
-def build_holiday_map(dates):
-    years = {d.year for d in dates}
-    holidays = {}
-    for year in years:
-        holidays.update(get_national_holidays(year))
-    return holidays
+
+def record_shift_change(action, shift, actor, before=None, reverts=None):
+    # 需與班別的寫入在同一個交易內，兩者一起提交或 rollback
+    if action == ScheduleChange.ACTION_DELETE:
+        before, after = shift_snapshot(shift), None
+    else:
+        after = shift_snapshot(shift)
+    return ScheduleChange.objects.create(
+        shift_id=shift.id,
+        employee_id=shift.employee_id,
+        date=shift.date,
+        action=action,
+        before=before,
+        after=after,
+        actor=actor,
+        reverts=reverts,
+    )
+
 
 def is_manager(user):
     try:
@@ -111,7 +107,7 @@ def is_worker(user):
 
 
 def get_active_window():
-    latest = SchedulingWindow.objects.order_by("-created_at").first()
+    latest = get_latest_window()
     if latest:
         return (
             latest.start_date,
@@ -128,6 +124,26 @@ def get_active_window():
     return start, end, False, False, False, False, []
 
 
+async def aget_active_window():
+    return await sync_to_async(get_active_window)()
+
+
+def async_login_required(view_func):
+    # Django 4.2 的 login_required 不支援 async view
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+async def aget_profile(user):
+    return await UserProfile.objects.select_related("user").filter(user_id=user.id).afirst()
+
+
 BREAK_MINUTE_OPTIONS = {0, 30, 60, 90, 120}
 
 
@@ -218,38 +234,15 @@ def scheduling_list(request):
     return redirect("scheduling:timeline")
 
 
-@login_required
-def scheduling_timeline(request):
-    try:
-        profile = request.user.userprofile
-    except UserProfile.DoesNotExist:
-        return redirect("users:login")
-
-    is_manager_user = profile.is_manager()
-    is_worker_user = profile.role == "worker"
-    if not is_manager_user and not is_worker_user:
-        return redirect("users:login")
-
-    _, _, _, allow_worker_view, allow_worker_edit_shifts, _, break_rules = get_active_window()
-    if not is_manager_user and not allow_worker_view:
-        return render(
-            request,
-            "scheduling/timeline_locked.html",
-            {"allow_worker_view": allow_worker_view},
-        )
-
-    read_only = not is_manager_user
-    hide_store_filter = is_worker_user
-    hide_store_info = False
-    worker_edit_closed = is_worker_user and not allow_worker_edit_shifts
-    t0 = time.perf_counter()
+def timeline_options(request, is_manager_user):
+    """班表頁面的查詢參數：檢視方式、日期、店別篩選，以及要顯示的日期 dates。"""
     view = request.GET.get("view", "week")
     if view not in ("day", "week", "month"):
         view = "week"
 
     date_str = request.GET.get("date")
     store_ids = request.GET.getlist("store")
-    show_empty_rows = request.GET.get("show_empty") == "1"
+    show_empty_rows = request.GET.get("show_empty") == "1" and is_manager_user
     selected_store_ids = []
     selected_unassigned = False
     store_query = None
@@ -284,36 +277,72 @@ def scheduling_timeline(request):
     if view == "month" and not date_str:
         date = month_date
 
-    if not is_manager_user:
-        show_empty_rows = False
+    if view == "month":
+        _, days_in_month = month_calendar.monthrange(month_date.year, month_date.month)
+        dates = [month_date.replace(day=i) for i in range(1, days_in_month + 1)]
+    elif view == "week":
+        start_date = date - timedelta(days=date.weekday())
+        dates = [start_date + timedelta(days=i) for i in range(7)]
+    else:
+        dates = [date]
+
+    return {
+        "view": view,
+        "date": date,
+        "month_date": month_date,
+        "show_empty_rows": show_empty_rows,
+        "store_query": store_query,
+        "selected_store_ids": selected_store_ids,
+        "selected_unassigned": selected_unassigned,
+        "dates": dates,
+    }
+
 
+def timeline_workers():
+    return (
+        UserProfile.objects.filter(role__in=("worker", "supervisor"))
+        .select_related("user")
+        .order_by("sort_order", "name", "user__username")
+    )
+
+
+def timeline_shifts(dates, store_query=None, employee=None):
+    shifts_qs = Shift.objects.filter(date__in=dates, is_published=True)
+    if employee is not None:
+        shifts_qs = shifts_qs.filter(employee=employee)
+    if store_query is not None:
+        shifts_qs = shifts_qs.filter(store_query)
+    return shifts_qs.select_related("employee__user", "store").order_by("start_time")
+
+
+def render_timeline(request, profile, window, options, stores, changes_cursor, holiday_map, workers, shifts):
+    """
+    以已載入的資料產生班表頁面。WSGI 的 scheduling_timeline 與 ASGI 的 ascheduling_timeline
+    只有讀取資料的方式不同（同步 / async ORM），其餘共用這裡。
+    """
+    is_manager_user = profile.is_manager()
+    is_worker_user = profile.role == "worker"
+    _, _, _, _, allow_worker_edit_shifts, _, break_rules = window
+    read_only = not is_manager_user
+    hide_store_filter = is_worker_user
+    hide_store_info = False
+    worker_edit_closed = is_worker_user and not allow_worker_edit_shifts
+    view = options["view"]
+    date = options["date"]
+    month_date = options["month_date"]
+    show_empty_rows = options["show_empty_rows"]
+    selected_store_ids = options["selected_store_ids"]
+    selected_unassigned = options["selected_unassigned"]
     hide_empty_rows = not show_empty_rows
 
     def build_display_name(profile):
         return profile.display_name()
 
-    stores = Store.objects.all()
-    store_ids = request.GET.getlist("store")
-    store_query = None
-    selected_store_ids = []
-    selected_unassigned = False
-    if store_ids:
-        unassigned = "unassigned" in store_ids
-        selected_unassigned = unassigned
-        numeric_ids = []
-        for value in store_ids:
-            if value.isdigit():
-                numeric_ids.append(int(value))
-        selected_store_ids = numeric_ids
-        if numeric_ids and unassigned:
-            store_query = Q(store_id__in=numeric_ids) | Q(store__isnull=True)
-        elif numeric_ids:
-            store_query = Q(store_id__in=numeric_ids)
-        elif unassigned:
-            store_query = Q(store__isnull=True)
     shift_create_url = reverse("scheduling:shift_create")
     shift_update_url = reverse("scheduling:shift_update")
     shift_delete_url = reverse("scheduling:shift_delete")
+    shift_revert_url = reverse("scheduling:shift_revert")
+    changes_url = reverse("scheduling:changes")
 
     today_str = localtime(now()).date().strftime("%Y-%m-%d")
     def format_minutes(total_minutes):
@@ -322,21 +351,7 @@ def scheduling_timeline(request):
         return f"{hours:02d}:{minutes:02d}"
 
     if view == "month":
-        _, days_in_month = month_calendar.monthrange(month_date.year, month_date.month)
-        day_list = [month_date.replace(day=i) for i in range(1, days_in_month + 1)]
-        holiday_map = build_holiday_map(day_list)
-
-        workers = UserProfile.objects.filter(role__in=("worker", "supervisor")).select_related("user").order_by(
-            "sort_order", "name", "user__username"
-        )
-
-        shifts_qs = Shift.objects.filter(date__in=day_list, is_published=True)
-        if store_query is not None:
-            shifts_qs = shifts_qs.filter(store_query)
-        shifts = (
-            shifts_qs.select_related("employee__user", "store")
-            .order_by("start_time")
-        )
+        day_list = options["dates"]
 
         scheduled_minutes_by_employee = {}
         for s in shifts:
@@ -392,7 +407,7 @@ def scheduling_timeline(request):
             })
 
         weekday_labels = ["一", "二", "三", "四", "五", "六", "日"]
-        response = render(request, "scheduling/timeline.html", {
+        return render(request, "scheduling/timeline.html", {
             "date": date,
             "view": view,
             "month_date": month_date,
@@ -409,6 +424,7 @@ def scheduling_timeline(request):
             "shift_create_url": shift_create_url,
             "shift_update_url": shift_update_url,
             "shift_delete_url": shift_delete_url,
+            "shift_revert_url": shift_revert_url,
             "today_str": today_str,
             "stores": stores,
             "selected_store_ids": selected_store_ids,
@@ -419,19 +435,15 @@ def scheduling_timeline(request):
             "can_manage_store": is_manager_user,
             "show_empty_rows": show_empty_rows,
             "break_rules_json": json.dumps(normalize_break_rules(break_rules)),
+            "changes_url": changes_url,
+            "changes_cursor": changes_cursor,
+            "changes_start": day_list[0],
+            "changes_end": day_list[-1],
         })
-        logger.info("timeline view=%s total_ms=%.1f", view, (time.perf_counter() - t0) * 1000)
-        return response
 
     day_headers = None
     weekday_labels = ["一", "二", "三", "四", "五", "六", "日"]
-    if view == "week":
-        start_date = date - timedelta(days=date.weekday())
-        date_range = [start_date + timedelta(days=i) for i in range(7)]
-    else:
-        date_range = [date]
-
-    holiday_map = build_holiday_map(date_range)
+    date_range = options["dates"]
     if view in ("week", "day"):
         day_headers = [{
             "label": f"{d.strftime('%m/%d')}（{weekday_labels[d.weekday()]}）",
@@ -445,18 +457,6 @@ def scheduling_timeline(request):
     base_end = 24 * 60
     total_minutes = base_end - base_start
 
-    workers = UserProfile.objects.filter(role__in=("worker", "supervisor")).select_related("user").order_by(
-        "sort_order", "name", "user__username"
-    )
-
-    shifts_qs = Shift.objects.filter(date__in=date_range, is_published=True)
-    if store_query is not None:
-        shifts_qs = shifts_qs.filter(store_query)
-    shifts = (
-        shifts_qs.select_related("employee__user", "store")
-        .order_by("start_time")
-    )
-
     scheduled_minutes_by_employee = {}
     for s in shifts:
         if not s.store_id:
@@ -528,7 +528,7 @@ def scheduling_timeline(request):
 
     hours = list(range(8, 24))
 
-    response = render(request, "scheduling/timeline.html", {
+    return render(request, "scheduling/timeline.html", {
         "date": date,
         "rows": rows,
         "hours": hours,
@@ -539,6 +539,7 @@ def scheduling_timeline(request):
         "shift_create_url": shift_create_url,
         "shift_update_url": shift_update_url,
         "shift_delete_url": shift_delete_url,
+        "shift_revert_url": shift_revert_url,
         "today_str": today_str,
         "stores": stores,
         "selected_store_ids": selected_store_ids,
@@ -549,11 +550,64 @@ def scheduling_timeline(request):
         "worker_edit_closed": worker_edit_closed,
         "can_manage_store": is_manager_user,
         "break_rules_json": json.dumps(normalize_break_rules(break_rules)),
+        "changes_url": changes_url,
+        "changes_cursor": changes_cursor,
+        "changes_start": date_range[0],
+        "changes_end": date_range[-1],
     })
-    logger.info("timeline view=%s total_ms=%.1f", view, (time.perf_counter() - t0) * 1000)
-    return response
 
 
+@login_required
+def scheduling_timeline(request):
+    try:
+        profile = request.user.userprofile
+    except UserProfile.DoesNotExist:
+        return redirect("users:login")
+    is_manager_user = profile.is_manager()
+    if not is_manager_user and profile.role != "worker":
+        return redirect("users:login")
+
+    window = get_active_window()
+    allow_worker_view = window[3]
+    if not is_manager_user and not allow_worker_view:
+        return render(request, "scheduling/timeline_locked.html", {"allow_worker_view": allow_worker_view})
+
+    options = timeline_options(request, is_manager_user)
+    stores = list(Store.objects.all())
+    # 先取遊標再讀班表，兩者之間發生的異動會在頁面第一次詢問時補上
+    changes_cursor = latest_change_id()
+    holiday_map = build_holiday_map(options["dates"])
+    workers = list(timeline_workers())
+    shifts = list(timeline_shifts(options["dates"], options["store_query"]))
+    return render_timeline(request, profile, window, options, stores, changes_cursor, holiday_map, workers, shifts)
+
+
+@async_login_required
+async def ascheduling_timeline(request):
+    profile = await aget_profile(request.user)
+    if profile is None:
+        return redirect("users:login")
+    is_manager_user = profile.is_manager()
+    if not is_manager_user and profile.role != "worker":
+        return redirect("users:login")
+
+    window = await aget_active_window()
+    allow_worker_view = window[3]
+    if not is_manager_user and not allow_worker_view:
+        return await sync_to_async(render)(
+            request, "scheduling/timeline_locked.html", {"allow_worker_view": allow_worker_view}
+        )
+
+    options = timeline_options(request, is_manager_user)
+    stores = [store async for store in Store.objects.all()]
+    changes_cursor = await alatest_change_id()
+    holiday_map = await sync_to_async(build_holiday_map)(options["dates"])
+    workers = [worker async for worker in timeline_workers()]
+    shifts = [shift async for shift in timeline_shifts(options["dates"], options["store_query"])]
+    return await sync_to_async(render_timeline)(
+        request, profile, window, options, stores, changes_cursor, holiday_map, workers, shifts
+    )
+
 
 @login_required
 @user_passes_test(is_manager)
@@ -561,14 +615,19 @@ def export_excel_view(request):
     """
     匯出目前所有 Shift 為 Excel。
     """
+    # openpyxl 載入成本高且只有匯出會用到，延後到此處才 import
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment, PatternFill
+
     shifts = Shift.objects.select_related('employee__user', 'store').all().order_by('date', 'start_time')
+    holiday_map = build_holiday_map(shifts.dates("date", "year"))
 
     wb = Workbook()
     ws = wb.active
     ws.title = "班表"
 
     # 標題列
-    headers = ["日期", "員工姓名", "店別", "開始時間", "結束時間", "備註", "是否發佈"]
+    headers = ["日期", "員工姓名", "店別", "開始時間", "結束時間", "備註", "是否發佈", "國定假日"]
     header_font = Font(bold=True)
     header_fill = PatternFill(start_color="FFC000", end_color="FFC000", fill_type="solid")
     center = Alignment(horizontal="center", vertical="center")
@@ -594,6 +653,7 @@ def export_excel_view(request):
         ws.cell(row=row_num, column=5, value=s.end_time.strftime("%H:%M"))
         ws.cell(row=row_num, column=6, value=s.note)
         ws.cell(row=row_num, column=7, value="是" if s.is_published else "否")
+        ws.cell(row=row_num, column=8, value=holiday_map.get(s.date.strftime("%Y-%m-%d"), ""))
 
         row_num += 1
 
@@ -650,7 +710,8 @@ def create_shift(request):
     if end_min <= start_min:
         return JsonResponse({"ok": False, "error": "invalid range"}, status=400)
 
-    if store_id and not Store.objects.filter(id=store_id).exists():
+    store = Store.objects.filter(id=store_id).first() if store_id else None
+    if store_id and store is None:
         return JsonResponse({"ok": False, "error": "invalid store"}, status=400)
 
     break_minutes = parse_break_minutes(raw_break_minutes)
@@ -672,18 +733,20 @@ def create_shift(request):
             status=400,
         )
 
-    shift = Shift.objects.create(
-        employee_id=employee_id,
-        store_id=store_id,
-        date=date,
-        start_time=start_time,
-        end_time=end_time,
-        break_minutes=break_minutes,
-        is_published=True,
-        note=note,
-    )
+    with transaction.atomic():
+        shift = Shift.objects.create(
+            employee_id=employee_id,
+            store=store,
+            date=date,
+            start_time=start_time,
+            end_time=end_time,
+            break_minutes=break_minutes,
+            is_published=True,
+            note=note,
+        )
+        change = record_shift_change(ScheduleChange.ACTION_CREATE, shift, request.user.userprofile)
 
-    return JsonResponse({"ok": True, "id": shift.id})
+    return JsonResponse({"ok": True, "id": shift.id, "change_ids": [change.id]})
 
 @csrf_exempt
 def delete_shift(request):
@@ -692,8 +755,15 @@ def delete_shift(request):
     data = json.loads(request.body)
     shift_id = data.get("id")
 
-    Shift.objects.filter(id=shift_id).delete()
-    return JsonResponse({"ok": True})
+    change_ids = []
+    with transaction.atomic():
+        # 鎖住班別再記錄刪除前的內容，避免與同時進行的修改交錯
+        shift = Shift.objects.select_for_update().filter(id=shift_id).first()
+        if shift:
+            change = record_shift_change(ScheduleChange.ACTION_DELETE, shift, request.user.userprofile)
+            shift.delete()
+            change_ids.append(change.id)
+    return JsonResponse({"ok": True, "change_ids": change_ids})
 
 @csrf_exempt
 def update_shift(request):
@@ -719,7 +789,8 @@ def update_shift(request):
 
     if store_id in ("", "null", "none"):
         store_id = None
-    if store_id and not Store.objects.filter(id=store_id).exists():
+    store = Store.objects.filter(id=store_id).first() if store_id else None
+    if store_id and store is None:
         return JsonResponse({"ok": False, "error": "invalid store"}, status=400)
 
     break_minutes = parse_break_minutes(raw_break_minutes)
@@ -728,6 +799,7 @@ def update_shift(request):
 
     split_start_time = None
     split_end_time = None
+    split_store = None
     if split_start_str or split_end_str or split_store_id:
         if not split_start_str or not split_end_str or not split_store_id:
             return JsonResponse({"ok": False, "error": "invalid split fields"}, status=400)
@@ -738,7 +810,8 @@ def update_shift(request):
             return JsonResponse({"ok": False, "error": "invalid split time"}, status=400)
         if (split_end_time.hour * 60 + split_end_time.minute) <= (split_start_time.hour * 60 + split_start_time.minute):
             return JsonResponse({"ok": False, "error": "invalid split range"}, status=400)
-        if not Store.objects.filter(id=split_store_id).exists():
+        split_store = Store.objects.filter(id=split_store_id).first()
+        if split_store is None:
             return JsonResponse({"ok": False, "error": "invalid split store"}, status=400)
         if split_start_time < end_time and split_end_time > start_time:
             return JsonResponse(
@@ -771,27 +844,35 @@ def update_shift(request):
                 status=400,
             )
 
-    shift.start_time = start_time
-    shift.end_time = end_time
-    shift.store_id = store_id
-    if break_minutes is not None:
-        shift.break_minutes = break_minutes
-    if note is not None:
-        shift.note = note.strip()
-    shift.save()
-
-    if split_start_time and split_end_time:
-        Shift.objects.create(
-            employee_id=shift.employee_id,
-            store_id=split_store_id,
-            date=shift.date,
-            start_time=split_start_time,
-            end_time=split_end_time,
-            is_published=True,
-            break_minutes=0,
-        )
+    with transaction.atomic():
+        # 鎖住後重新讀取，before 才是這次寫入前的內容
+        shift = Shift.objects.select_for_update().filter(id=shift.id).first()
+        if shift is None:
+            return JsonResponse({"ok": False, "error": "找不到資料"}, status=404)
+        before = shift_snapshot(shift)
+        shift.start_time = start_time
+        shift.end_time = end_time
+        shift.store = store
+        if break_minutes is not None:
+            shift.break_minutes = break_minutes
+        if note is not None:
+            shift.note = note.strip()
+        shift.save()
+        changes = [record_shift_change(ScheduleChange.ACTION_UPDATE, shift, request.user.userprofile, before)]
+
+        if split_start_time and split_end_time:
+            split_shift = Shift.objects.create(
+                employee_id=shift.employee_id,
+                store=split_store,
+                date=shift.date,
+                start_time=split_start_time,
+                end_time=split_end_time,
+                is_published=True,
+                break_minutes=0,
+            )
+            changes.append(record_shift_change(ScheduleChange.ACTION_CREATE, split_shift, request.user.userprofile))
 
-    return JsonResponse({"ok": True})
+    return JsonResponse({"ok": True, "change_ids": [change.id for change in changes]})
 
 
 @login_required
@@ -933,51 +1014,16 @@ def manage_window(request):
     )
 
 
-@login_required
-def worker_schedule(request):
-    try:
-        profile = request.user.userprofile
-    except UserProfile.DoesNotExist:
-        return redirect("users:login")
-
-    if profile.is_manager():
-        return redirect("scheduling:timeline")
-
-    start_date, end_date, has_manager_window, allow_worker_view, allow_worker_edit_shifts, _, break_rules = get_active_window()
-    view = request.GET.get("view", "week")
-    if view not in ("day", "week", "month"):
-        view = "week"
-    date_str = request.GET.get("date")
-    date = parse_date(date_str) if date_str else None
-    if not date:
-        date = localtime(now()).date()
-
-    month_str = request.GET.get("month")
-    month_date = None
-    if month_str:
-        try:
-            year, month = month_str.split("-")
-            month_date = datetime(int(year), int(month), 1).date()
-        except ValueError:
-            month_date = None
-    if not month_date:
-        month_date = date.replace(day=1)
-    if view == "month" and not date_str:
-        date = month_date
-
+def render_worker_schedule(request, profile, window, options, holiday_map, changes_cursor, workers, shifts):
+    """員工的班表頁面；與 render_timeline 相同，WSGI / ASGI 兩個 view 共用。"""
+    start_date, end_date, _, _, allow_worker_edit_shifts, _, break_rules = window
+    view = options["view"]
+    date = options["date"]
+    month_date = options["month_date"]
+    date_range = options["dates"]
     weekday_labels = ["一", "二", "三", "四", "五", "六", "日"]
     day_headers = None
     month_days = None
-    if view == "week":
-        week_start = date - timedelta(days=date.weekday())
-        date_range = [week_start + timedelta(days=i) for i in range(7)]
-    elif view == "day":
-        date_range = [date]
-    else:
-        _, days_in_month = month_calendar.monthrange(month_date.year, month_date.month)
-        date_range = [month_date.replace(day=i) for i in range(1, days_in_month + 1)]
-
-    holiday_map = build_holiday_map(date_range)
     if view in ("week", "day"):
         day_headers = [{
             "label": f"{d.strftime('%m/%d')}（{weekday_labels[d.weekday()]}）",
@@ -995,23 +1041,6 @@ def worker_schedule(request):
             "weekday_label": weekday_labels[d.weekday()],
         } for d in date_range]
 
-    if allow_worker_view:
-        workers = UserProfile.objects.filter(role__in=("worker", "supervisor")).select_related("user").order_by(
-            "sort_order", "name", "user__username"
-        )
-        shifts = (
-            Shift.objects.filter(date__in=date_range, is_published=True)
-            .select_related("employee__user", "store")
-            .order_by("start_time")
-        )
-    else:
-        workers = [profile]
-        shifts = (
-            Shift.objects.filter(employee=profile, date__in=date_range, is_published=True)
-            .select_related("employee__user", "store")
-            .order_by("start_time")
-        )
-
     by_employee_date = {}
     for s in shifts:
         by_employee_date.setdefault(s.employee_id, {}).setdefault(s.date, []).append(s)
@@ -1110,6 +1139,7 @@ def worker_schedule(request):
     shift_create_url = reverse("scheduling:worker_shift_create")
     shift_update_url = reverse("scheduling:worker_shift_update")
     shift_delete_url = reverse("scheduling:worker_shift_delete")
+    shift_revert_url = reverse("scheduling:shift_revert")
     show_profile_warning = profile.missing_required_info()
 
     return render(
@@ -1133,6 +1163,7 @@ def worker_schedule(request):
             "shift_create_url": shift_create_url,
             "shift_update_url": shift_update_url,
             "shift_delete_url": shift_delete_url,
+            "shift_revert_url": shift_revert_url,
             "today_str": localtime(now()).date().strftime("%Y-%m-%d"),
             "hide_store_filter": True,
             "hide_store_info": False,
@@ -1141,13 +1172,53 @@ def worker_schedule(request):
             "show_profile_warning": show_profile_warning,
             "self_scheduled_hours": format_minutes(scheduled_minutes),
             "break_rules_json": json.dumps(normalize_break_rules(break_rules)),
+            "changes_url": reverse("scheduling:changes"),
+            "changes_cursor": changes_cursor,
+            "changes_start": date_range[0],
+            "changes_end": date_range[-1],
         },
     )
 
 
-def worker_shift_edit_allowed():
-    _, _, _, _, allow_worker_edit_shifts, _, _ = get_active_window()
-    return allow_worker_edit_shifts
+@login_required
+def worker_schedule(request):
+    try:
+        profile = request.user.userprofile
+    except UserProfile.DoesNotExist:
+        return redirect("users:login")
+    if profile.is_manager():
+        return redirect("scheduling:timeline")
+
+    window = get_active_window()
+    allow_worker_view = window[3]
+    options = timeline_options(request, False)
+    holiday_map = build_holiday_map(options["dates"])
+    changes_cursor = latest_change_id()
+    workers = list(timeline_workers()) if allow_worker_view else [profile]
+    shifts = list(timeline_shifts(options["dates"], employee=None if allow_worker_view else profile))
+    return render_worker_schedule(request, profile, window, options, holiday_map, changes_cursor, workers, shifts)
+
+
+@async_login_required
+async def aworker_schedule(request):
+    profile = await aget_profile(request.user)
+    if profile is None:
+        return redirect("users:login")
+    if profile.is_manager():
+        return redirect("scheduling:timeline")
+
+    window = await aget_active_window()
+    allow_worker_view = window[3]
+    options = timeline_options(request, False)
+    holiday_map = await sync_to_async(build_holiday_map)(options["dates"])
+    changes_cursor = await alatest_change_id()
+    workers = [worker async for worker in timeline_workers()] if allow_worker_view else [profile]
+    shifts = [
+        shift async for shift in timeline_shifts(options["dates"], employee=None if allow_worker_view else profile)
+    ]
+    return await sync_to_async(render_worker_schedule)(
+        request, profile, window, options, holiday_map, changes_cursor, workers, shifts
+    )
 
 
 @csrf_exempt
@@ -1314,7 +1385,8 @@ def create_worker_shift(request):
         return JsonResponse({"ok": False, "error": "查無使用者資料"}, status=400)
     if not is_worker(request.user):
         return JsonResponse({"ok": False, "error": "僅限員工操作"}, status=403)
-    if not worker_shift_edit_allowed():
+    start_date, end_date, _, _, allow_worker_edit_shifts, _, break_rules = get_active_window()
+    if not allow_worker_edit_shifts:
         return JsonResponse({"ok": False, "error": "目前未開放員工排班"}, status=403)
 
     try:
@@ -1346,7 +1418,6 @@ def create_worker_shift(request):
     if (end_time.hour * 60 + end_time.minute) <= (start_time.hour * 60 + start_time.minute):
         return JsonResponse({"ok": False, "error": "結束時間需晚於開始時間"}, status=400)
 
-    start_date, end_date, _, _, _, _, _ = get_active_window()
     if date < start_date or date > end_date:
         return JsonResponse({"ok": False, "error": "不在可排班的日期區間內"}, status=400)
 
@@ -1366,17 +1437,19 @@ def create_worker_shift(request):
     if break_minutes is None:
         break_minutes = calculate_break_minutes(break_rules, start_time, end_time)
 
-    shift = Shift.objects.create(
-        employee=profile,
-        store_id=None,
-        date=date,
-        start_time=start_time,
-        end_time=end_time,
-        break_minutes=break_minutes,
-        is_published=True,
-    )
+    with transaction.atomic():
+        shift = Shift.objects.create(
+            employee=profile,
+            store_id=None,
+            date=date,
+            start_time=start_time,
+            end_time=end_time,
+            break_minutes=break_minutes,
+            is_published=True,
+        )
+        change = record_shift_change(ScheduleChange.ACTION_CREATE, shift, profile)
 
-    return JsonResponse({"ok": True, "id": shift.id})
+    return JsonResponse({"ok": True, "id": shift.id, "change_ids": [change.id]})
 
 
 @csrf_exempt
@@ -1388,7 +1461,8 @@ def update_worker_shift(request):
         return JsonResponse({"ok": False, "error": "查無使用者資料"}, status=400)
     if not is_worker(request.user):
         return JsonResponse({"ok": False, "error": "僅限員工操作"}, status=403)
-    if not worker_shift_edit_allowed():
+    start_date, end_date, _, _, allow_worker_edit_shifts, _, _ = get_active_window()
+    if not allow_worker_edit_shifts:
         return JsonResponse({"ok": False, "error": "目前未開放員工排班"}, status=403)
 
     try:
@@ -1419,7 +1493,6 @@ def update_worker_shift(request):
     if (end_time.hour * 60 + end_time.minute) <= (start_time.hour * 60 + start_time.minute):
         return JsonResponse({"ok": False, "error": "結束時間需晚於開始時間"}, status=400)
 
-    start_date, end_date, _, _, _, _, _ = get_active_window()
     if shift.date < start_date or shift.date > end_date:
         return JsonResponse({"ok": False, "error": "不在可排班的日期區間內"}, status=400)
 
@@ -1437,14 +1510,21 @@ def update_worker_shift(request):
     if raw_break_minutes not in (None, "") and break_minutes is None:
         return JsonResponse({"ok": False, "error": "休息時間格式錯誤"}, status=400)
 
-    shift.start_time = start_time
-    shift.end_time = end_time
-    shift.store_id = None
-    if break_minutes is not None:
-        shift.break_minutes = break_minutes
-    shift.save(update_fields=["start_time", "end_time", "store_id", "break_minutes"])
+    with transaction.atomic():
+        shift = Shift.objects.select_for_update().filter(
+            id=shift.id, employee=profile, is_published=True, store__isnull=True
+        ).first()
+        if shift is None:
+            return JsonResponse({"ok": False, "error": "找不到資料"}, status=404)
+        before = shift_snapshot(shift)
+        shift.start_time = start_time
+        shift.end_time = end_time
+        if break_minutes is not None:
+            shift.break_minutes = break_minutes
+        shift.save(update_fields=["start_time", "end_time", "break_minutes"])
+        change = record_shift_change(ScheduleChange.ACTION_UPDATE, shift, profile, before)
 
-    return JsonResponse({"ok": True})
+    return JsonResponse({"ok": True, "change_ids": [change.id]})
 
 
 @csrf_exempt
@@ -1456,7 +1536,8 @@ def delete_worker_shift(request):
         return JsonResponse({"ok": False, "error": "查無使用者資料"}, status=400)
     if not is_worker(request.user):
         return JsonResponse({"ok": False, "error": "僅限員工操作"}, status=403)
-    if not worker_shift_edit_allowed():
+    _, _, _, _, allow_worker_edit_shifts, _, _ = get_active_window()
+    if not allow_worker_edit_shifts:
         return JsonResponse({"ok": False, "error": "目前未開放員工排班"}, status=403)
 
     try:
@@ -1465,15 +1546,340 @@ def delete_worker_shift(request):
     except Exception:
         return JsonResponse({"ok": False, "error": "資料格式錯誤"}, status=400)
 
-    shift = Shift.objects.filter(
-        id=shift_id,
-        employee=profile,
-        is_published=True,
-    ).first()
-    if not shift:
+    with transaction.atomic():
+        shift = Shift.objects.select_for_update().filter(
+            id=shift_id,
+            employee=profile,
+            is_published=True,
+        ).first()
+        if not shift:
+            return JsonResponse({"ok": False, "error": "找不到資料"}, status=404)
+        if shift.store_id:
+            return JsonResponse({"ok": False, "error": "店長排定班表不可刪除"}, status=403)
+        change = record_shift_change(ScheduleChange.ACTION_DELETE, shift, profile)
+        shift.delete()
+
+    return JsonResponse({"ok": True, "change_ids": [change.id]})
+
+
+SCHEDULE_CHANGES_LIMIT = 200
+# long-poll 每次檢查都重新連線（ASGI 模式不保留連線），間隔由 1 秒加倍到 5 秒
+SCHEDULE_CHANGES_CHECK_SECONDS = 1
+SCHEDULE_CHANGES_MAX_CHECK_SECONDS = 5
+# id 在 INSERT 時配發、commit 可能較晚，較小的 id 可能比較大的 id 晚出現；
+# 遊標只前進到超過這段時間的紀錄，較新的紀錄每次重讀，由頁面以 id 去除重複
+SCHEDULE_CHANGES_SETTLE_SECONDS = 10
+
+
+def settled_change_ids():
+    settled = now() - timedelta(seconds=SCHEDULE_CHANGES_SETTLE_SECONDS)
+    return ScheduleChange.objects.filter(created_at__lte=settled).order_by("-id").values_list("id", flat=True)
+
+
+def latest_change_id():
+    return settled_change_ids().first() or 0
+
+
+async def alatest_change_id():
+    return await settled_change_ids().afirst() or 0
+
+
+def load_schedule_changes(after, start, end, employee_id=None):
+    rows = list(
+        ScheduleChange.objects.filter(id__gt=after)
+        .order_by("id")
+        .values("id", "action", "shift_id", "employee_id", "date", "after", "created_at")[:SCHEDULE_CHANGES_LIMIT + 1]
+    )
+    more = len(rows) > SCHEDULE_CHANGES_LIMIT
+    rows = rows[:SCHEDULE_CHANGES_LIMIT]
+    # 遊標前進到最後一筆已穩定的紀錄，範圍外的異動也不必再讀
+    settled = now() - timedelta(seconds=SCHEDULE_CHANGES_SETTLE_SECONDS)
+    cursor = after
+    for row in rows:
+        if row["created_at"] > settled:
+            more = False
+            break
+        cursor = row["id"]
+    rows = [
+        row for row in rows
+        if start <= row["date"] <= end and (employee_id is None or row["employee_id"] == employee_id)
+    ]
+    store_ids = {row["after"]["store_id"] for row in rows if row["after"] and row["after"]["store_id"]}
+    stores = Store.objects.in_bulk(store_ids) if store_ids else {}
+    changes = []
+    for row in rows:
+        shift = None
+        if row["after"]:
+            store_name, store_color, store_text_color = store_display(stores.get(row["after"]["store_id"]))
+            shift = {
+                **row["after"],
+                "id": row["shift_id"],
+                "employee_id": row["employee_id"],
+                "date": row["date"].strftime("%Y-%m-%d"),
+                "store_name": store_name,
+                "store_color": store_color,
+                "store_text_color": store_text_color,
+            }
+        changes.append({
+            "id": row["id"],
+            "action": row["action"],
+            "shift_id": row["shift_id"],
+            "employee_id": row["employee_id"],
+            "date": row["date"].strftime("%Y-%m-%d"),
+            "shift": shift,
+        })
+    return changes, cursor, more
+
+
+def poll_schedule_changes(after, start, end, employee_id):
+    # 等待期間不佔用資料庫連線
+    try:
+        return load_schedule_changes(after, start, end, employee_id)
+    finally:
+        connection.close()
+
+
+def schedule_changes_params(request):
+    """scheduling:changes 的查詢參數 (after, seen, start, end)，格式錯誤時回傳 None。"""
+    try:
+        after = int(request.GET.get("after", ""))
+        seen = int(request.GET.get("seen") or after)
+        start = parse_date(request.GET.get("start", ""))
+        end = parse_date(request.GET.get("end", ""))
+    except ValueError:
+        return None
+    if not start or not end or end < start:
+        return None
+    return after, seen, start, end
+
+
+@login_required
+def schedule_changes(request):
+    # WSGI 模式立即回應，由頁面每 SCHEDULE_CHANGES_POLL_MS 詢問一次，不佔住 sync worker
+    try:
+        profile = request.user.userprofile
+    except UserProfile.DoesNotExist:
+        return JsonResponse({"ok": False, "error": "查無使用者資料"}, status=403)
+    params = schedule_changes_params(request)
+    if params is None:
+        return JsonResponse({"ok": False, "error": "invalid parameters"}, status=400)
+    after, _, start, end = params
+
+    employee_id = None
+    if not profile.is_manager():
+        _, _, _, allow_worker_view, _, _, _ = get_active_window()
+        if not allow_worker_view:
+            employee_id = profile.id
+
+    changes, cursor, more = load_schedule_changes(after, start, end, employee_id)
+    retry_ms = 0 if more else settings.SCHEDULE_CHANGES_POLL_MS
+    return JsonResponse({"ok": True, "cursor": cursor, "changes": changes, "retry_ms": retry_ms})
+
+
+@async_login_required
+async def aschedule_changes(request):
+    profile = await aget_profile(request.user)
+    if profile is None:
+        return JsonResponse({"ok": False, "error": "查無使用者資料"}, status=403)
+    params = schedule_changes_params(request)
+    if params is None:
+        return JsonResponse({"ok": False, "error": "invalid parameters"}, status=400)
+    after, seen, start, end = params
+
+    employee_id = None
+    if not profile.is_manager():
+        _, _, _, allow_worker_view, _, _, _ = await aget_active_window()
+        if not allow_worker_view:
+            employee_id = profile.id
+
+    # 沒有新異動時等待一段時間再回應（long-poll）
+    wait_seconds = settings.SCHEDULE_CHANGES_WAIT_SECONDS
+    deadline = time.monotonic() + wait_seconds
+    changes, cursor, more = await sync_to_async(load_schedule_changes)(after, start, end, employee_id)
+    # 重讀到的是頁面已套用過的異動時繼續等待；出現新的 id（含較晚 commit 的較小 id）才回應
+    known = {change["id"] for change in changes if change["id"] <= seen}
+    interval = SCHEDULE_CHANGES_CHECK_SECONDS
+    while not more and all(change["id"] in known for change in changes):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        await asyncio.sleep(min(interval, remaining))
+        interval = min(interval * 2, SCHEDULE_CHANGES_MAX_CHECK_SECONDS)
+        changes, cursor, more = await sync_to_async(poll_schedule_changes)(after, start, end, employee_id)
+
+    retry_ms = 0 if more or wait_seconds else settings.SCHEDULE_CHANGES_POLL_MS
+    return JsonResponse({"ok": True, "cursor": cursor, "changes": changes, "retry_ms": retry_ms})
+
+
+def revert_shift_change(change, actor):
+    """
+    把班別還原為 change 之前的內容，並記成一筆新的異動；對復原產生的那筆再做一次就是重做。
+    班別在 change 之後又被異動過時不還原，回傳錯誤訊息。
+    """
+    shift = Shift.objects.select_for_update().filter(id=change.shift_id).first()
+    if (shift_snapshot(shift) if shift else None) != change.after:
+        return None, "此班別之後已被修改，無法復原"
+
+    target = change.before
+    if target is None and change.action == ScheduleChange.ACTION_UPDATE:
+        return None, "此異動沒有修改前的內容，無法復原"
+    if target is None:
+        reverted = record_shift_change(ScheduleChange.ACTION_DELETE, shift, actor, reverts=change)
+        shift.delete()
+        return reverted, None
+
+    if target["store_id"] and not Store.objects.filter(id=target["store_id"]).exists():
+        return None, "店別已刪除，無法復原"
+    start_time = datetime.strptime(target["start"], "%H:%M").time()
+    end_time = datetime.strptime(target["end"], "%H:%M").time()
+    conflict = Shift.objects.filter(
+        employee_id=change.employee_id,
+        date=change.date,
+        start_time__lt=end_time,
+        end_time__gt=start_time,
+    ).exclude(id=change.shift_id).exists()
+    if conflict:
+        return None, "排班時間重疊，無法復原"
+
+    if shift is None:
+        # 以原本的 id 重建，前後的異動紀錄仍指向同一個班別
+        action, before = ScheduleChange.ACTION_CREATE, None
+        shift = Shift(id=change.shift_id, employee_id=change.employee_id, date=change.date)
+    else:
+        action, before = ScheduleChange.ACTION_UPDATE, shift_snapshot(shift)
+    shift.start_time = start_time
+    shift.end_time = end_time
+    shift.store_id = target["store_id"]
+    shift.break_minutes = target["break_minutes"]
+    shift.note = target["note"]
+    shift.is_published = target["is_published"]
+    shift.save(force_insert=action == ScheduleChange.ACTION_CREATE)
+    return record_shift_change(action, shift, actor, before, reverts=change), None
+
+
+@csrf_exempt
+@login_required
+def revert_shift_changes(request):
+    try:
+        profile = request.user.userprofile
+    except UserProfile.DoesNotExist:
+        return JsonResponse({"ok": False, "error": "查無使用者資料"}, status=400)
+    try:
+        data = json.loads(request.body)
+        change_ids = {int(change_id) for change_id in data.get("change_ids")}
+    except Exception:
+        return JsonResponse({"ok": False, "error": "資料格式錯誤"}, status=400)
+
+    # 只能復原自己做的異動；同一次操作產生的多筆由後往前還原
+    changes = list(ScheduleChange.objects.filter(id__in=change_ids, actor=profile).order_by("-id"))
+    if not changes or len(changes) != len(change_ids):
         return JsonResponse({"ok": False, "error": "找不到資料"}, status=404)
-    if shift.store_id:
-        return JsonResponse({"ok": False, "error": "店長排定班表不可刪除"}, status=403)
-    shift.delete()
 
-    return JsonResponse({"ok": True})
+    if not is_manager(request.user):
+        if not is_worker(request.user):
+            return JsonResponse({"ok": False, "error": "僅限員工操作"}, status=403)
+        start_date, end_date, _, _, allow_worker_edit_shifts, _, _ = get_active_window()
+        if not allow_worker_edit_shifts:
+            return JsonResponse({"ok": False, "error": "目前未開放員工排班"}, status=403)
+        for change in changes:
+            if change.employee_id != profile.id or any(
+                snapshot and snapshot["store_id"] for snapshot in (change.before, change.after)
+            ):
+                return JsonResponse({"ok": False, "error": "店長排定班表不可修改"}, status=403)
+            if change.date < start_date or change.date > end_date:
+                return JsonResponse({"ok": False, "error": "不在可排班的日期區間內"}, status=400)
+
+    with transaction.atomic():
+        reverted = []
+        for change in changes:
+            new_change, error = revert_shift_change(change, profile)
+            if error:
+                transaction.set_rollback(True)
+                return JsonResponse({"ok": False, "error": error}, status=409)
+            reverted.append(new_change.id)
+
+    return JsonResponse({"ok": True, "change_ids": reverted})
+
+
+def schedule_diff(since, until, start=None, end=None, employee_id=None):
+    """
+    since 之後到 until（含）之間每個班別的淨變化：同一班別異動多次時只比較第一筆的 before
+    與最後一筆的 after，改了又改回來的不列出。只讀期間內的異動紀錄，不必比對整份班表。
+    """
+    # 0016 之前記錄的修改沒有 before，無從比較，略過而不當成新增
+    changes = ScheduleChange.objects.filter(created_at__gt=since, created_at__lte=until).exclude(
+        action=ScheduleChange.ACTION_UPDATE, before__isnull=True
+    )
+    if employee_id is not None:
+        changes = changes.filter(employee_id=employee_id)
+    if start:
+        changes = changes.filter(date__gte=start)
+    if end:
+        changes = changes.filter(date__lte=end)
+
+    net = {}
+    for row in changes.order_by("id").values("shift_id", "employee_id", "date", "before", "after").iterator():
+        entry = net.setdefault(row["shift_id"], row)
+        entry["after"] = row["after"]
+
+    diff = []
+    for entry in net.values():
+        if entry["before"] == entry["after"]:
+            continue
+        if entry["before"] is None:
+            action = ScheduleChange.ACTION_CREATE
+        elif entry["after"] is None:
+            action = ScheduleChange.ACTION_DELETE
+        else:
+            action = ScheduleChange.ACTION_UPDATE
+        diff.append({
+            "shift_id": entry["shift_id"],
+            "employee_id": entry["employee_id"],
+            "date": entry["date"].strftime("%Y-%m-%d"),
+            "action": action,
+            "before": entry["before"],
+            "after": entry["after"],
+        })
+    return diff
+
+
+def parse_moment(value):
+    # 可只給日期（當天 00:00），未帶時區時以本地時區解讀
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = datetime.combine(day, datetime.min.time()) if day else None
+    except ValueError:
+        return None
+    if moment is not None and is_naive(moment):
+        moment = make_aware(moment)
+    return moment
+
+
+@login_required
+def schedule_changes_diff(request):
+    if not is_manager(request.user):
+        return JsonResponse({"ok": False, "error": "僅限店長操作"}, status=403)
+    since = parse_moment(request.GET.get("since", ""))
+    until = parse_moment(request.GET["until"]) if request.GET.get("until") else now()
+    try:
+        start = parse_date(request.GET.get("start", ""))
+        end = parse_date(request.GET.get("end", ""))
+        employee_id = int(request.GET["employee"]) if request.GET.get("employee") else None
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "invalid parameters"}, status=400)
+    if since is None or until is None or until < since:
+        return JsonResponse({"ok": False, "error": "invalid parameters"}, status=400)
+    if since < now() - timedelta(days=settings.SCHEDULE_CHANGES_RETENTION_DAYS):
+        return JsonResponse(
+            {"ok": False, "error": f"異動紀錄只保留 {settings.SCHEDULE_CHANGES_RETENTION_DAYS} 天"},
+            status=400,
+        )
+
+    return JsonResponse({
+        "ok": True,
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "changes": schedule_diff(since, until, start, end, employee_id),
+    })
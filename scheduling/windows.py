@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import GenerationCache
+from .models import SchedulingWindow
+
+# 最新一筆排班期間幾乎每個頁面都會讀（權限、可排班日期），由各 process 快取
+_window_cache = GenerationCache("window")
+
+
+def get_latest_window():
+    return _window_cache.get("latest", lambda: SchedulingWindow.objects.order_by("-created_at").first())
+
+
+@receiver(post_save, sender=SchedulingWindow)
+@receiver(post_delete, sender=SchedulingWindow)
+def _window_changed(sender, **kwargs):
+    _window_cache.invalidate()
@@ -24,6 +24,9 @@ mkdir -p certbot/www
 
 docker compose build
 
+docker compose run --rm --no-deps web python manage.py migrate --noinput
+docker compose run --rm --no-deps web python manage.py collectstatic --noinput
+
 docker compose up -d
 
 printf "Deploy complete: %s\n" "$(git rev-parse --short HEAD)"
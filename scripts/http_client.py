@@ -0,0 +1,46 @@
+"""
+scripts/ 內工具共用的 HTTP client：以 cookie 保存 session，並自動帶上 CSRF token。
+"""
+import http.cookiejar
+import json
+import urllib.error
+import urllib.parse
+import urllib.request
+
+
+class Client:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == "csrftoken":
+                return cookie.value
+        return ""
+
+    def request(self, path, data=None, headers=None, method=None):
+        headers = {"X-CSRFToken": self.csrf_token(), "Referer": self.base_url + "/", **(headers or {})}
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with self.opener.open(req) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.read()
+
+    def json(self, path, data=None, headers=None, method=None):
+        status, body = self.request(path, data, headers, method)
+        try:
+            return status, json.loads(body or b"{}")
+        except ValueError:
+            return status, {}
+
+    def login(self, username, password):
+        self.request("/users/login/")
+        data = urllib.parse.urlencode(
+            {"username": username, "password": password, "csrfmiddlewaretoken": self.csrf_token()}
+        ).encode()
+        self.request("/users/login/", data, {"Content-Type": "application/x-www-form-urlencoded"})
+        if not any(cookie.name == "sessionid" for cookie in self.cookies):
+            raise SystemExit("登入失敗")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+以多個並行連線反覆請求班表頁面，比較 sync (WSGI) 與 ASGI 部署的吞吐量與延遲。
+
+    DJANGO_SERVER_MODE=wsgi gunicorn -c gunicorn.conf.py &
+    python scripts/load_test.py --username worker01 --concurrency 50 --duration 30
+
+    DJANGO_SERVER_MODE=asgi gunicorn -c gunicorn.conf.py &
+    python scripts/load_test.py --username worker01 --concurrency 50 --duration 30
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from getpass import getpass
+
+from http_client import Client
+
+DEFAULT_URLS = (
+    "/scheduling/my-availability/?view=week",
+    "/scheduling/my-availability/?view=month",
+)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_client(client, urls, deadline, results, lock):
+    timings = []
+    errors = 0
+    index = 0
+    while time.monotonic() < deadline:
+        url = urls[index % len(urls)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            status, _ = client.request(url)
+        except (urllib.error.URLError, OSError):
+            status = 0
+        elapsed = (time.perf_counter() - started) * 1000
+        if 200 <= status < 400:
+            timings.append(elapsed)
+        else:
+            errors += 1
+    with lock:
+        results["timings"].extend(timings)
+        results["errors"] += errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", default=os.environ.get("LOAD_TEST_PASSWORD"))
+    parser.add_argument("--url", action="append", dest="urls", help="要請求的網址，可重複指定")
+    parser.add_argument("--concurrency", type=int, default=20, help="同時請求的連線數")
+    parser.add_argument("--duration", type=float, default=20.0, help="測試秒數")
+    args = parser.parse_args()
+
+    password = args.password or getpass("Password: ")
+    urls = args.urls or list(DEFAULT_URLS)
+    clients = []
+    for _ in range(args.concurrency):
+        client = Client(args.base_url)
+        client.login(args.username, password)
+        clients.append(client)
+
+    results = {"timings": [], "errors": 0}
+    lock = threading.Lock()
+    started = time.monotonic()
+    deadline = started + args.duration
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for client in clients:
+            pool.submit(run_client, client, urls, deadline, results, lock)
+    elapsed = time.monotonic() - started
+
+    timings = results["timings"]
+    if not timings:
+        raise SystemExit(f"沒有成功的請求（錯誤 {results['errors']} 次）")
+    print(
+        f"requests={len(timings)} errors={results['errors']} rps={len(timings) / elapsed:.1f} "
+        f"p50={percentile(timings, 50):.1f}ms p95={percentile(timings, 95):.1f}ms "
+        f"p99={percentile(timings, 99):.1f}ms max={max(timings):.1f}ms mean={statistics.mean(timings):.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
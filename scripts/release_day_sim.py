@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+模擬開放排班當天：店長開放新的排班期間後，所有員工同時登入、登記可上班時段、
+自行排班並反覆查看班表。用來在上線前估算 gunicorn worker 數與資料庫負載。
+
+    python manage.py generate_dataset --reset --workers 200 --months 3
+    gunicorn -c gunicorn.conf.py &
+    python scripts/release_day_sim.py --workers 100 --duration 60 \\
+        --manager manager --window-start 2025-01-01 --window-end 2025-01-31
+
+帳號為 <prefix><編號>（generate_dataset 產生的 worker1、worker2 ...），所有帳號使用同一個密碼。
+回應 400 且訊息為時段重疊時計為「衝突」而非錯誤；錯誤率超過 --max-error-rate 時以狀態碼 1 結束。
+"""
+import argparse
+import calendar
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from getpass import getpass
+
+from http_client import Client
+from load_test import percentile
+
+ACTIONS = ("availability", "shift", "schedule", "timeline")
+DEFAULT_MIX = "availability=5,shift=1.5,schedule=2.5,timeline=1"
+
+
+def parse_mix(value):
+    weights = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ACTIONS:
+            raise SystemExit(f"--mix 不認得的動作：{name}（可用 {', '.join(ACTIONS)}）")
+        weights[name] = float(weight)
+    return weights
+
+
+def next_month_range(today=None):
+    today = today or date.today()
+    first = (today.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return first, first.replace(day=calendar.monthrange(first.year, first.month)[1])
+
+
+def random_slot(rng):
+    # 08:00–22:00 之間 1 到 4 小時、以半小時為單位的時段
+    start = rng.randrange(8 * 60, 20 * 60, 30)
+    end = min(start + rng.choice((60, 90, 120, 180, 240)), 22 * 60)
+    return f"{start // 60:02d}:{start % 60:02d}", f"{end // 60:02d}:{end % 60:02d}"
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.ok = defaultdict(int)
+        self.conflicts = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.error_samples = defaultdict(set)
+
+    def record(self, action, elapsed_ms, outcome, detail=""):
+        with self.lock:
+            self.timings[action].append(elapsed_ms)
+            if outcome == "ok":
+                self.ok[action] += 1
+            elif outcome == "conflict":
+                self.conflicts[action] += 1
+            else:
+                self.errors[action] += 1
+                if len(self.error_samples[action]) < 5:
+                    self.error_samples[action].add(detail)
+
+
+def classify(status, body):
+    if 200 <= status < 400:
+        return "ok", ""
+    if status == 400:
+        try:
+            error = json.loads(body or b"{}").get("error", "")
+        except ValueError:
+            error = ""
+        if "重疊" in error:
+            return "conflict", error
+        return "error", f"400 {error}"
+    return "error", str(status)
+
+
+class SimulatedWorker:
+    def __init__(self, client, index, args, weights, stats):
+        self.client = client
+        self.rng = random.Random(args.seed + index)
+        self.args = args
+        self.actions = list(weights)
+        self.weights = [weights[name] for name in self.actions]
+        self.stats = stats
+        self.days = (args.window_end - args.window_start).days + 1
+
+    def random_day(self):
+        return self.args.window_start + timedelta(days=self.rng.randrange(self.days))
+
+    def step(self):
+        action = self.rng.choices(self.actions, self.weights)[0]
+        day = self.random_day().isoformat()
+        headers = {"Content-Type": "application/json"}
+        if action == "availability":
+            start, end = random_slot(self.rng)
+            payload = json.dumps({"date": day, "start": start, "end": end}).encode()
+            request = ("/scheduling/availability/create/", payload, headers)
+        elif action == "shift":
+            start, end = random_slot(self.rng)
+            payload = json.dumps({"date": day, "start": start, "end": end}).encode()
+            request = ("/scheduling/shift/worker/create/", payload, headers)
+        elif action == "schedule":
+            request = (f"/scheduling/my-availability/?{urllib.parse.urlencode({'view': 'week', 'date': day})}", None, None)
+        else:
+            request = (f"/scheduling/timeline/?{urllib.parse.urlencode({'view': 'week', 'date': day})}", None, None)
+
+        started = time.perf_counter()
+        try:
+            status, body = self.client.request(*request)
+        except (urllib.error.URLError, OSError) as exc:
+            status, body = 0, str(exc).encode()
+        elapsed = (time.perf_counter() - started) * 1000
+        outcome, detail = classify(status, body)
+        self.stats.record(action, elapsed, outcome, detail)
+
+    def run(self, deadline):
+        while time.monotonic() < deadline:
+            self.step()
+            if self.args.think_ms:
+                time.sleep(self.rng.uniform(0, self.args.think_ms) / 1000)
+
+
+def open_window(args, password):
+    client = Client(args.base_url)
+    client.login(args.manager, password)
+    client.request("/scheduling/window/")
+    for fields in (
+        {"action": "update_dates", "start_date": args.window_start.isoformat(), "end_date": args.window_end.isoformat()},
+        {
+            "action": "update_permissions",
+            "allow_worker_view": "on",
+            "allow_worker_edit_shifts": "on",
+            "allow_worker_register": "on",
+        },
+    ):
+        data = urllib.parse.urlencode({**fields, "csrfmiddlewaretoken": client.csrf_token()}).encode()
+        status, _ = client.request(
+            "/scheduling/window/", data, {"Content-Type": "application/x-www-form-urlencoded"}
+        )
+        if status >= 400:
+            raise SystemExit(f"開放排班期間失敗（{status}）")
+    print(f"已開放排班期間 {args.window_start} ~ {args.window_end}")
+
+
+def login_all(args, password):
+    clients = [None] * args.workers
+    timings = []
+    failures = []
+
+    def login(position):
+        client = Client(args.base_url)
+        username = f"{args.prefix}{args.start_index + position}"
+        started = time.perf_counter()
+        try:
+            client.login(username, password)
+        except SystemExit:
+            failures.append(username)
+            return
+        timings.append((time.perf_counter() - started) * 1000)
+        clients[position] = client
+
+    with ThreadPoolExecutor(max_workers=min(args.workers, 32)) as pool:
+        list(pool.map(login, range(args.workers)))
+    if failures:
+        raise SystemExit(f"{len(failures)} 個帳號登入失敗，例如 {', '.join(failures[:3])}")
+    print(
+        f"{args.workers} 位員工登入完成：p50={percentile(timings, 50):.0f}ms "
+        f"p95={percentile(timings, 95):.0f}ms max={max(timings):.0f}ms"
+    )
+    return clients
+
+
+def summarize(stats, elapsed):
+    rows = {}
+    for action in ACTIONS:
+        timings = stats.timings.get(action)
+        if not timings:
+            continue
+        rows[action] = {
+            "requests": len(timings),
+            "ok": stats.ok[action],
+            "conflicts": stats.conflicts[action],
+            "errors": stats.errors[action],
+            "p50_ms": round(percentile(timings, 50), 1),
+            "p95_ms": round(percentile(timings, 95), 1),
+            "p99_ms": round(percentile(timings, 99), 1),
+            "max_ms": round(max(timings), 1),
+            "mean_ms": round(statistics.mean(timings), 1),
+            "error_samples": sorted(stats.error_samples[action]),
+        }
+    total = sum(row["requests"] for row in rows.values())
+    errors = sum(row["errors"] for row in rows.values())
+    all_timings = [value for timings in stats.timings.values() for value in timings]
+    return {
+        "duration_s": round(elapsed, 1),
+        "requests": total,
+        "rps": round(total / elapsed, 1) if elapsed else 0,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0,
+        "conflicts": sum(row["conflicts"] for row in rows.values()),
+        "p50_ms": round(percentile(all_timings, 50), 1) if all_timings else 0,
+        "p99_ms": round(percentile(all_timings, 99), 1) if all_timings else 0,
+        "max_ms": round(max(all_timings), 1) if all_timings else 0,
+        "actions": rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--workers", type=int, default=50, help="同時上線的員工數")
+    parser.add_argument("--prefix", default="worker", help="員工帳號前綴")
+    parser.add_argument("--start-index", type=int, default=1, help="第一個帳號的編號")
+    parser.add_argument("--password", default=os.environ.get("RELEASE_SIM_PASSWORD"), help="員工帳號密碼")
+    parser.add_argument("--manager", help="先以此店長帳號開放排班期間")
+    parser.add_argument("--manager-password", default=os.environ.get("RELEASE_SIM_MANAGER_PASSWORD"))
+    parser.add_argument("--window-start", type=date.fromisoformat, help="排班期間第一天，預設為下個月一日")
+    parser.add_argument("--window-end", type=date.fromisoformat, help="排班期間最後一天，預設為下個月月底")
+    parser.add_argument("--duration", type=float, default=30.0, help="測試秒數")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="在幾秒內讓所有員工陸續開始")
+    parser.add_argument("--think-ms", type=float, default=300.0, help="每個動作之間隨機停頓的上限（毫秒）")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"動作比例，預設 {DEFAULT_MIX}")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="將結果寫入此 JSON 檔")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="錯誤率超過此值時以狀態碼 1 結束")
+    args = parser.parse_args()
+
+    default_start, default_end = next_month_range()
+    args.window_start = args.window_start or default_start
+    args.window_end = args.window_end or default_end
+    if args.window_end < args.window_start:
+        raise SystemExit("--window-end 不可早於 --window-start")
+    weights = parse_mix(args.mix)
+
+    if args.manager:
+        open_window(args, args.manager_password or getpass("Manager password: "))
+    password = args.password or getpass("Worker password: ")
+    clients = login_all(args, password)
+
+    stats = Stats()
+    started = time.monotonic()
+    deadline = started + args.ramp_up + args.duration
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = []
+        for index, client in enumerate(clients):
+            worker = SimulatedWorker(client, index, args, weights, stats)
+            delay = args.ramp_up * index / max(1, args.workers)
+            futures.append(pool.submit(lambda worker=worker, delay=delay: (time.sleep(delay), worker.run(deadline))))
+        for future in futures:
+            future.result()
+    elapsed = time.monotonic() - started
+
+    summary = summarize(stats, elapsed)
+    print(
+        f"\nrequests={summary['requests']} rps={summary['rps']} errors={summary['errors']} "
+        f"error_rate={summary['error_rate']:.2%} conflicts={summary['conflicts']} "
+        f"p50={summary['p50_ms']}ms p99={summary['p99_ms']}ms max={summary['max_ms']}ms"
+    )
+    print(f"{'動作':<14}{'請求':>7}{'成功':>7}{'衝突':>7}{'錯誤':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for action, row in summary["actions"].items():
+        print(
+            f"{action:<14}{row['requests']:>7}{row['ok']:>7}{row['conflicts']:>7}{row['errors']:>7}"
+            f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['max_ms']:>9}"
+        )
+        for sample in row["error_samples"]:
+            print(f"    錯誤：{sample}")
+    if args.json:
+        options = {key: str(value) if isinstance(value, date) else value for key, value in vars(args).items()}
+        for key in ("password", "manager_password"):
+            options.pop(key)
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"args": options, "summary": summary}, fh, ensure_ascii=False, indent=2)
+    if summary["error_rate"] > args.max_error_rate:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+以分段上傳 API 上傳員工證件，可用於本機測試續傳流程。
+
+    python scripts/upload_document.py --base-url http://127.0.0.1:8000 \
+        --username worker01 --category bankbook path/to/file.pdf
+
+中斷後以相同參數加上 --upload-id 重新執行即可從伺服器記錄的位置續傳。
+"""
+import argparse
+import hashlib
+import json
+import mimetypes
+import os
+import sys
+import time
+import urllib.error
+from getpass import getpass
+
+from http_client import Client
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", default=os.environ.get("UPLOAD_PASSWORD"))
+    parser.add_argument("--category", required=True)
+    parser.add_argument("--upload-id", help="續傳既有的上傳")
+    parser.add_argument("--chunk-size", type=int, default=0, help="覆寫伺服器建議的區塊大小")
+    parser.add_argument("--stop-after", type=int, default=0, help="送出幾個區塊後中止（測試續傳用）")
+    args = parser.parse_args()
+
+    client = Client(args.base_url)
+    client.login(args.username, args.password or getpass("Password: "))
+    size = os.path.getsize(args.path)
+    base = "/users/profile/uploads/"
+
+    if args.upload_id:
+        upload_id = args.upload_id
+        status, data = client.json(f"{base}{upload_id}/")
+        if status != 200:
+            raise SystemExit(data.get("error") or f"HTTP {status}")
+        offset, chunk_size = data["offset"], args.chunk_size or 512 * 1024
+    else:
+        payload = {
+            "category": args.category,
+            "file_name": os.path.basename(args.path),
+            "content_type": mimetypes.guess_type(args.path)[0] or "application/octet-stream",
+            "size": size,
+            "sha256": sha256_file(args.path),
+        }
+        status, data = client.json(
+            base, json.dumps(payload).encode(), {"Content-Type": "application/json"}
+        )
+        if status != 200:
+            raise SystemExit(data.get("error") or f"HTTP {status}")
+        upload_id, offset = data["upload_id"], data["offset"]
+        chunk_size = args.chunk_size or data["chunk_size"]
+    print(f"upload_id={upload_id}")
+
+    sent = 0
+    retries = 0
+    with open(args.path, "rb") as fh:
+        while offset < size:
+            if args.stop_after and sent >= args.stop_after:
+                print(f"stopped at offset={offset}")
+                return
+            fh.seek(offset)
+            chunk = fh.read(chunk_size)
+            try:
+                status, data = client.json(
+                    f"{base}{upload_id}/chunk/",
+                    chunk,
+                    {"Content-Type": "application/octet-stream", "X-Upload-Offset": str(offset)},
+                )
+            except urllib.error.URLError as exc:
+                status, data = 0, {"error": str(exc)}
+            if status == 200:
+                offset, retries = data["offset"], 0
+                sent += 1
+                print(f"offset={offset}/{size}")
+            elif status == 409 and "offset" in data:
+                offset = data["offset"]
+            elif (status == 0 or status >= 500) and retries < 5:
+                retries += 1
+                time.sleep(retries)
+            else:
+                raise SystemExit(data.get("error") or f"HTTP {status}")
+
+    status, data = client.json(f"{base}{upload_id}/complete/", b"", method="POST")
+    if status != 200:
+        raise SystemExit(data.get("error") or f"HTTP {status}")
+    print(json.dumps(data, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
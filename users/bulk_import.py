@@ -0,0 +1,319 @@
+import csv
+import io
+import os
+import secrets
+import string
+from datetime import date, datetime
+
+import django
+from django import forms
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from .forms import ROLE_CHOICES, ManagerWorkerCreateForm
+from .models import SORT_ORDER_GAP, UserProfile, WorkerImport
+
+# 試算表標題（與新增員工表單的欄位名稱相同）對應到表單欄位
+IMPORT_COLUMNS = {
+    "帳號": "username",
+    "密碼": "password",
+    "名稱": "display_name",
+    "角色": "role",
+    "真實姓名": "real_name",
+    "性別": "gender",
+    "生日": "birthday",
+    "身分證字號": "id_number",
+    "婚姻狀況": "marital_status",
+    "學歷": "education",
+    "學歷補充說明": "education_other",
+    "通訊地址": "contact_address",
+    "戶籍地址": "registered_address",
+    "手機電話": "mobile_phone",
+    "緊急聯絡人姓名": "emergency_contact_name",
+    "緊急聯絡人關係": "emergency_contact_relation",
+    "緊急聯絡人電話": "emergency_contact_phone",
+    "工作經歷": "work_experience",
+}
+PROFILE_FIELDS = (
+    "real_name",
+    "gender",
+    "birthday",
+    "id_number",
+    "marital_status",
+    "education",
+    "education_other",
+    "contact_address",
+    "registered_address",
+    "mobile_phone",
+    "emergency_contact_name",
+    "emergency_contact_relation",
+    "emergency_contact_phone",
+    "work_experience",
+)
+# 建立帳號時用到的 cleaned_data 欄位，背景匯入只保存這些
+STORED_FIELDS = ("username", "display_name", "role", *PROFILE_FIELDS)
+ROLE_LABELS = {label: value for value, label in ROLE_CHOICES}
+WORKER_IMPORT_MAX_ROWS = 500
+# 筆數少時直接在目前的 process 計算，避免啟動 process pool 的成本
+POOL_MIN_PASSWORDS = 8
+
+
+class WorkerImportConflict(Exception):
+    """建立帳號時帳號已被使用（驗證之後才被其他人建立），errors 格式與 validate_rows 相同。"""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} 個帳號已被使用")
+        self.errors = errors
+
+
+class WorkerImportRowForm(ManagerWorkerCreateForm):
+    """
+    匯入的單列資料，驗證規則與 ManagerWorkerCreateForm 相同；
+    帳號是否重複改為比對事先載入的帳號集合，不逐列查詢資料庫。
+    """
+
+    def __init__(self, *args, taken_usernames, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.taken_usernames = taken_usernames
+
+    def clean_username(self):
+        username = (self.cleaned_data.get("username") or "").strip()
+        if username.lower() in self.taken_usernames:
+            raise forms.ValidationError("帳號已被使用。")
+        return username
+
+    def validate_unique(self):
+        pass
+
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def read_rows(file_obj, filename):
+    """
+    讀取 .xlsx 或 .csv，回傳 [(列號, {表單欄位: 值})]，略過空白列。
+    """
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension == ".xlsx":
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file_obj, read_only=True, data_only=True)
+        raw_rows = workbook.active.iter_rows(values_only=True)
+    elif extension == ".csv":
+        raw_rows = csv.reader(io.TextIOWrapper(file_obj, encoding="utf-8-sig", newline=""))
+    else:
+        raise ValueError("檔案格式需為 XLSX 或 CSV")
+
+    header = next(raw_rows, None)
+    if not header:
+        raise ValueError("檔案沒有資料")
+    columns = []
+    for title in header:
+        title = _cell_text(title)
+        columns.append(IMPORT_COLUMNS.get(title) or (title if title in IMPORT_COLUMNS.values() else None))
+    if "username" not in columns:
+        raise ValueError("缺少「帳號」欄位")
+
+    rows = []
+    for line_no, values in enumerate(raw_rows, start=2):
+        data = {}
+        for field, value in zip(columns, values):
+            if field:
+                data[field] = _cell_text(value)
+        if any(data.values()):
+            rows.append((line_no, data))
+    return rows
+
+
+def generate_temp_password():
+    return "".join(secrets.choice(string.digits) for _ in range(6))
+
+
+def derive_temp_password(seed, line_no):
+    """
+    由 seed 與 SECRET_KEY 推導臨時密碼。資料庫只存 seed，沒有 SECRET_KEY 無法還原；
+    店長看過結果後刪除 seed，就再也無法取得。
+    """
+    digest = salted_hmac("users.bulk_import.temp_password", f"{seed}:{line_no}").hexdigest()
+    return f"{int(digest, 16) % 10 ** 6:06d}"
+
+
+def validate_rows(rows, allow_passwords=True):
+    """
+    以 WorkerImportRowForm 驗證每一列。回傳 (valid, errors)：
+    valid 為 [(列號, cleaned_data, 密碼, 是否為臨時密碼)]，臨時密碼留白，建立帳號時才產生；
+    errors 為 [(列號, 欄位, 訊息)]。allow_passwords=False 時填了密碼的列視為錯誤。
+    """
+    usernames = {data.get("username", "").strip().lower() for _, data in rows} - {""}
+    taken = set(
+        User.objects.annotate(username_lower=Lower("username"))
+        .filter(username_lower__in=usernames)
+        .values_list("username_lower", flat=True)
+    )
+
+    valid = []
+    errors = []
+    seen = set()
+    for line_no, data in rows:
+        password = data.pop("password", "") or ""
+        is_temp = not password
+        row_errors = []
+        if password and not allow_passwords:
+            row_errors.append((line_no, "密碼", "網頁匯入不接受密碼，請留白由系統產生臨時密碼。"))
+        role = data.get("role", "")
+        data["role"] = ROLE_LABELS.get(role, role)
+        # 臨時密碼只為了通過表單驗證，不會保存
+        form_password = password or generate_temp_password()
+        form = WorkerImportRowForm(
+            {**data, "password1": form_password, "password2": form_password},
+            taken_usernames=taken | seen,
+        )
+        if not form.is_valid():
+            for field, messages in form.errors.items():
+                label = form.fields[field].label if field in form.fields else "資料"
+                for message in messages:
+                    row_errors.append((line_no, label, message))
+        if row_errors:
+            errors.extend(row_errors)
+            continue
+        seen.add(form.cleaned_data["username"].lower())
+        valid.append((line_no, form.cleaned_data, password, is_temp))
+    return valid, errors
+
+
+def serialize_rows(valid_rows):
+    """WorkerImport.rows 的內容：[(列號, 欄位資料)]，不含密碼。"""
+    return [(line_no, {field: cleaned.get(field) for field in STORED_FIELDS}) for line_no, cleaned, _, _ in valid_rows]
+
+
+def _conflicting_rows(valid_rows):
+    usernames = {cleaned["username"].lower(): line_no for line_no, cleaned, _, _ in valid_rows}
+    taken = (
+        User.objects.annotate(username_lower=Lower("username"))
+        .filter(username_lower__in=usernames)
+        .values_list("username_lower", flat=True)
+    )
+    return sorted((usernames[name], "帳號", "帳號已被使用。") for name in taken)
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    以 process pool 平行計算密碼雜湊；PBKDF2 為 CPU 密集運算，執行緒無法分散到多核心。
+    """
+    passwords = list(passwords)
+    workers = max(1, workers or os.cpu_count() or 1)
+    if workers == 1 or len(passwords) < POOL_MIN_PASSWORDS:
+        return [make_password(password) for password in passwords]
+    # multiprocessing 只在匯入時需要，不在 worker 啟動時載入
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def create_workers(valid_rows, workers=None, temp_password=None):
+    """
+    建立帳號與員工資料（User/UserProfile 皆以 bulk_create 寫入）。
+    臨時密碼在這裡產生，temp_password(列號) 可指定產生方式。
+    回傳 [(列號, UserProfile, 密碼, 是否為臨時密碼)]；
+    帳號在驗證之後才被建立時不建立任何帳號，改丟出 WorkerImportConflict。
+    """
+    temp_password = temp_password or (lambda line_no: generate_temp_password())
+    valid_rows = [
+        (line_no, cleaned, temp_password(line_no) if is_temp else password, is_temp)
+        for line_no, cleaned, password, is_temp in valid_rows
+    ]
+    hashed = hash_passwords([password for _, _, password, _ in valid_rows], workers=workers)
+    try:
+        profiles = _create_accounts(valid_rows, hashed)
+    except IntegrityError:
+        errors = _conflicting_rows(valid_rows)
+        if not errors:
+            raise
+        raise WorkerImportConflict(errors)
+    return [
+        (line_no, profile, password, is_temp)
+        for (line_no, _, password, is_temp), profile in zip(valid_rows, profiles)
+    ]
+
+
+def _create_accounts(valid_rows, hashed):
+    with transaction.atomic():
+        User.objects.bulk_create(
+            [
+                User(username=cleaned["username"], password=password_hash, is_staff=False, is_superuser=False)
+                for (_, cleaned, _, _), password_hash in zip(valid_rows, hashed)
+            ],
+            batch_size=500,
+        )
+        # MySQL 的 bulk_create 不會回填主鍵，以帳號重新取回
+        user_ids = dict(
+            User.objects.filter(username__in=[cleaned["username"] for _, cleaned, _, _ in valid_rows]).values_list(
+                "username", "id"
+            )
+        )
+        last = (
+            UserProfile.objects.select_for_update()
+            .order_by("-sort_order")
+            .values_list("sort_order", flat=True)
+            .first()
+        ) or 0
+
+        profiles = []
+        for idx, (_, cleaned, password, is_temp) in enumerate(valid_rows, start=1):
+            profile = UserProfile(
+                user_id=user_ids[cleaned["username"]],
+                role=cleaned.get("role") or "worker",
+                name=(cleaned.get("display_name") or "").strip() or cleaned["username"],
+                sort_order=last + SORT_ORDER_GAP * idx,
+                must_reset_password=is_temp,
+            )
+            for field in PROFILE_FIELDS:
+                value = cleaned.get(field)
+                if field != "birthday":
+                    value = (value or "").strip()
+                setattr(profile, field, value)
+            profile.profile_complete = not profile.missing_required_info()
+            profiles.append(profile)
+        UserProfile.objects.bulk_create(profiles, batch_size=500)
+    return profiles
+
+
+def run_import(worker_import, workers=None):
+    """執行一筆 WorkerImport，由 process_worker_imports 呼叫。"""
+    # 網頁匯入一律使用臨時密碼；結果只存 seed，顯示時再以 derive_temp_password 推導
+    seed = secrets.token_hex(16)
+    valid_rows = [(line_no, fields, "", True) for line_no, fields in worker_import.rows]
+    try:
+        created = create_workers(
+            valid_rows, workers=workers, temp_password=lambda line_no: derive_temp_password(seed, line_no)
+        )
+    except WorkerImportConflict as exc:
+        worker_import.status = WorkerImport.STATUS_FAILED
+        worker_import.result = {"errors": exc.errors}
+    else:
+        worker_import.status = WorkerImport.STATUS_DONE
+        worker_import.result = {
+            "created": [
+                {"line_no": line_no, "name": profile.name, "username": fields["username"], "is_temp": is_temp}
+                for (line_no, profile, _, is_temp), (_, fields) in zip(created, worker_import.rows)
+            ],
+            "password_seed": seed,
+        }
+    worker_import.rows = []
+    worker_import.finished_at = timezone.now()
+    worker_import.save(update_fields=["status", "result", "rows", "finished_at"])
@@ -0,0 +1,195 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count, Max
+from django.db.models.functions import Collate
+from django.utils import timezone
+
+from users.models import WorkerDocument
+
+DOCUMENT_DIR = "worker_documents/"
+PREVIEW_DIR = "worker_documents/previews/"
+
+# 依字碼排序，讓資料庫順序與 Python 的字串比較一致
+BINARY_COLLATIONS = {
+    "mysql": "utf8mb4_bin",
+    "sqlite": "BINARY",
+    "postgresql": "C",
+}
+
+
+def merge_sorted(stored_names, referenced):
+    """
+    合併兩個已排序的序列：storage 中的檔名，以及 (檔名, row id)。
+    逐一產生 (檔名, 是否存在於 storage, 參照此檔名的 row ids)。
+    """
+    stored = iter(stored_names)
+    refs = iter(referenced)
+    current_name = next(stored, None)
+    current_ref = next(refs, None)
+    while current_name is not None or current_ref is not None:
+        if current_ref is None or (current_name is not None and current_name < current_ref[0]):
+            yield current_name, True, []
+            current_name = next(stored, None)
+            continue
+        name = current_ref[0]
+        row_ids = []
+        while current_ref is not None and current_ref[0] == name:
+            row_ids.append(current_ref[1])
+            current_ref = next(refs, None)
+        found = current_name == name
+        if found:
+            current_name = next(stored, None)
+        yield name, found, row_ids
+
+
+class Command(BaseCommand):
+    help = "比對 media/worker_documents 與 WorkerDocument，清除孤兒檔案、失效資料與重複文件。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="只列出結果，不刪除任何資料")
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=3600,
+            help="孤兒檔案需超過幾秒未修改才刪除，避免誤刪上傳中的檔案",
+        )
+        parser.add_argument("--collation", default=None, help="覆寫資料庫排序使用的 binary collation")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.dry_run = options["dry_run"]
+        self.chunk_size = options["chunk_size"]
+        self.cutoff = timezone.now() - timedelta(seconds=options["min_age"])
+        self.collation = options["collation"] or BINARY_COLLATIONS.get(connection.vendor)
+        self.stats = {
+            "duplicate_rows": 0,
+            "orphan_files": 0,
+            "broken_rows": 0,
+            "orphan_previews": 0,
+            "missing_previews": 0,
+            "skipped_recent": 0,
+        }
+
+        self.remove_duplicates()
+        self.reconcile(DOCUMENT_DIR, "file", self.handle_broken_documents, skip_dirs={PREVIEW_DIR})
+        self.reconcile(PREVIEW_DIR, "preview", self.handle_missing_previews)
+
+        prefix = "[dry-run] " if self.dry_run else ""
+        summary = ", ".join(f"{key}={value}" for key, value in self.stats.items())
+        self.stdout.write(self.style.SUCCESS(f"{prefix}{summary}"))
+
+    def log(self, message):
+        self.stdout.write(f"{'[dry-run] ' if self.dry_run else ''}{message}")
+
+    def remove_duplicates(self):
+        groups = (
+            WorkerDocument.objects.values("profile_id", "category")
+            .annotate(total=Count("id"), latest_id=Max("id"))
+            .filter(total__gt=1)
+        )
+        for group in groups.iterator():
+            stale = WorkerDocument.objects.filter(
+                profile_id=group["profile_id"],
+                category=group["category"],
+            ).exclude(id=group["latest_id"])
+            for document in stale:
+                self.stats["duplicate_rows"] += 1
+                self.log(f"duplicate document {document.id} ({document.profile_id}:{document.category})")
+                if not self.dry_run:
+                    document.delete_files()
+                    document.delete()
+
+    def referenced_names(self, field_name, directory, subdirs, missing):
+        queryset = WorkerDocument.objects.filter(**{f"{field_name}__startswith": directory}).exclude(
+            **{field_name: ""}
+        )
+        order_field = field_name
+        if self.collation:
+            queryset = queryset.annotate(sort_name=Collate(field_name, self.collation))
+            order_field = "sort_name"
+        rows = queryset.order_by(order_field, "id").values_list(field_name, "id")
+        for name, row_id in rows.iterator(chunk_size=self.chunk_size):
+            rest = name[len(directory):]
+            if "/" in rest:
+                # 子目錄中的檔案於遞迴時處理；子目錄不存在則檔案必定遺失
+                if rest.split("/", 1)[0] not in subdirs:
+                    missing.append((name, row_id))
+                continue
+            yield name, row_id
+
+    def reconcile(self, directory, field_name, handle_missing, skip_dirs=()):
+        storage = WorkerDocument._meta.get_field(field_name).storage
+        try:
+            dirs, files = storage.listdir(directory)
+        except FileNotFoundError:
+            dirs, files = [], []
+        subdirs = {name for name in dirs if f"{directory}{name}/" not in skip_dirs}
+        missing = []
+        merged = merge_sorted(
+            sorted(f"{directory}{name}" for name in files),
+            self.referenced_names(field_name, directory, subdirs, missing),
+        )
+        for name, stored, row_ids in merged:
+            if stored and not row_ids:
+                self.handle_orphan_file(name, field_name)
+            elif not stored and row_ids:
+                handle_missing(name, row_ids)
+        for name, row_id in missing:
+            handle_missing(name, [row_id])
+        for name in sorted(subdirs):
+            self.reconcile(f"{directory}{name}/", field_name, handle_missing, skip_dirs)
+
+    def handle_orphan_file(self, name, field_name):
+        # 比對之後可能有相同內容的上傳沿用此檔（會更新修改時間），刪除前再確認一次參照與修改時間
+        if WorkerDocument.objects.filter(**{field_name: name}).exists():
+            return
+        storage = WorkerDocument._meta.get_field(field_name).storage
+        if self.is_recent(storage, name):
+            self.stats["skipped_recent"] += 1
+            return
+        key = "orphan_files" if field_name == "file" else "orphan_previews"
+        self.stats[key] += 1
+        self.log(f"orphan file {name}")
+        if self.dry_run:
+            return
+        # 先把檔案移開再確認：移開前已沿用此檔的上傳會更新修改時間或已寫入參照，此時放回原處；
+        # 移開後的上傳找不到原檔，會自行寫入新的一份
+        aside = f"{os.path.dirname(name)}/.gc-{os.path.basename(name)}"
+        try:
+            os.replace(storage.path(name), storage.path(aside))
+        except FileNotFoundError:
+            return
+        if self.is_recent(storage, aside) or WorkerDocument.objects.filter(**{field_name: name}).exists():
+            self.stats[key] -= 1
+            self.log(f"orphan file {name} reused during gc, restored")
+            os.replace(storage.path(aside), storage.path(name))
+            return
+        storage.delete(aside)
+
+    def is_recent(self, storage, name):
+        try:
+            modified = storage.get_modified_time(name)
+        except (FileNotFoundError, NotImplementedError):
+            return False
+        return modified > self.cutoff
+
+    def handle_broken_documents(self, name, row_ids):
+        self.stats["broken_rows"] += len(row_ids)
+        self.log(f"missing file {name} for document(s) {', '.join(map(str, row_ids))}")
+        if not self.dry_run:
+            for document in WorkerDocument.objects.filter(id__in=row_ids):
+                if document.preview:
+                    document.preview.delete(save=False)
+                document.delete()
+
+    def handle_missing_previews(self, name, row_ids):
+        self.stats["missing_previews"] += len(row_ids)
+        self.log(f"missing preview {name} for document(s) {', '.join(map(str, row_ids))}")
+        if not self.dry_run:
+            WorkerDocument.objects.filter(id__in=row_ids).update(
+                preview="",
+                preview_status=WorkerDocument.PREVIEW_PENDING,
+            )
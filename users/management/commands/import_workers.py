@@ -0,0 +1,54 @@
+import csv
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.bulk_import import WorkerImportConflict, create_workers, read_rows, validate_rows
+
+
+class Command(BaseCommand):
+    help = "由 XLSX/CSV 批次建立員工帳號，並輸出帳號與臨時密碼清單。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="員工資料檔（.xlsx 或 .csv）")
+        parser.add_argument("--workers", type=int, default=None, help="計算密碼雜湊的 process 數")
+        parser.add_argument("--output", default="-", help="帳號密碼清單輸出位置（CSV），預設為標準輸出")
+        parser.add_argument("--dry-run", action="store_true", help="只驗證資料，不建立帳號")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        try:
+            with open(path, "rb") as fh:
+                rows = read_rows(fh, path)
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        started = time.monotonic()
+        valid, errors = validate_rows(rows)
+        if errors:
+            for line_no, label, message in errors:
+                self.stderr.write(f"第 {line_no} 列 {label}：{message}")
+            raise CommandError(f"{len(errors)} 個錯誤，未建立任何帳號")
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"[dry-run] {len(valid)} 列資料驗證通過"))
+            return
+
+        try:
+            created = create_workers(valid, workers=options["workers"])
+        except WorkerImportConflict as exc:
+            for line_no, label, message in exc.errors:
+                self.stderr.write(f"第 {line_no} 列 {label}：{message}")
+            raise CommandError(f"{len(exc.errors)} 個帳號已被使用，未建立任何帳號")
+        elapsed = time.monotonic() - started
+
+        output = sys.stdout if options["output"] == "-" else open(options["output"], "w", encoding="utf-8-sig", newline="")
+        try:
+            writer = csv.writer(output)
+            writer.writerow(["列號", "名稱", "帳號", "臨時密碼"])
+            for (line_no, profile, password, is_temp), (_, cleaned, _, _) in zip(created, valid):
+                writer.writerow([line_no, profile.name, cleaned["username"], password if is_temp else ""])
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(self.style.SUCCESS(f"created {len(created)} worker(s) in {elapsed:.1f}s"))
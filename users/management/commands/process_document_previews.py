@@ -0,0 +1,83 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from users.models import WorkerDocument
+from users.previews import can_preview, preview_name, render_preview
+
+
+class Command(BaseCommand):
+    help = "以背景 process pool 為員工證件產生縮圖（WebP/JPEG，HEIC 轉檔）。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="縮圖 process 數量")
+        parser.add_argument("--batch-size", type=int, default=20, help="每批處理的文件數")
+        parser.add_argument("--loop", action="store_true", help="持續輪詢待處理文件")
+        parser.add_argument("--interval", type=float, default=5.0, help="輪詢間隔秒數")
+        parser.add_argument("--retry-failed", action="store_true", help="重新處理先前失敗的文件")
+
+    def handle(self, *args, **options):
+        if options["retry_failed"]:
+            WorkerDocument.objects.filter(preview_status=WorkerDocument.PREVIEW_FAILED).update(
+                preview_status=WorkerDocument.PREVIEW_PENDING
+            )
+
+        with ProcessPoolExecutor(max_workers=max(1, options["workers"])) as pool:
+            while True:
+                close_old_connections()
+                processed = self.process_batch(pool, options["batch_size"])
+                if processed:
+                    self.stdout.write(f"processed {processed} document(s)")
+                if not options["loop"]:
+                    break
+                if not processed:
+                    time.sleep(options["interval"])
+
+    def process_batch(self, pool, batch_size):
+        documents = list(
+            WorkerDocument.objects.filter(preview_status=WorkerDocument.PREVIEW_PENDING)
+            .only("id", "file")
+            .order_by("id")[:batch_size]
+        )
+        jobs = []
+        for document in documents:
+            if not document.file or not can_preview(document.file.name):
+                self.mark(document, WorkerDocument.PREVIEW_SKIPPED)
+                continue
+            try:
+                with document.file.open("rb") as fh:
+                    data = fh.read()
+            except (FileNotFoundError, OSError):
+                self.mark(document, WorkerDocument.PREVIEW_FAILED)
+                continue
+            jobs.append((document, pool.submit(render_preview, data)))
+
+        for document, future in jobs:
+            try:
+                extension, content = future.result()
+            except Exception as exc:
+                self.stderr.write(f"preview failed for document {document.id}: {exc}")
+                self.mark(document, WorkerDocument.PREVIEW_FAILED)
+                continue
+            preview_field = WorkerDocument._meta.get_field("preview")
+            name = preview_field.storage.save(
+                preview_field.generate_filename(
+                    document, preview_name(document.file.name, extension)
+                ),
+                ContentFile(content),
+            )
+            # 處理期間文件可能已被替換或刪除，此時丟棄產生的縮圖
+            updated = WorkerDocument.objects.filter(id=document.id, file=document.file.name).update(
+                preview=name,
+                preview_status=WorkerDocument.PREVIEW_READY,
+            )
+            if not updated:
+                preview_field.storage.delete(name)
+        return len(documents)
+
+    def mark(self, document, status):
+        WorkerDocument.objects.filter(id=document.id, file=document.file.name).update(preview_status=status)
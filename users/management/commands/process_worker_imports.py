@@ -0,0 +1,61 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from users.bulk_import import run_import
+from users.models import WorkerImport
+
+
+class Command(BaseCommand):
+    help = "在背景執行店長由網頁送出的批次匯入員工（計算密碼雜湊並建立帳號）。"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.WORKER_IMPORT_HASH_WORKERS,
+            help="計算密碼雜湊的 process 數，預設為全部 CPU",
+        )
+        parser.add_argument("--loop", action="store_true", help="持續輪詢待處理的匯入")
+        parser.add_argument("--interval", type=float, default=2.0, help="輪詢間隔秒數")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            processed = self.process_pending(options["workers"])
+            if not options["loop"]:
+                break
+            if not processed:
+                time.sleep(options["interval"])
+
+    def process_pending(self, workers):
+        processed = 0
+        pending = WorkerImport.objects.filter(status=WorkerImport.STATUS_PENDING).order_by("created_at")
+        for import_id in list(pending.values_list("id", flat=True)):
+            # 同時執行多個 process_worker_imports 時只有一個能取得
+            claimed = WorkerImport.objects.filter(id=import_id, status=WorkerImport.STATUS_PENDING).update(
+                status=WorkerImport.STATUS_RUNNING
+            )
+            if not claimed:
+                continue
+            worker_import = WorkerImport.objects.get(id=import_id)
+            started = time.monotonic()
+            try:
+                run_import(worker_import, workers=workers)
+            except Exception as exc:
+                self.stderr.write(f"worker import {import_id} failed: {exc}")
+                WorkerImport.objects.filter(id=import_id).update(
+                    status=WorkerImport.STATUS_FAILED,
+                    rows=[],
+                    result={"error": "匯入失敗，請稍後再試"},
+                    finished_at=timezone.now(),
+                )
+            else:
+                self.stdout.write(
+                    f"worker import {import_id}: {worker_import.status} in {time.monotonic() - started:.1f}s"
+                )
+            processed += 1
+        return processed
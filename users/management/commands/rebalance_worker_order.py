@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from users.models import SORT_ORDER_GAP
+from users.ordering import rebalance
+
+
+class Command(BaseCommand):
+    help = "依目前順序將員工 sort_order 重新編號為固定間距，恢復拖曳排序可插入的空間。"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--gap", type=int, default=SORT_ORDER_GAP, help="相鄰員工的 sort_order 間距")
+        parser.add_argument("--dry-run", action="store_true", help="只計算需要更新的筆數")
+
+    def handle(self, *args, **options):
+        updated = rebalance(gap=max(2, options["gap"]), dry_run=options["dry_run"])
+        prefix = "[dry-run] " if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(f"{prefix}rebalanced {updated} profile(s)"))
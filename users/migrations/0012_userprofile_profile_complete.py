@@ -0,0 +1,48 @@
+from django.db import migrations, models
+
+
+REQUIRED_INFO_FIELDS = (
+    "name",
+    "real_name",
+    "gender",
+    "birthday",
+    "id_number",
+    "marital_status",
+    "education",
+    "contact_address",
+    "registered_address",
+    "mobile_phone",
+    "emergency_contact_name",
+    "emergency_contact_relation",
+    "emergency_contact_phone",
+    "work_experience",
+)
+
+
+def fill_profile_complete(apps, schema_editor):
+    UserProfile = apps.get_model("users", "UserProfile")
+    updates = []
+    for profile in UserProfile.objects.all().iterator():
+        complete = all(getattr(profile, field) for field in REQUIRED_INFO_FIELDS)
+        if profile.education == "其他" and not profile.education_other:
+            complete = False
+        if complete:
+            profile.profile_complete = True
+            updates.append(profile)
+    UserProfile.objects.bulk_update(updates, ["profile_complete"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0011_userprofile_must_reset_password"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="profile_complete",
+            field=models.BooleanField(db_index=True, default=False, verbose_name="基本資料完整"),
+        ),
+        migrations.RunPython(fill_profile_complete, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0012_userprofile_profile_complete"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="workerdocument",
+            name="file_size",
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name="檔案大小"),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0013_workerdocument_file_size"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="workerdocument",
+            name="preview",
+            field=models.FileField(blank=True, upload_to="worker_documents/previews/"),
+        ),
+        migrations.AddField(
+            model_name="workerdocument",
+            name="preview_status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "待處理"),
+                    ("ready", "完成"),
+                    ("failed", "失敗"),
+                    ("skipped", "不適用"),
+                ],
+                db_index=True,
+                default="pending",
+                max_length=10,
+            ),
+        ),
+    ]
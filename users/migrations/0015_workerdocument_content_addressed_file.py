@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+import users.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0014_workerdocument_preview"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="workerdocument",
+            name="file",
+            field=models.FileField(db_index=True, storage=users.storage.document_storage, upload_to="worker_documents/"),
+        ),
+        migrations.AddField(
+            model_name="workerdocument",
+            name="original_name",
+            field=models.CharField(blank=True, max_length=255, verbose_name="原始檔名"),
+        ),
+    ]
@@ -0,0 +1,45 @@
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0015_workerdocument_content_addressed_file"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentUpload",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                (
+                    "category",
+                    models.CharField(
+                        choices=[
+                            ("id_card_front", "身分證正面"),
+                            ("id_card_back", "身分證反面"),
+                            ("driver_license", "駕照"),
+                            ("bankbook", "存摺"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("file_name", models.CharField(max_length=255, verbose_name="原始檔名")),
+                ("content_type", models.CharField(blank=True, max_length=100)),
+                ("total_size", models.PositiveIntegerField(verbose_name="檔案大小")),
+                ("checksum", models.CharField(blank=True, max_length=64, verbose_name="SHA-256")),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+                (
+                    "profile",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="uploads",
+                        to="users.userprofile",
+                    ),
+                ),
+            ],
+        ),
+    ]
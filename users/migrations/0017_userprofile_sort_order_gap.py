@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+SORT_ORDER_GAP = 1024
+
+
+def spread_sort_order(apps, schema_editor):
+    UserProfile = apps.get_model("users", "UserProfile")
+    updates = []
+    profiles = UserProfile.objects.order_by("sort_order", "name", "user__username", "id").only("id", "sort_order")
+    for idx, profile in enumerate(profiles.iterator(), start=1):
+        profile.sort_order = idx * SORT_ORDER_GAP
+        updates.append(profile)
+    UserProfile.objects.bulk_update(updates, ["sort_order"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0016_document_upload"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="userprofile",
+            name="sort_order",
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(spread_sort_order, migrations.RunPython.noop),
+    ]
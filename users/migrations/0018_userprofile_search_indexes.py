@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0017_userprofile_sort_order_gap"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="userprofile",
+            name="name",
+            field=models.CharField(blank=True, db_index=True, max_length=50, verbose_name="名稱"),
+        ),
+        migrations.AlterField(
+            model_name="userprofile",
+            name="real_name",
+            field=models.CharField(blank=True, db_index=True, max_length=50, verbose_name="真實姓名"),
+        ),
+        migrations.AlterField(
+            model_name="userprofile",
+            name="mobile_phone",
+            field=models.CharField(blank=True, db_index=True, max_length=20, verbose_name="手機電話"),
+        ),
+    ]
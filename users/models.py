@@ -1,7 +1,37 @@
-from django.db import models
+import hashlib
+import os
+import uuid
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
+from django.urls import reverse
 from django.utils import timezone
 
+from .storage import document_storage
+
+REQUIRED_INFO_FIELDS = (
+    "name",
+    "real_name",
+    "gender",
+    "birthday",
+    "id_number",
+    "marital_status",
+    "education",
+    "contact_address",
+    "registered_address",
+    "mobile_phone",
+    "emergency_contact_name",
+    "emergency_contact_relation",
+    "emergency_contact_phone",
+    "work_experience",
+)
+COMPLETENESS_FIELDS = {*REQUIRED_INFO_FIELDS, "education_other"}
+# sort_order 之間保留間距，移動一位員工只需更新一筆（見 users/ordering.py）
+SORT_ORDER_GAP = 1024
+
+
 class UserProfile(models.Model):
     USER_ROLES = (
         ('worker', '員工'),
@@ -9,8 +39,8 @@ class UserProfile(models.Model):
         ('supervisor', '主管'),
     )
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    name = models.CharField("名稱", max_length=50, blank=True)
-    real_name = models.CharField("真實姓名", max_length=50, blank=True)
+    name = models.CharField("名稱", max_length=50, blank=True, db_index=True)
+    real_name = models.CharField("真實姓名", max_length=50, blank=True, db_index=True)
     gender = models.CharField("性別", max_length=2, blank=True)
     birthday = models.DateField("生日", null=True, blank=True)
     id_number = models.CharField("身分證字號", max_length=10, blank=True)
@@ -19,14 +49,16 @@ class UserProfile(models.Model):
     education_other = models.CharField("學歷補充", max_length=10, blank=True)
     contact_address = models.CharField("通訊地址", max_length=255, blank=True)
     registered_address = models.CharField("戶籍地址", max_length=255, blank=True)
-    mobile_phone = models.CharField("手機電話", max_length=20, blank=True)
+    mobile_phone = models.CharField("手機電話", max_length=20, blank=True, db_index=True)
     emergency_contact_name = models.CharField("緊急聯絡人姓名", max_length=10, blank=True)
     emergency_contact_relation = models.CharField("緊急聯絡人關係", max_length=10, blank=True)
     emergency_contact_phone = models.CharField("緊急聯絡人電話", max_length=10, blank=True)
     work_experience = models.TextField("工作經歷", blank=True)
     role = models.CharField(max_length=10, choices=USER_ROLES, default='worker')
-    sort_order = models.PositiveIntegerField(default=0)
+    sort_order = models.PositiveIntegerField(default=0, db_index=True)
     must_reset_password = models.BooleanField(default=False)
+    # 由 save() 依 missing_required_info() 維護，列表頁直接以此欄位篩選/排序
+    profile_complete = models.BooleanField("基本資料完整", default=False, db_index=True)
     primary_store = models.ForeignKey(
         "scheduling.Store",
         on_delete=models.SET_NULL,
@@ -55,28 +87,34 @@ class UserProfile(models.Model):
         return years
 
     def missing_required_info(self):
-        required_fields = [
-            self.name,
-            self.real_name,
-            self.gender,
-            self.birthday,
-            self.id_number,
-            self.marital_status,
-            self.education,
-            self.contact_address,
-            self.registered_address,
-            self.mobile_phone,
-            self.emergency_contact_name,
-            self.emergency_contact_relation,
-            self.emergency_contact_phone,
-            self.work_experience,
-        ]
-        if any(not value for value in required_fields):
+        if any(not getattr(self, field) for field in REQUIRED_INFO_FIELDS):
             return True
         if self.education == "其他" and not self.education_other:
             return True
         return False
-    
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or set(update_fields) & COMPLETENESS_FIELDS:
+            self.profile_complete = not self.missing_required_info()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "profile_complete"}
+        if self._state.adding and not self.sort_order:
+            # 鎖住目前排序最後的一筆，同時註冊的員工會依序接在後面，不會取得相同順序
+            using = kwargs.get("using") or router.db_for_write(UserProfile, instance=self)
+            with transaction.atomic(using=using):
+                last = (
+                    UserProfile.objects.using(using)
+                    .select_for_update()
+                    .order_by("-sort_order")
+                    .values_list("sort_order", flat=True)
+                    .first()
+                )
+                self.sort_order = (last or 0) + SORT_ORDER_GAP
+                super().save(*args, **kwargs)
+            return
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.display_name()
 
@@ -88,10 +126,138 @@ class WorkerDocument(models.Model):
         ("driver_license", "駕照"),
         ("bankbook", "存摺"),
     )
+    PREVIEW_PENDING = "pending"
+    PREVIEW_READY = "ready"
+    PREVIEW_FAILED = "failed"
+    PREVIEW_SKIPPED = "skipped"
+    PREVIEW_STATUS_CHOICES = (
+        (PREVIEW_PENDING, "待處理"),
+        (PREVIEW_READY, "完成"),
+        (PREVIEW_FAILED, "失敗"),
+        (PREVIEW_SKIPPED, "不適用"),
+    )
     profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name="documents")
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
-    file = models.FileField(upload_to="worker_documents/")
+    # 相同內容的上傳共用同一個檔案（內容雜湊命名）
+    file = models.FileField(upload_to="worker_documents/", storage=document_storage, db_index=True)
+    original_name = models.CharField("原始檔名", max_length=255, blank=True)
+    # 有值代表檔案已寫入儲存空間，頁面顯示時不必再向 storage 確認
+    file_size = models.PositiveIntegerField("檔案大小", null=True, blank=True)
+    # 縮圖由 process_document_previews 背景產生
+    preview = models.FileField(upload_to="worker_documents/previews/", blank=True)
+    preview_status = models.CharField(
+        max_length=10,
+        choices=PREVIEW_STATUS_CHOICES,
+        default=PREVIEW_PENDING,
+        db_index=True,
+    )
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        if self.file and not self.file._committed:
+            if self.file_size is None:
+                self.file_size = self.file.size
+            if not self.original_name:
+                self.original_name = os.path.basename(self.file.name)[:255]
+        super().save(*args, **kwargs)
+
+    def filename(self):
+        return self.original_name or os.path.basename(self.file.name)
+
+    def get_absolute_url(self):
+        return reverse("users:worker_document", args=[self.id, self.filename()])
+
+    def has_preview(self):
+        return self.preview_status == self.PREVIEW_READY and bool(self.preview)
+
+    def get_preview_url(self):
+        return reverse(
+            "users:worker_document_preview",
+            args=[self.id, os.path.basename(self.preview.name)],
+        )
+
+    def delete_files(self):
+        # 內容檔可能同時被其他文件參照，或正被相同內容的上傳沿用，不在這裡刪除；
+        # 沒有任何參照的內容檔由 gc_worker_documents 超過 --min-age 後清除
+        if self.preview:
+            self.preview.delete(save=False)
+
     def __str__(self):
         return f"{self.profile_id}:{self.category}"
+
+
+class DocumentUpload(models.Model):
+    """
+    分段上傳中的文件。已收到的內容暫存於 CHUNKED_UPLOAD_ROOT/<id>.part，
+    檔案長度即為目前進度，完成時比對 checksum（SHA-256）後轉存為 WorkerDocument。
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name="uploads")
+    category = models.CharField(max_length=20, choices=WorkerDocument.CATEGORY_CHOICES)
+    file_name = models.CharField("原始檔名", max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    total_size = models.PositiveIntegerField("檔案大小")
+    checksum = models.CharField("SHA-256", max_length=64, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def temp_path(self):
+        return os.path.join(settings.CHUNKED_UPLOAD_ROOT, f"{self.id}.part")
+
+    def received_size(self):
+        try:
+            return os.path.getsize(self.temp_path())
+        except FileNotFoundError:
+            return 0
+
+    def compute_checksum(self):
+        digest = hashlib.sha256()
+        with open(self.temp_path(), "rb") as fh:
+            for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def discard(self):
+        try:
+            os.unlink(self.temp_path())
+        except FileNotFoundError:
+            pass
+        self.delete()
+
+    def __str__(self):
+        return f"{self.profile_id}:{self.category}:{self.id}"
+
+
+class WorkerImport(models.Model):
+    """
+    批次匯入員工。網頁只負責讀檔與驗證，通過的資料（不含密碼）存在 rows，
+    由 process_worker_imports 在背景產生臨時密碼、計算雜湊並建立帳號，結果寫回 result。
+    result 不存臨時密碼，只存推導用的 seed，店長第一次看到結果後即清除；rows 處理完也會清空。
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "等待中"),
+        (STATUS_RUNNING, "處理中"),
+        (STATUS_DONE, "完成"),
+        (STATUS_FAILED, "失敗"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_by = models.ForeignKey(UserProfile, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    # [(列號, 欄位資料)]，見 users.bulk_import.serialize_rows
+    rows = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    # {"created": [...], "password_seed": ...} 或 {"errors": [(列號, 欄位, 訊息)]}
+    result = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+    def __str__(self):
+        return f"{self.id}:{self.status}"
@@ -0,0 +1,143 @@
+from bisect import bisect_left, bisect_right
+
+from django.db import transaction
+
+from .models import SORT_ORDER_GAP, UserProfile
+
+ORDERING = ("sort_order", "name", "user__username", "id")
+
+
+def _spread(lower, upper, count):
+    """
+    在 (lower, upper) 之間平均取 count 個整數；upper 為 None 代表排在最後。
+    空間不足時回傳 None。
+    """
+    if upper is None:
+        return [lower + SORT_ORDER_GAP * (i + 1) for i in range(count)]
+    if upper - lower <= count:
+        return None
+    step = (upper - lower) / (count + 1)
+    return [lower + int(step * (i + 1)) for i in range(count)]
+
+
+def _increasing_positions(values):
+    """
+    回傳 values 中最長嚴格遞增子序列的位置，這些員工的 sort_order 可以保持不變。
+    """
+    tails = []
+    tail_positions = []
+    previous = [None] * len(values)
+    for pos, value in enumerate(values):
+        idx = bisect_left(tails, value)
+        if idx == len(tails):
+            tails.append(value)
+            tail_positions.append(pos)
+        else:
+            tails[idx] = value
+            tail_positions[idx] = pos
+        previous[pos] = tail_positions[idx - 1] if idx else None
+    keep = set()
+    pos = tail_positions[-1] if tail_positions else None
+    while pos is not None:
+        keep.add(pos)
+        pos = previous[pos]
+    return keep
+
+
+def apply_order(profiles):
+    """
+    依 profiles 的順序調整 sort_order，只更新位置改變的員工。
+    profiles 可以只是部分員工（分頁、篩選後的清單）：移動的員工接在前一位保留位置的員工之後，
+    上下界取自整張表，不會與清單外的員工重疊。
+    間距用盡時改為重新編號全部員工，並同時套用這個順序。回傳實際更新的筆數。
+    """
+    values = [profile.sort_order for profile in profiles]
+    keep = _increasing_positions(values)
+    moving = [profile.id for pos, profile in enumerate(profiles) if pos not in keep]
+    if not moving:
+        return 0
+    # 其他員工（含清單外）目前的 sort_order，用來找每段的上下界
+    others = list(
+        UserProfile.objects.exclude(id__in=moving).order_by("sort_order").values_list("sort_order", flat=True)
+    )
+    updates = []
+    lower = None
+    run = []
+    for pos, profile in enumerate(profiles + [None]):
+        if profile is not None and pos not in keep:
+            run.append(profile)
+            continue
+        if run:
+            if lower is None:
+                # 排在第一位保留員工之前
+                upper = profile.sort_order
+                idx = bisect_left(others, upper)
+                run_lower = others[idx - 1] if idx else 0
+            else:
+                idx = bisect_right(others, lower)
+                run_lower, upper = lower, (others[idx] if idx < len(others) else None)
+            new_values = _spread(run_lower, upper, len(run))
+            if new_values is None:
+                # 只重新編號這幾位會與其他員工的 sort_order 重疊或交錯，一律整張表重新編號
+                updated = rebalance(order=[item.id for item in profiles])
+                current = dict(
+                    UserProfile.objects.filter(id__in=[p.id for p in profiles]).values_list("id", "sort_order")
+                )
+                for item in profiles:
+                    item.sort_order = current[item.id]
+                return updated
+            for item, value in zip(run, new_values):
+                item.sort_order = value
+                updates.append(item)
+            run = []
+        if profile is not None:
+            lower = profile.sort_order
+    UserProfile.objects.bulk_update(updates, ["sort_order"])
+    return len(updates)
+
+
+def move_after(profile, after):
+    """
+    將 profile 移到 after 之後（after 為 None 時移到最前面），只更新一筆。
+    """
+    lower = after.sort_order if after is not None else 0
+    upper = (
+        UserProfile.objects.filter(sort_order__gt=lower)
+        .exclude(id=profile.id)
+        .order_by("sort_order")
+        .values_list("sort_order", flat=True)
+        .first()
+    )
+    new_values = _spread(lower, upper, 1)
+    if new_values is None:
+        rebalance()
+        if after is not None:
+            after.refresh_from_db(fields=["sort_order"])
+        return move_after(profile, after)
+    profile.sort_order = new_values[0]
+    profile.save(update_fields=["sort_order"])
+    return 1
+
+
+def rebalance(gap=SORT_ORDER_GAP, dry_run=False, batch_size=500, order=None):
+    """
+    依目前順序將所有員工重新編號為 gap 的倍數，恢復可插入的間距。回傳更新筆數。
+    給 order（員工 id 串列）時，這些員工原本所佔的位置改依 order 的順序排列，其他員工位置不變。
+    """
+    with transaction.atomic():
+        profiles = list(
+            UserProfile.objects.select_for_update().order_by(*ORDERING).only("id", "sort_order")
+        )
+        if order:
+            by_id = {profile.id: profile for profile in profiles}
+            reordered = iter([by_id[profile_id] for profile_id in order if profile_id in by_id])
+            order_ids = set(order)
+            profiles = [next(reordered) if profile.id in order_ids else profile for profile in profiles]
+        updates = []
+        for idx, profile in enumerate(profiles, start=1):
+            if profile.sort_order != idx * gap:
+                profile.sort_order = idx * gap
+                updates.append(profile)
+        if updates and not dry_run:
+            UserProfile.objects.bulk_update(updates, ["sort_order"], batch_size=batch_size)
+    return len(updates)
@@ -0,0 +1,42 @@
+import io
+import os
+
+PREVIEW_MAX_SIZE = (1280, 1280)
+PREVIEW_QUALITY = 80
+PREVIEW_SOURCE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".heic", ".heif"}
+
+
+def can_preview(file_name):
+    return os.path.splitext(file_name or "")[1].lower() in PREVIEW_SOURCE_EXTENSIONS
+
+
+def preview_name(file_name, extension):
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    return f"{stem}{extension}"
+
+
+def render_preview(data):
+    """
+    在背景 process 中執行：將原始圖片縮小並轉成 WebP（不支援時改用 JPEG）。
+    回傳 (副檔名, bytes)。
+    """
+    from PIL import Image, ImageOps, features
+
+    try:
+        from pillow_heif import register_heif_opener
+    except ImportError:
+        register_heif_opener = None
+    if register_heif_opener is not None:
+        register_heif_opener()
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(PREVIEW_MAX_SIZE)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        output = io.BytesIO()
+        if features.check("webp"):
+            image.save(output, format="WEBP", quality=PREVIEW_QUALITY, method=4)
+            return ".webp", output.getvalue()
+        image.save(output, format="JPEG", quality=PREVIEW_QUALITY, optimize=True, progressive=True)
+        return ".jpg", output.getvalue()
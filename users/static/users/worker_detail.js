@@ -0,0 +1,472 @@
+const uploadSection = document.querySelector("[data-upload-form]");
+const saveBtn = document.getElementById("saveWorkerBtn");
+const isCreate = uploadSection && uploadSection.dataset.uploadForm !== "true";
+const profileId = uploadSection ? uploadSection.dataset.profileId : "";
+const uploadUrl = uploadSection ? uploadSection.dataset.uploadUrl : "";
+const chunkedUploadUrl = uploadSection ? uploadSection.dataset.chunkedUploadUrl : "";
+const deleteUrl = uploadSection ? uploadSection.dataset.deleteUrl : "";
+const previewModalEl = document.getElementById("documentPreviewModal");
+const previewBody = document.getElementById("documentPreviewBody");
+const downloadBtn = document.getElementById("documentDownloadBtn");
+const previewModal = previewModalEl && window.bootstrap
+  ? new window.bootstrap.Modal(previewModalEl)
+  : null;
+const resetPasswordBtn = document.getElementById("resetPasswordBtn");
+const tempPasswordModalEl = document.getElementById("tempPasswordModal");
+const tempPasswordValue = document.getElementById("tempPasswordValue");
+const tempPasswordModal = tempPasswordModalEl && window.bootstrap
+  ? new window.bootstrap.Modal(tempPasswordModalEl)
+  : null;
+const confirmTempPasswordModalEl = document.getElementById("confirmTempPasswordModal");
+const confirmResetPasswordBtn = document.getElementById("confirmResetPasswordBtn");
+const confirmTempPasswordModal = confirmTempPasswordModalEl && window.bootstrap
+  ? new window.bootstrap.Modal(confirmTempPasswordModalEl)
+  : null;
+
+const getCookie = (name) => {
+  const value = `; ${document.cookie}`;
+  const parts = value.split(`; ${name}=`);
+  if (parts.length === 2) return parts.pop().split(";").shift();
+  return "";
+};
+
+const setSavingDisabled = (disabled) => {
+  if (!saveBtn) return;
+  saveBtn.disabled = disabled;
+};
+
+let pendingUploads = 0;
+const updateSaveState = () => {
+  if (!saveBtn) return;
+  saveBtn.disabled = pendingUploads > 0;
+};
+
+const showUploadError = (inputEl, message) => {
+  let error = inputEl.parentElement.querySelector(".upload-error");
+  if (!error) {
+    error = document.createElement("div");
+    error.className = "text-danger small mt-1 upload-error";
+    inputEl.parentElement.appendChild(error);
+  }
+  error.textContent = message;
+};
+
+const clearUploadError = (inputEl) => {
+  const error = inputEl.parentElement.querySelector(".upload-error");
+  if (error) {
+    error.textContent = "";
+  }
+};
+
+const updatePreview = (inputEl, url, category) => {
+  const preview = inputEl.parentElement.querySelector(".upload-preview");
+  if (!preview) return;
+  const fileName = decodeURIComponent(url.split("/").pop());
+  preview.innerHTML = `<a href="${url}" class="doc-preview-link" data-filename="${fileName}">${fileName}</a>` +
+    `<button type="button" class="btn btn-outline-danger btn-sm ms-2 doc-delete-btn" data-category="${category}">刪除</button>`;
+};
+
+const imageTypes = [
+  "image/jpeg",
+  "image/png",
+  "image/heic",
+  "image/heif",
+  "image/heic-sequence",
+  "image/heif-sequence",
+];
+const imageExts = [".jpg", ".jpeg", ".png", ".heic", ".heif"];
+
+const isAllowedFile = (file, allowPdf) => {
+  const type = (file.type || "").toLowerCase();
+  const name = (file.name || "").toLowerCase();
+  if (imageTypes.includes(type)) return true;
+  if (allowPdf && type === "application/pdf") return true;
+  if (type === "application/octet-stream" || !type) {
+    if (imageExts.some((ext) => name.endsWith(ext))) return true;
+    if (allowPdf && name.endsWith(".pdf")) return true;
+  }
+  return false;
+};
+
+const SHA256_K = new Uint32Array([
+  0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+  0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+  0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+  0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+  0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+  0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+  0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+  0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2,
+]);
+
+// 非 HTTPS 頁面沒有 crypto.subtle，改以 JavaScript 計算，確保每次上傳都能比對檢查碼
+const sha256Fallback = (bytes) => {
+  const rotr = (x, n) => (x >>> n) | (x << (32 - n));
+  const h = new Uint32Array([
+    0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19,
+  ]);
+  const padded = new Uint8Array(((bytes.length + 72) >> 6) << 6);
+  padded.set(bytes);
+  padded[bytes.length] = 0x80;
+  const view = new DataView(padded.buffer);
+  view.setUint32(padded.length - 8, Math.floor(bytes.length / 0x20000000));
+  view.setUint32(padded.length - 4, (bytes.length << 3) >>> 0);
+  const w = new Uint32Array(64);
+  for (let block = 0; block < padded.length; block += 64) {
+    for (let i = 0; i < 16; i += 1) w[i] = view.getUint32(block + i * 4);
+    for (let i = 16; i < 64; i += 1) {
+      const s0 = rotr(w[i - 15], 7) ^ rotr(w[i - 15], 18) ^ (w[i - 15] >>> 3);
+      const s1 = rotr(w[i - 2], 17) ^ rotr(w[i - 2], 19) ^ (w[i - 2] >>> 10);
+      w[i] = w[i - 16] + s0 + w[i - 7] + s1;
+    }
+    let [a, b, c, d, e, f, g, k] = h;
+    for (let i = 0; i < 64; i += 1) {
+      const t1 = (k + (rotr(e, 6) ^ rotr(e, 11) ^ rotr(e, 25)) + ((e & f) ^ (~e & g)) + SHA256_K[i] + w[i]) >>> 0;
+      const t2 = ((rotr(a, 2) ^ rotr(a, 13) ^ rotr(a, 22)) + ((a & b) ^ (a & c) ^ (b & c))) >>> 0;
+      k = g;
+      g = f;
+      f = e;
+      e = (d + t1) >>> 0;
+      d = c;
+      c = b;
+      b = a;
+      a = (t1 + t2) >>> 0;
+    }
+    [a, b, c, d, e, f, g, k].forEach((value, i) => {
+      h[i] += value;
+    });
+  }
+  return Array.from(h)
+    .map((value) => value.toString(16).padStart(8, "0"))
+    .join("");
+};
+
+const sha256Hex = async (blob) => {
+  const buffer = await blob.arrayBuffer();
+  if (!window.crypto || !window.crypto.subtle) return sha256Fallback(new Uint8Array(buffer));
+  const digest = await window.crypto.subtle.digest("SHA-256", buffer);
+  return Array.from(new Uint8Array(digest))
+    .map((b) => b.toString(16).padStart(2, "0"))
+    .join("");
+};
+
+const uploadRequest = async (url, options) => {
+  const response = await fetch(url, {
+    credentials: "same-origin",
+    ...options,
+    headers: { "X-CSRFToken": getCookie("csrftoken"), ...(options.headers || {}) },
+  });
+  const data = await response.json().catch(() => ({}));
+  return { status: response.status, data };
+};
+
+// 分段上傳：網路中斷時重試並從伺服器回報的位置續傳，重新整理頁面後也可接續
+const uploadInChunks = async (file, category, onProgress) => {
+  const resumeKey = `upload:${category}:${file.name}:${file.size}:${file.lastModified}`;
+  let uploadId = window.localStorage.getItem(resumeKey);
+  let offset = 0;
+  let chunkSize = 512 * 1024;
+  if (uploadId) {
+    const { status, data } = await uploadRequest(`${chunkedUploadUrl}${uploadId}/`, { method: "GET" });
+    if (status === 200 && data.ok) {
+      offset = data.offset;
+    } else {
+      uploadId = null;
+    }
+  }
+  if (!uploadId) {
+    const { status, data } = await uploadRequest(chunkedUploadUrl, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        category,
+        file_name: file.name,
+        content_type: file.type,
+        size: file.size,
+        sha256: await sha256Hex(file),
+      }),
+    });
+    if (status !== 200 || !data.ok) throw new Error(data.error || "上傳失敗。");
+    uploadId = data.upload_id;
+    chunkSize = data.chunk_size || chunkSize;
+    window.localStorage.setItem(resumeKey, uploadId);
+  }
+
+  let retries = 0;
+  while (offset < file.size) {
+    onProgress(Math.round((offset / file.size) * 100));
+    let result;
+    try {
+      const chunk = file.slice(offset, offset + chunkSize);
+      result = await uploadRequest(`${chunkedUploadUrl}${uploadId}/chunk/`, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/octet-stream",
+          "X-Upload-Offset": String(offset),
+          "X-Chunk-SHA256": await sha256Hex(chunk),
+        },
+        body: chunk,
+      });
+    } catch (err) {
+      result = { status: 0, data: {} };
+    }
+    if (result.status === 200 && result.data.ok) {
+      offset = result.data.offset;
+      retries = 0;
+    } else if (result.status === 409 && typeof result.data.offset === "number") {
+      offset = result.data.offset;
+    } else if ((result.status === 0 || result.status >= 500 || typeof result.data.offset === "number") && retries < 5) {
+      // 網路中斷或區塊在傳輸中損毀（檢查碼不符）時重傳
+      retries += 1;
+      await new Promise((resolve) => setTimeout(resolve, 1000 * retries));
+    } else {
+      if (result.status === 404) window.localStorage.removeItem(resumeKey);
+      throw new Error(result.data.error || "上傳失敗。");
+    }
+  }
+  onProgress(100);
+
+  const { status, data } = await uploadRequest(`${chunkedUploadUrl}${uploadId}/complete/`, { method: "POST" });
+  if (status !== 409) window.localStorage.removeItem(resumeKey);
+  if (status !== 200 || !data.ok) throw new Error(data.error || "上傳失敗。");
+  return data;
+};
+
+const uploadFile = (inputEl, category, allowPdf) => {
+  const file = inputEl.files && inputEl.files[0];
+  if (!file) return;
+  if (!isAllowedFile(file, allowPdf)) {
+    showUploadError(inputEl, allowPdf ? "檔案格式需為 JPG/PNG/HEIC/PDF。" : "身分證檔案需為 JPG/PNG/HEIC。");
+    inputEl.value = "";
+    return;
+  }
+  if (file.size > 10 * 1024 * 1024) {
+    showUploadError(inputEl, "檔案大小不可超過 10MB。");
+    inputEl.value = "";
+    return;
+  }
+  clearUploadError(inputEl);
+  const progressWrap = inputEl.parentElement.querySelector(".upload-progress");
+  const progressBar = progressWrap ? progressWrap.querySelector(".progress-bar") : null;
+  if (progressWrap && progressBar) {
+    progressWrap.classList.remove("d-none");
+    progressBar.style.width = "0%";
+  }
+  pendingUploads += 1;
+  updateSaveState();
+  if (chunkedUploadUrl) {
+    uploadInChunks(file, category, (percent) => {
+      if (progressBar) progressBar.style.width = `${percent}%`;
+    })
+      .then((data) => updatePreview(inputEl, data.file_url, category))
+      .catch((err) => showUploadError(inputEl, err.message || "上傳失敗。"))
+      .finally(() => {
+        pendingUploads = Math.max(0, pendingUploads - 1);
+        updateSaveState();
+        if (progressWrap) progressWrap.classList.add("d-none");
+        inputEl.value = "";
+      });
+    return;
+  }
+  const xhr = new XMLHttpRequest();
+  xhr.open("POST", uploadUrl || `/users/create-worker/${profileId}/upload/`);
+  xhr.setRequestHeader("X-CSRFToken", getCookie("csrftoken"));
+  xhr.upload.addEventListener("progress", (event) => {
+    if (!event.lengthComputable || !progressBar) return;
+    const percent = Math.round((event.loaded / event.total) * 100);
+    progressBar.style.width = `${percent}%`;
+  });
+  xhr.addEventListener("load", () => {
+    pendingUploads = Math.max(0, pendingUploads - 1);
+    updateSaveState();
+    if (progressWrap) progressWrap.classList.add("d-none");
+    try {
+      const data = JSON.parse(xhr.responseText || "{}");
+      if (xhr.status >= 200 && xhr.status < 300 && data.ok) {
+        updatePreview(inputEl, data.file_url, category);
+      } else {
+        showUploadError(inputEl, data.error || "上傳失敗。");
+      }
+    } catch (err) {
+      showUploadError(inputEl, "上傳失敗。");
+    }
+    inputEl.value = "";
+  });
+  xhr.addEventListener("error", () => {
+    pendingUploads = Math.max(0, pendingUploads - 1);
+    updateSaveState();
+    if (progressWrap) progressWrap.classList.add("d-none");
+    showUploadError(inputEl, "上傳失敗。");
+    inputEl.value = "";
+  });
+  const formData = new FormData();
+  formData.append("category", category);
+  formData.append("file", file);
+  xhr.send(formData);
+};
+
+const openPreviewModal = (url, fileName, previewUrl) => {
+  if (!previewBody || !downloadBtn) return;
+  const lower = (url || "").toLowerCase();
+  const isImage = [".jpg", ".jpeg", ".png"].some((ext) => lower.endsWith(ext));
+  const isHeif = [".heic", ".heif"].some((ext) => lower.endsWith(ext));
+  if (isImage) {
+    previewBody.innerHTML = `<img src="${url}" class="preview-image" alt="${fileName}">`;
+  } else if (isHeif && previewUrl) {
+    previewBody.innerHTML = `<img src="${previewUrl}" class="preview-image" alt="${fileName}">`;
+  } else if (isHeif) {
+    previewBody.innerHTML = `<div class="text-muted">此檔案格式不支援預覽，請點「下載」查看。</div>`;
+  } else {
+    previewBody.innerHTML = `<iframe class="preview-frame" src="${url}"></iframe>`;
+  }
+  downloadBtn.href = url;
+  downloadBtn.setAttribute("download", fileName || "");
+  if (previewModal) {
+    previewModal.show();
+  } else {
+    window.open(url, "_blank");
+  }
+};
+
+document.addEventListener("click", (event) => {
+  const link = event.target.closest(".doc-preview-link");
+  if (!link) return;
+  event.preventDefault();
+  const url = link.getAttribute("href");
+  const fileName = link.getAttribute("data-filename") || (url ? url.split("/").pop() : "");
+  openPreviewModal(url, fileName, link.getAttribute("data-preview-url"));
+});
+
+document.addEventListener("click", (event) => {
+  const button = event.target.closest(".doc-delete-btn");
+  if (!button) return;
+  event.preventDefault();
+  if (!window.confirm("確定要刪除這個檔案嗎？")) return;
+  const category = button.getAttribute("data-category");
+  const preview = button.closest(".upload-preview");
+  const xhr = new XMLHttpRequest();
+  xhr.open("POST", deleteUrl || `/users/create-worker/${profileId}/delete-document/`);
+  xhr.setRequestHeader("X-CSRFToken", getCookie("csrftoken"));
+  xhr.addEventListener("load", () => {
+    let ok = false;
+    try {
+      const data = JSON.parse(xhr.responseText || "{}");
+      ok = xhr.status >= 200 && xhr.status < 300 && data.ok;
+    } catch (err) {
+      ok = false;
+    }
+    if (ok && preview) {
+      preview.innerHTML = `<span class="text-muted">未上傳</span>`;
+    } else if (!ok) {
+      window.alert("刪除失敗，請稍後再試。");
+    }
+  });
+  xhr.addEventListener("error", () => {
+    window.alert("刪除失敗，請稍後再試。");
+  });
+  const formData = new FormData();
+  formData.append("category", category);
+  xhr.send(formData);
+});
+
+if (resetPasswordBtn) {
+  resetPasswordBtn.addEventListener("click", () => {
+    if (!profileId) return;
+    if (confirmTempPasswordModal) {
+      confirmTempPasswordModal.show();
+    }
+  });
+}
+
+if (confirmResetPasswordBtn) {
+  confirmResetPasswordBtn.addEventListener("click", () => {
+    if (!profileId) return;
+    const xhr = new XMLHttpRequest();
+    xhr.open("POST", `/users/create-worker/${profileId}/reset-password/`);
+    xhr.setRequestHeader("X-CSRFToken", getCookie("csrftoken"));
+    xhr.addEventListener("load", () => {
+      let data = {};
+      try {
+        data = JSON.parse(xhr.responseText || "{}");
+      } catch (err) {
+        data = {};
+      }
+      if (xhr.status >= 200 && xhr.status < 300 && data.ok) {
+        if (tempPasswordValue) {
+          tempPasswordValue.textContent = data.temp_password || "------";
+        }
+        if (confirmTempPasswordModal) {
+          confirmTempPasswordModal.hide();
+        }
+        if (tempPasswordModal) {
+          tempPasswordModal.show();
+        } else {
+          window.alert(`臨時密碼：${data.temp_password || ""}`);
+        }
+      } else {
+        window.alert(data.error || "重設失敗，請稍後再試。");
+      }
+    });
+    xhr.addEventListener("error", () => {
+      window.alert("重設失敗，請稍後再試。");
+    });
+    xhr.send();
+  });
+}
+
+const educationSelect = document.getElementById("id_education");
+const educationOtherInput = document.getElementById("id_education_other");
+const sameAddressToggle = document.getElementById("sameAddressToggle");
+const contactAddressInput = document.getElementById("id_contact_address");
+const registeredAddressInput = document.getElementById("id_registered_address");
+
+const toggleEducationOther = () => {
+  if (!educationSelect || !educationOtherInput) return;
+  const wrapper = educationOtherInput.closest(".education-other");
+  if (!wrapper) return;
+  const show = educationSelect.value === "其他";
+  wrapper.classList.toggle("hidden", !show);
+};
+
+if (educationSelect) {
+  educationSelect.addEventListener("change", toggleEducationOther);
+  toggleEducationOther();
+}
+
+if (sameAddressToggle && contactAddressInput && registeredAddressInput) {
+  sameAddressToggle.addEventListener("change", () => {
+    if (sameAddressToggle.checked) {
+      registeredAddressInput.value = contactAddressInput.value;
+      registeredAddressInput.readOnly = true;
+    } else {
+      registeredAddressInput.readOnly = false;
+    }
+  });
+  contactAddressInput.addEventListener("input", () => {
+    if (sameAddressToggle.checked) {
+      registeredAddressInput.value = contactAddressInput.value;
+    }
+  });
+}
+
+if (!isCreate && profileId) {
+  document.querySelectorAll(".upload-input").forEach((inputEl) => {
+    const name = inputEl.getAttribute("name");
+    if (!name) return;
+    let category = null;
+    let allowPdf = true;
+    if (name === "id_card_front") {
+      category = "id_card_front";
+      allowPdf = false;
+    } else if (name === "id_card_back") {
+      category = "id_card_back";
+      allowPdf = false;
+    } else if (name === "driver_license_file") {
+      category = "driver_license";
+    } else if (name === "bankbook_file") {
+      category = "bankbook";
+    }
+    if (!category) return;
+    inputEl.addEventListener("change", () => uploadFile(inputEl, category, allowPdf));
+  });
+}
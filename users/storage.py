@@ -0,0 +1,57 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    以內容的 SHA-256 命名檔案：<目錄>/<前兩碼>/<digest><副檔名>。
+    相同內容只存一份。刪除文件時不刪內容檔，沒有參照且超過寬限時間的檔案由 gc_worker_documents 清除。
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # 檔名在寫入時才由內容決定，同名即同內容，不需要避開既有檔案
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        tmp_dir = self.path(directory)
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, prefix=".upload-", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    fh.write(chunk)
+            hexdigest = digest.hexdigest()
+            blob_name = f"{directory}/{hexdigest[:2]}/{hexdigest}{extension}"
+            blob_path = self.path(blob_name)
+            try:
+                # 沿用既有檔案；更新修改時間讓 gc_worker_documents 的寬限時間重新計算
+                os.utime(blob_path)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                os.replace(tmp_path, blob_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(blob_path, self.file_permissions_mode)
+            else:
+                os.unlink(tmp_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return blob_name
+
+
+_document_storage = ContentAddressedStorage()
+
+
+def document_storage():
+    return _document_storage
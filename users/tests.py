@@ -0,0 +1,470 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from itertools import count
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import query_budget
+from users.bulk_import import derive_temp_password
+from users.management.commands import gc_worker_documents
+from users.models import SORT_ORDER_GAP, DocumentUpload, UserProfile, WorkerDocument, WorkerImport
+from users.ordering import apply_order
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 512
+PNG_SHA256 = hashlib.sha256(PNG_BYTES).hexdigest()
+PDF_BYTES = b"%PDF-1.4\n" + b"0" * 512 + b"\n%%EOF\n"
+NEW_PASSWORD = "changed-pass-456"
+_sequence = count(1)
+
+
+def _json(path, payload):
+    return {"method": "post", "path": path, "data": payload, "content_type": "application/json"}
+
+
+def _png(name="id.png"):
+    return SimpleUploadedFile(name, PNG_BYTES, content_type="image/png")
+
+
+def _pdf(name="bankbook.pdf"):
+    return SimpleUploadedFile(name, PDF_BYTES, content_type="application/pdf")
+
+
+def _profile_form(**extra):
+    return {
+        "display_name": "測試員工",
+        "role": "worker",
+        "real_name": "王小明",
+        "gender": "男",
+        "birthday": "2000-01-01",
+        "id_number": "A123456789",
+        "marital_status": "單身",
+        "education": "大學畢業",
+        "contact_address": "台北市",
+        "registered_address": "台北市",
+        "mobile_phone": "0912345678",
+        "emergency_contact_name": "王大明",
+        "emergency_contact_relation": "父子",
+        "emergency_contact_phone": "0987654321",
+        "work_experience": "無",
+        **extra,
+    }
+
+
+@override_settings(MEDIA_ACCEL_REDIRECT_PREFIX="/protected-media/")
+class UsersQueryBudgetTests(query_budget.QueryBudgetTestCase):
+    url_module = "users.urls"
+    budgets = {
+        "login:get": 3,
+        "login:post": 10,
+        "register:get": 3,
+        "register:post": 9,
+        "logout": 4,
+        "post_login": 3,
+        "password_reset_temp": 3,
+        "password_change": 13,
+        "worker_profile:get": 5,
+        "worker_profile:post": 12,
+        "worker_upload_self": 7,
+        "document_upload_start": 5,
+        "document_upload_status": 4,
+        "document_upload_chunk": 7,
+        "document_upload_complete": 11,
+        "worker_delete_document_self": 6,
+        "worker_document": 4,
+        "worker_document_preview": 4,
+        "create_worker": 6,
+        "worker_create:get": 4,
+        "worker_create:post": 14,
+        "import_workers": 4,
+        "import_workers_status": 6,
+        "worker_detail:get": 6,
+        "worker_detail:post": 9,
+        "worker_upload": 8,
+        "worker_reset_password": 6,
+        "worker_delete_document": 7,
+        "reorder_workers": 8,
+        "delete_worker": 18,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp(prefix="budget-media-")
+        cls.media_override = override_settings(
+            MEDIA_ROOT=cls.media_root,
+            CHUNKED_UPLOAD_ROOT=os.path.join(cls.media_root, "chunked_uploads"),
+        )
+        cls.media_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def self_profile(self, role):
+        return self.profiles.get(role, self.worker)
+
+    def own_document(self, role, **extra):
+        return WorkerDocument.objects.create(
+            profile=self.self_profile(role),
+            category="driver_license",
+            file="worker_documents/budget/license.pdf",
+            original_name="license.pdf",
+            file_size=len(PDF_BYTES),
+            **extra,
+        )
+
+    def pending_upload(self, role, received=b""):
+        upload = DocumentUpload.objects.create(
+            profile=self.self_profile(role),
+            category="id_card_front",
+            file_name="front.png",
+            content_type="image/png",
+            total_size=len(PNG_BYTES),
+            checksum=PNG_SHA256,
+        )
+        os.makedirs(os.path.dirname(upload.temp_path()), exist_ok=True)
+        with open(upload.temp_path(), "wb") as fh:
+            fh.write(received)
+        return upload
+
+    def request_login(self, role, variant):
+        path = reverse("users:login")
+        if variant == "get":
+            return {"path": path}
+        username = self.self_profile(role).user.username
+        return {"method": "post", "path": path, "data": {"username": username, "password": query_budget.TEST_PASSWORD}}
+
+    def request_register(self, role, variant):
+        path = reverse("users:register")
+        if variant == "get":
+            return {"path": path}
+        number = next(_sequence)
+        return {"method": "post", "path": path, "data": {
+            "username": f"newcomer{number}",
+            "name": f"newcomer{chr(97 + number % 26)}",
+            "password1": NEW_PASSWORD,
+            "password2": NEW_PASSWORD,
+        }}
+
+    def request_logout(self, role):
+        return {"method": "post", "path": reverse("users:logout")}
+
+    def request_post_login(self, role):
+        return {"path": reverse("users:post_login")}
+
+    def request_password_reset_temp(self, role):
+        return {"method": "post", "path": reverse("users:password_reset_temp"), "data": {
+            "username": self.worker.user.username,
+            "temp_password": query_budget.TEST_PASSWORD,
+            "new_password1": NEW_PASSWORD,
+            "new_password2": NEW_PASSWORD,
+        }}
+
+    def request_password_change(self, role):
+        return {"method": "post", "path": reverse("users:password_change"), "data": {
+            "old_password": query_budget.TEST_PASSWORD,
+            "new_password1": NEW_PASSWORD,
+            "new_password2": NEW_PASSWORD,
+        }}
+
+    def request_worker_profile(self, role, variant):
+        path = reverse("users:worker_profile")
+        if variant == "get":
+            return {"path": path}
+        return {"method": "post", "path": path, "data": _profile_form(id_card_front=_png(), bankbook_file=_pdf())}
+
+    def request_worker_upload_self(self, role):
+        return {"method": "post", "path": reverse("users:worker_upload_self"), "data": {
+            "category": "id_card_back",
+            "file": _png("back.png"),
+        }}
+
+    def request_document_upload_start(self, role):
+        return _json(reverse("users:document_upload_start"), {
+            "category": "id_card_front",
+            "file_name": "front.png",
+            "content_type": "image/png",
+            "size": len(PNG_BYTES),
+            "sha256": PNG_SHA256,
+        })
+
+    def request_document_upload_status(self, role):
+        upload = self.pending_upload(role)
+        return {"path": reverse("users:document_upload_status", args=[upload.id])}
+
+    def request_document_upload_chunk(self, role):
+        upload = self.pending_upload(role)
+        return {
+            "method": "post",
+            "path": reverse("users:document_upload_chunk", args=[upload.id]),
+            "data": PNG_BYTES,
+            "content_type": "application/octet-stream",
+            "headers": {"X-Upload-Offset": "0"},
+        }
+
+    def request_document_upload_complete(self, role):
+        upload = self.pending_upload(role, received=PNG_BYTES)
+        return {"method": "post", "path": reverse("users:document_upload_complete", args=[upload.id])}
+
+    def request_worker_delete_document_self(self, role):
+        return {"method": "post", "path": reverse("users:worker_delete_document_self"), "data": {"category": "bankbook"}}
+
+    def request_worker_document(self, role):
+        document = self.own_document(role)
+        return {"path": document.get_absolute_url()}
+
+    def request_worker_document_preview(self, role):
+        document = self.own_document(
+            role,
+            preview="worker_documents/previews/license.webp",
+            preview_status=WorkerDocument.PREVIEW_READY,
+        )
+        return {"path": document.get_preview_url()}
+
+    def request_create_worker(self, role):
+        return {"path": reverse("users:create_worker"), "data": {"q": "員工"}}
+
+    def request_worker_create(self, role, variant):
+        path = reverse("users:worker_create")
+        if variant == "get":
+            return {"path": path}
+        return {"method": "post", "path": path, "data": _profile_form(
+            username=f"hired{next(_sequence)}",
+            password1=NEW_PASSWORD,
+            password2=NEW_PASSWORD,
+            id_card_front=_png(),
+            bankbook_file=_pdf(),
+        )}
+
+    def request_import_workers(self, role):
+        return {"path": reverse("users:import_workers")}
+
+    def request_import_workers_status(self, role):
+        worker_import = WorkerImport.objects.create(
+            created_by=self.manager,
+            status=WorkerImport.STATUS_DONE,
+            result={
+                "created": [{"line_no": 2, "name": "新員工", "username": "new", "is_temp": True}],
+                "password_seed": "seed",
+            },
+        )
+        return {"path": reverse("users:import_workers_status", args=[worker_import.id])}
+
+    def request_worker_detail(self, role, variant):
+        path = reverse("users:worker_detail", args=[self.worker.id])
+        if variant == "get":
+            return {"path": path}
+        return {"method": "post", "path": path, "data": _profile_form(driver_license_file=_pdf("license.pdf"))}
+
+    def request_worker_upload(self, role):
+        return {"method": "post", "path": reverse("users:worker_upload", args=[self.worker.id]), "data": {
+            "category": "id_card_front",
+            "file": _png(),
+        }}
+
+    def request_worker_reset_password(self, role):
+        return {"method": "post", "path": reverse("users:worker_reset_password", args=[self.worker.id])}
+
+    def request_worker_delete_document(self, role):
+        return {
+            "method": "post",
+            "path": reverse("users:worker_delete_document", args=[self.worker.id]),
+            "data": {"category": "bankbook"},
+        }
+
+    def request_reorder_workers(self, role):
+        return _json(reverse("users:reorder_workers"), {"profile_id": self.others[0].id, "after_id": self.others[-1].id})
+
+    def request_delete_worker(self, role):
+        return {"method": "post", "path": reverse("users:delete_worker"), "data": {"profile_id": self.others[0].id}}
+
+
+@override_settings(MEDIA_ACCEL_REDIRECT_PREFIX="/protected-media/")
+class WorkerDocumentUrlTests(TestCase):
+    def test_mismatched_filename_redirects_to_stored_name(self):
+        profile = query_budget.create_profiles(1)[0]
+        document = WorkerDocument.objects.create(
+            profile=profile,
+            category="bankbook",
+            file="worker_documents/budget/bankbook.pdf",
+            original_name="bankbook.pdf",
+            file_size=len(PDF_BYTES),
+        )
+        self.client.force_login(profile.user)
+        response = self.client.get(reverse("users:worker_document", args=[document.id, "other.exe"]))
+        self.assertRedirects(response, document.get_absolute_url(), fetch_redirect_response=False)
+        response = self.client.get(document.get_absolute_url())
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/worker_documents/budget/bankbook.pdf")
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=0, METRICS_ENABLED=True)
+class ServerTimingTests(TestCase):
+    def test_manager_gets_server_timing_without_log_sampling(self):
+        manager = query_budget.create_profiles(1, role="manager", prefix="mgr")[0]
+        self.client.force_login(manager.user)
+        response = self.client.get(reverse("users:create_worker"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("total;dur=", response["Server-Timing"])
+
+    def test_worker_gets_no_server_timing(self):
+        worker = query_budget.create_profiles(1)[0]
+        self.client.force_login(worker.user)
+        response = self.client.get(reverse("users:worker_profile"))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Server-Timing", response)
+
+
+class DocumentUploadChunkTests(TestCase):
+    def setUp(self):
+        self.upload_root = tempfile.mkdtemp(prefix="budget-uploads-")
+        self.addCleanup(shutil.rmtree, self.upload_root, ignore_errors=True)
+        override = override_settings(CHUNKED_UPLOAD_ROOT=self.upload_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.profile = query_budget.create_profiles(1)[0]
+        self.client.force_login(self.profile.user)
+
+    def start(self, **extra):
+        payload = {
+            "category": "id_card_front",
+            "file_name": "front.png",
+            "content_type": "image/png",
+            "size": len(PNG_BYTES),
+            **extra,
+        }
+        return self.client.post(reverse("users:document_upload_start"), payload, content_type="application/json")
+
+    def send_chunk(self, upload_id, body, checksum):
+        return self.client.post(
+            reverse("users:document_upload_chunk", args=[upload_id]),
+            body,
+            content_type="application/octet-stream",
+            headers={"X-Upload-Offset": "0", "X-Chunk-SHA256": checksum},
+        )
+
+    def test_checksum_is_required(self):
+        self.assertEqual(self.start().status_code, 400)
+
+    def test_corrupted_chunk_is_rejected(self):
+        upload_id = self.start(sha256=PNG_SHA256).json()["upload_id"]
+        corrupted = PNG_BYTES[:-1] + b"\x01"
+        response = self.send_chunk(upload_id, corrupted, PNG_SHA256)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["offset"], 0)
+        response = self.send_chunk(upload_id, PNG_BYTES, PNG_SHA256)
+        self.assertEqual(response.json(), {"ok": True, "offset": len(PNG_BYTES)})
+        # 暫存的區塊檔不會留下
+        self.assertEqual(sorted(os.listdir(self.upload_root)), [f"{upload_id}.part"])
+
+
+class GcWorkerDocumentsTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp(prefix="budget-media-")
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.storage = WorkerDocument._meta.get_field("file").storage
+        self.name = self.storage.save("worker_documents/orphan.png", SimpleUploadedFile("orphan.png", PNG_BYTES))
+
+    def test_orphan_file_is_deleted(self):
+        call_command("gc_worker_documents", min_age=0, stdout=StringIO())
+        self.assertFalse(self.storage.exists(self.name))
+
+    def test_orphan_reused_while_moved_aside_is_restored(self):
+        with mock.patch.object(gc_worker_documents.Command, "is_recent", side_effect=[False, True]):
+            call_command("gc_worker_documents", min_age=0, stdout=StringIO())
+        self.assertTrue(self.storage.exists(self.name))
+        self.assertEqual(self.storage.listdir(os.path.dirname(self.name))[1], [os.path.basename(self.name)])
+
+
+class WorkerOrderingTests(TestCase):
+    def setUp(self):
+        # 排序值 1024、2048、3072、4096、5120
+        self.a, self.b, self.c, self.d, self.e = query_budget.create_profiles(5)
+
+    def order(self):
+        return list(UserProfile.objects.order_by("sort_order").values_list("id", "sort_order"))
+
+    def assert_order(self, *profiles):
+        values = dict(UserProfile.objects.values_list("id", "sort_order"))
+        self.assertEqual(len(set(values.values())), len(values), "sort_order 重複")
+        self.assertEqual([pid for pid, _ in self.order()], [profile.id for profile in profiles])
+
+    def test_subset_reorder_does_not_collide_with_other_workers(self):
+        apply_order([self.c, self.b])
+        self.assert_order(self.a, self.c, self.b, self.d, self.e)
+        self.assertEqual(UserProfile.objects.get(id=self.a.id).sort_order, SORT_ORDER_GAP)
+
+    def test_subset_tail_stays_before_next_worker(self):
+        apply_order([self.c, self.d, self.a])
+        self.assert_order(self.b, self.c, self.d, self.a, self.e)
+
+    def test_full_rebalance_when_gaps_run_out(self):
+        for value, profile in enumerate((self.a, self.b, self.c, self.d, self.e), start=1):
+            UserProfile.objects.filter(id=profile.id).update(sort_order=value)
+        profiles = list(UserProfile.objects.filter(id__in=[self.b.id, self.d.id]).order_by("-sort_order"))
+        apply_order(profiles)
+        self.assert_order(self.a, self.d, self.c, self.b, self.e)
+
+
+class WorkerImportTests(TestCase):
+    def test_import_is_queued_and_passwords_shown_once(self):
+        manager = query_budget.create_profiles(1, role="manager", prefix="mgr")[0]
+        self.client.force_login(manager.user)
+        upload = SimpleUploadedFile("workers.csv", "帳號,名稱\nimported1,匯入員工\n".encode(), content_type="text/csv")
+        response = self.client.post(reverse("users:import_workers"), {"file": upload})
+        worker_import = WorkerImport.objects.get()
+        self.assertRedirects(
+            response, reverse("users:import_workers_status", args=[worker_import.id]), fetch_redirect_response=False
+        )
+        self.assertEqual(worker_import.status, WorkerImport.STATUS_PENDING)
+        self.assertEqual(worker_import.rows[0][1]["username"], "imported1")
+        self.assertNotIn("password", json.dumps(worker_import.rows))
+        self.assertFalse(User.objects.filter(username="imported1").exists())
+
+        call_command("process_worker_imports", workers=1)
+        worker_import.refresh_from_db()
+        self.assertEqual(worker_import.status, WorkerImport.STATUS_DONE)
+        self.assertEqual(worker_import.rows, [])
+        password = derive_temp_password(worker_import.result["password_seed"], 2)
+        self.assertNotIn(password, json.dumps(worker_import.result))
+        self.assertTrue(User.objects.get(username="imported1").check_password(password))
+
+        status_url = reverse("users:import_workers_status", args=[worker_import.id])
+        self.assertContains(self.client.get(status_url), password)
+        self.assertNotContains(self.client.get(status_url), password)
+        worker_import.refresh_from_db()
+        self.assertNotIn("password_seed", worker_import.result)
+
+    def test_passwords_in_sheet_are_rejected(self):
+        manager = query_budget.create_profiles(1, role="manager", prefix="mgr")[0]
+        self.client.force_login(manager.user)
+        content = "帳號,名稱,密碼\nimported1,匯入員工,Secret-pass-789\n".encode()
+        upload = SimpleUploadedFile("workers.csv", content, content_type="text/csv")
+        response = self.client.post(reverse("users:import_workers"), {"file": upload})
+        self.assertContains(response, "網頁匯入不接受密碼", status_code=400)
+        self.assertFalse(WorkerImport.objects.exists())
+
+    def test_username_taken_after_validation_is_reported(self):
+        manager = query_budget.create_profiles(1, role="manager", prefix="mgr")[0]
+        worker_import = WorkerImport.objects.create(
+            created_by=manager,
+            rows=[[2, {"username": "taken", "display_name": "甲", "role": "worker"}]],
+        )
+        User.objects.create_user(username="taken")
+        call_command("process_worker_imports", workers=1)
+        worker_import.refresh_from_db()
+        self.assertEqual(worker_import.status, WorkerImport.STATUS_FAILED)
+        self.assertEqual(worker_import.result["errors"], [[2, "帳號", "帳號已被使用。"]])
@@ -12,9 +12,17 @@ urlpatterns = [
     path('password/change/', views.ForcedPasswordChangeView.as_view(), name='password_change'),
     path('profile/', views.worker_profile, name='worker_profile'),
     path('profile/upload/', views.upload_worker_document_self, name='worker_upload_self'),
+    path('profile/uploads/', views.start_document_upload, name='document_upload_start'),
+    path('profile/uploads/<uuid:upload_id>/', views.document_upload_status, name='document_upload_status'),
+    path('profile/uploads/<uuid:upload_id>/chunk/', views.upload_document_chunk, name='document_upload_chunk'),
+    path('profile/uploads/<uuid:upload_id>/complete/', views.complete_document_upload, name='document_upload_complete'),
     path('profile/delete-document/', views.delete_worker_document_self, name='worker_delete_document_self'),
+    path('documents/<int:document_id>/<str:filename>', views.serve_worker_document, name='worker_document'),
+    path('documents/<int:document_id>/preview/<str:filename>', views.serve_worker_document_preview, name='worker_document_preview'),
     path('create-worker/', views.create_worker, name='create_worker'),
     path('create-worker/add/', views.worker_create, name='worker_create'),
+    path('create-worker/import/', views.import_workers, name='import_workers'),
+    path('create-worker/import/<uuid:import_id>/', views.import_workers_status, name='import_workers_status'),
     path('create-worker/<int:profile_id>/', views.worker_detail, name='worker_detail'),
     path('create-worker/<int:profile_id>/upload/', views.upload_worker_document, name='worker_upload'),
     path('create-worker/<int:profile_id>/reset-password/', views.reset_worker_password, name='worker_reset_password'),
@@ -1,16 +1,28 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.views import LoginView, PasswordChangeView
+from django.conf import settings
 from django.urls import reverse_lazy
-from django.http import JsonResponse
-from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.db.models import Q
 from django.shortcuts import redirect, render
+from django.utils import timezone
+from django.utils.http import content_disposition_header
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
+from datetime import timedelta
+import hashlib
 import json
+import mimetypes
 import os
+import re
 import secrets
+import shutil
 import string
+import tempfile
+from urllib.parse import quote
 
 from .forms import (
     WorkerCreationForm,
@@ -18,8 +30,18 @@ from .forms import (
     ManagerWorkerUpdateForm,
     TempPasswordResetForm,
 )
-from .models import UserProfile, WorkerDocument
-from scheduling.models import SchedulingWindow
+from .bulk_import import (
+    IMPORT_COLUMNS,
+    WORKER_IMPORT_MAX_ROWS,
+    derive_temp_password,
+    read_rows,
+    serialize_rows,
+    validate_rows,
+)
+from .models import DocumentUpload, UserProfile, WorkerDocument, WorkerImport
+from .ordering import apply_order, move_after
+from scheduling.models import Store
+from scheduling.windows import get_latest_window
 
 
 def is_manager(user):
@@ -37,10 +59,27 @@ def is_store_manager(user):
 
 
 MANAGED_ROLES = ("worker", "supervisor")
+DOCUMENT_CATEGORIES = ("id_card_front", "id_card_back", "driver_license", "bankbook")
+DOCUMENT_MAX_SIZE = 10 * 1024 * 1024
+WORKER_LIST_FIELDS = (
+    "id",
+    "name",
+    "real_name",
+    "role",
+    "birthday",
+    "mobile_phone",
+    "sort_order",
+    "profile_complete",
+    "user__id",
+    "user__username",
+    "primary_store__id",
+    "primary_store__name",
+)
+WORKER_PAGE_SIZE = 50
 
 
 def get_allow_worker_register():
-    latest = SchedulingWindow.objects.order_by("-created_at").first()
+    latest = get_latest_window()
     return latest.allow_worker_register if latest else False
 
 
@@ -135,7 +174,6 @@ def register_worker(request):
                 user=user,
                 role="worker",
                 name=form.cleaned_data.get("name", ""),
-                sort_order=(UserProfile.objects.filter(role__in=MANAGED_ROLES).count() + 1),
             )
             messages.success(request, "註冊成功，請使用帳號登入。")
             return redirect("users:login")
@@ -149,17 +187,88 @@ def register_worker(request):
     )
 
 
+def _parse_worker_cursor(value, size):
+    try:
+        parts = [int(part) for part in value.split(":")]
+    except ValueError:
+        return None
+    return parts if len(parts) == size else None
+
+
+def _worker_cursor(profile, keys):
+    return ":".join(str(int(getattr(profile, key))) for key in keys)
+
+
+def _cursor_q(keys, values, lookup):
+    # (k1, k2, ...) > (v1, v2, ...)，展開成可使用索引的 OR 條件
+    condition = Q()
+    for idx, key in enumerate(keys):
+        equal = dict(zip(keys[:idx], values[:idx]))
+        condition |= Q(**equal, **{f"{key}__{lookup}": values[idx]})
+    return condition
+
+
 @login_required
 @user_passes_test(is_store_manager)
 def create_worker(request):
+    only_incomplete = request.GET.get("incomplete") == "1"
+    sort = request.GET.get("sort", "")
+    if sort not in ("", "incomplete"):
+        sort = ""
+    query = (request.GET.get("q") or "").strip()
+    role = request.GET.get("role", "")
+    if role not in MANAGED_ROLES:
+        role = ""
+    store_id = request.GET.get("store", "")
+    if not store_id.isdigit():
+        store_id = ""
+
     workers = (
         UserProfile.objects.filter(role__in=MANAGED_ROLES)
-        .select_related("user")
-        .order_by("sort_order", "name", "user__username")
+        .select_related("user", "primary_store")
+        .only(*WORKER_LIST_FIELDS)
     )
+    if only_incomplete:
+        workers = workers.filter(profile_complete=False)
+    if query:
+        # 前綴比對才能使用 name/real_name/mobile_phone 的索引
+        workers = workers.filter(
+            Q(name__istartswith=query)
+            | Q(real_name__istartswith=query)
+            | Q(mobile_phone__startswith=query)
+            | Q(user__username__istartswith=query)
+        )
+    if role:
+        workers = workers.filter(role=role)
+    if store_id:
+        workers = workers.filter(primary_store_id=int(store_id))
+
+    # keyset 分頁：依 (sort_order, id) 取下一頁，不論翻到第幾頁都只讀一頁的資料
+    keys = ["profile_complete", "sort_order", "id"] if sort == "incomplete" else ["sort_order", "id"]
+    after = _parse_worker_cursor(request.GET.get("after", ""), len(keys))
+    before = _parse_worker_cursor(request.GET.get("before", ""), len(keys)) if not after else None
+    try:
+        start = max(1, int(request.GET.get("start", 1)))
+    except ValueError:
+        start = 1
+    if before:
+        workers = workers.filter(_cursor_q(keys, before, "lt"))
+        page = list(workers.order_by(*[f"-{key}" for key in keys])[: WORKER_PAGE_SIZE + 1])
+        has_previous = len(page) > WORKER_PAGE_SIZE
+        page = page[:WORKER_PAGE_SIZE][::-1]
+        has_next = True
+    else:
+        if after:
+            workers = workers.filter(_cursor_q(keys, after, "gt"))
+        page = list(workers.order_by(*keys)[: WORKER_PAGE_SIZE + 1])
+        has_next = len(page) > WORKER_PAGE_SIZE
+        page = page[:WORKER_PAGE_SIZE]
+        has_previous = bool(after)
+    if not has_previous:
+        start = 1
+
     worker_rows = []
-    for worker in workers:
-        missing_info = worker.missing_required_info()
+    for worker in page:
         age = worker.age()
         worker_rows.append(
             {
@@ -169,16 +278,41 @@ def create_worker(request):
                 "real_name": worker.real_name,
                 "age": age if age is not None else "-",
                 "mobile_phone": worker.mobile_phone,
-                "missing_info": missing_info,
+                "store_name": worker.primary_store.name if worker.primary_store else "",
+                "missing_info": not worker.profile_complete,
                 "role_label": worker.get_role_display(),
             }
         )
 
+    params = request.GET.copy()
+    for key in ("after", "before", "start"):
+        params.pop(key, None)
+    next_url = previous_url = ""
+    if page and has_next:
+        params["after"] = _worker_cursor(page[-1], keys)
+        params["start"] = start + len(page)
+        next_url = f"?{params.urlencode()}"
+        params.pop("after")
+    if page and has_previous:
+        params["before"] = _worker_cursor(page[0], keys)
+        params["start"] = max(1, start - WORKER_PAGE_SIZE)
+        previous_url = f"?{params.urlencode()}"
+
     return render(
         request,
         "users/create_worker.html",
         {
             "workers": worker_rows,
+            "only_incomplete": only_incomplete,
+            "sort": sort,
+            "query": query,
+            "role": role,
+            "store_id": store_id,
+            "role_choices": [(value, label) for value, label in UserProfile.USER_ROLES if value in MANAGED_ROLES],
+            "stores": Store.objects.only("id", "name"),
+            "start": start,
+            "next_url": next_url,
+            "previous_url": previous_url,
         },
     )
 
@@ -193,26 +327,47 @@ def reorder_workers(request):
     except json.JSONDecodeError:
         return JsonResponse({"ok": False, "error": "資料格式錯誤"}, status=400)
 
+    profile_id = payload.get("profile_id")
+    if profile_id is not None:
+        # 單筆移動：放到 after_id 之後（null 代表最前面），只更新被移動的員工
+        after_id = payload.get("after_id")
+        try:
+            profile_id = int(profile_id)
+            after_id = int(after_id) if after_id is not None else None
+        except (TypeError, ValueError):
+            return JsonResponse({"ok": False, "error": "資料格式錯誤"}, status=400)
+        with transaction.atomic():
+            profiles = UserProfile.objects.select_for_update().filter(
+                role__in=MANAGED_ROLES, id__in=[profile_id, after_id]
+            )
+            by_id = {p.id: p for p in profiles}
+            profile = by_id.get(profile_id)
+            after = by_id.get(after_id) if after_id is not None else None
+            if not profile or (after_id is not None and not after) or profile_id == after_id:
+                return JsonResponse({"ok": False, "error": "資料不完整，請重新整理"}, status=400)
+            updated = move_after(profile, after)
+        return JsonResponse({"ok": True, "updated": updated})
+
     ordered_ids = payload.get("ordered_ids", [])
     if not isinstance(ordered_ids, list) or not ordered_ids:
         return JsonResponse({"ok": False, "error": "缺少排序資料"}, status=400)
+    try:
+        ordered_ids = [int(worker_id) for worker_id in ordered_ids]
+    except (TypeError, ValueError):
+        return JsonResponse({"ok": False, "error": "資料格式錯誤"}, status=400)
 
-    workers = list(UserProfile.objects.filter(role__in=MANAGED_ROLES, id__in=ordered_ids))
-    if len(workers) != len(ordered_ids):
-        return JsonResponse({"ok": False, "error": "資料不完整，請重新整理"}, status=400)
-
-    id_to_profile = {w.id: w for w in workers}
-    updates = []
-    for idx, worker_id in enumerate(ordered_ids, start=1):
-        profile = id_to_profile.get(worker_id)
-        if profile.sort_order != idx:
-            profile.sort_order = idx
-            updates.append(profile)
-
-    if updates:
-        UserProfile.objects.bulk_update(updates, ["sort_order"])
+    with transaction.atomic():
+        workers = list(
+            UserProfile.objects.select_for_update()
+            .filter(role__in=MANAGED_ROLES, id__in=ordered_ids)
+            .only("id", "sort_order")
+        )
+        if len(workers) != len(ordered_ids):
+            return JsonResponse({"ok": False, "error": "資料不完整，請重新整理"}, status=400)
+        id_to_profile = {w.id: w for w in workers}
+        updated = apply_order([id_to_profile[worker_id] for worker_id in ordered_ids])
 
-    return JsonResponse({"ok": True})
+    return JsonResponse({"ok": True, "updated": updated})
 
 
 @login_required
@@ -229,7 +384,10 @@ def delete_worker(request):
         messages.error(request, "找不到員工資料。")
         return redirect("users:create_worker")
 
+    documents = list(profile.documents.all())
     profile.user.delete()
+    for document in documents:
+        document.delete_files()
     messages.success(request, "員工資料已刪除。")
     return redirect("users:create_worker")
 
@@ -263,15 +421,30 @@ def _is_allowed_upload(file_obj, allow_pdf=False):
     return False
 
 
+def _document_upload_error(file_obj, category):
+    if category not in DOCUMENT_CATEGORIES:
+        return "檔案類別錯誤"
+    if category in {"id_card_front", "id_card_back"}:
+        if not _is_allowed_image_upload(file_obj):
+            return "身分證檔案需為 JPG/PNG/HEIC"
+    else:
+        if not _is_allowed_upload(file_obj, allow_pdf=True):
+            return "檔案格式需為 JPG/PNG/HEIC/PDF"
+    if file_obj.size > DOCUMENT_MAX_SIZE:
+        return "檔案大小不可超過 10MB"
+    return None
+
+
 def _save_worker_document(profile, file_obj, category):
     if not file_obj:
         return
-    existing = WorkerDocument.objects.filter(profile=profile, category=category)
+    # 先建立新資料再移除舊檔，寫入失敗時不會遺失原本的文件
+    existing = list(WorkerDocument.objects.filter(profile=profile, category=category))
+    document = WorkerDocument.objects.create(profile=profile, category=category, file=file_obj)
     for doc in existing:
-        if doc.file:
-            doc.file.delete(save=False)
-    existing.delete()
-    WorkerDocument.objects.create(profile=profile, category=category, file=file_obj)
+        doc.delete_files()
+        doc.delete()
+    return document
 
 
 @login_required
@@ -305,7 +478,6 @@ def worker_create(request):
                 emergency_contact_relation=(form.cleaned_data.get("emergency_contact_relation") or "").strip(),
                 emergency_contact_phone=(form.cleaned_data.get("emergency_contact_phone") or "").strip(),
                 work_experience=(form.cleaned_data.get("work_experience") or "").strip(),
-                sort_order=(UserProfile.objects.filter(role__in=MANAGED_ROLES).count() + 1),
             )
 
             _save_worker_document(profile, request.FILES.get("id_card_front"), "id_card_front")
@@ -329,6 +501,75 @@ def worker_create(request):
     )
 
 
+WEB_IMPORT_COLUMNS = [title for title, field in IMPORT_COLUMNS.items() if field != "password"]
+
+
+@login_required
+@user_passes_test(is_store_manager)
+def import_workers(request):
+    context = {"columns": WEB_IMPORT_COLUMNS}
+    if request.method == "POST":
+        upload = request.FILES.get("file")
+        if not upload:
+            context["error"] = "請選擇檔案"
+            return render(request, "users/worker_import.html", context, status=400)
+        try:
+            rows = read_rows(upload, upload.name)
+        except ValueError as exc:
+            context["error"] = str(exc)
+            return render(request, "users/worker_import.html", context, status=400)
+        except Exception:
+            context["error"] = "無法讀取檔案"
+            return render(request, "users/worker_import.html", context, status=400)
+        if not rows:
+            context["error"] = "檔案沒有資料"
+            return render(request, "users/worker_import.html", context, status=400)
+        if len(rows) > WORKER_IMPORT_MAX_ROWS:
+            context["error"] = f"一次最多匯入 {WORKER_IMPORT_MAX_ROWS} 筆"
+            return render(request, "users/worker_import.html", context, status=400)
+
+        # 密碼不寫入資料庫等待背景處理，網頁匯入一律產生臨時密碼
+        valid, errors = validate_rows(rows, allow_passwords=False)
+        if errors:
+            context["row_errors"] = errors
+            return render(request, "users/worker_import.html", context, status=400)
+
+        # 密碼雜湊（PBKDF2）很耗 CPU，交給 process_worker_imports 在背景建立帳號
+        worker_import = WorkerImport.objects.create(
+            created_by=request.user.userprofile,
+            rows=serialize_rows(valid),
+        )
+        return redirect("users:import_workers_status", import_id=worker_import.id)
+
+    return render(request, "users/worker_import.html", context)
+
+
+@login_required
+@user_passes_test(is_store_manager)
+def import_workers_status(request, import_id):
+    worker_import = WorkerImport.objects.filter(id=import_id).first()
+    if worker_import is None:
+        raise Http404
+    context = {"columns": WEB_IMPORT_COLUMNS, "worker_import": worker_import}
+    result = worker_import.result or {}
+    if worker_import.status == WorkerImport.STATUS_FAILED:
+        context["error"] = result.get("error") or "以下帳號已被使用，未建立任何帳號"
+        context["row_errors"] = result.get("errors", [])
+    elif worker_import.status == WorkerImport.STATUS_DONE:
+        seed = result.get("password_seed")
+        context["passwords_shown"] = not seed
+        context["created"] = [
+            {**row, "password": derive_temp_password(seed, row["line_no"]) if seed and row["is_temp"] else ""}
+            for row in result.get("created", [])
+        ]
+        if seed:
+            # 臨時密碼只顯示一次
+            WorkerImport.objects.filter(id=worker_import.id).update(result={"created": result.get("created", [])})
+    response = render(request, "users/worker_import.html", context)
+    response["Cache-Control"] = "no-store"
+    return response
+
+
 @login_required
 @user_passes_test(is_store_manager)
 def worker_detail(request, profile_id):
@@ -389,20 +630,7 @@ def worker_detail(request, profile_id):
             }
         )
 
-    documents = {
-        "id_card_front": _document_if_exists(
-            profile.documents.filter(category="id_card_front").first()
-        ),
-        "id_card_back": _document_if_exists(
-            profile.documents.filter(category="id_card_back").first()
-        ),
-        "driver_license": _document_if_exists(
-            profile.documents.filter(category="driver_license").first()
-        ),
-        "bankbook": _document_if_exists(
-            profile.documents.filter(category="bankbook").first()
-        ),
-    }
+    documents = _load_documents(profile)
 
     return render(
         request,
@@ -478,20 +706,7 @@ def worker_profile(request):
             }
         )
 
-    documents = {
-        "id_card_front": _document_if_exists(
-            profile.documents.filter(category="id_card_front").first()
-        ),
-        "id_card_back": _document_if_exists(
-            profile.documents.filter(category="id_card_back").first()
-        ),
-        "driver_license": _document_if_exists(
-            profile.documents.filter(category="driver_license").first()
-        ),
-        "bankbook": _document_if_exists(
-            profile.documents.filter(category="bankbook").first()
-        ),
-    }
+    documents = _load_documents(profile)
 
     show_profile_warning = _profile_missing_required_info(profile)
 
@@ -505,6 +720,7 @@ def worker_profile(request):
             "is_create": False,
             "is_manager_view": False,
             "upload_url": "/users/profile/upload/",
+            "chunked_upload_url": "/users/profile/uploads/",
             "delete_url": "/users/profile/delete-document/",
             "show_profile_warning": show_profile_warning,
         },
@@ -526,30 +742,20 @@ def upload_worker_document(request, profile_id):
     if not category or not file_obj:
         return JsonResponse({"ok": False, "error": "缺少檔案或類別"}, status=400)
 
-    allowed_categories = {"id_card_front", "id_card_back", "driver_license", "bankbook"}
-    if category not in allowed_categories:
-        return JsonResponse({"ok": False, "error": "檔案類別錯誤"}, status=400)
+    error = _document_upload_error(file_obj, category)
+    if error:
+        return JsonResponse({"ok": False, "error": error}, status=400)
 
-    if category in {"id_card_front", "id_card_back"}:
-        if not _is_allowed_image_upload(file_obj):
-            return JsonResponse({"ok": False, "error": "身分證檔案需為 JPG/PNG/HEIC"}, status=400)
-    else:
-        if not _is_allowed_upload(file_obj, allow_pdf=True):
-            return JsonResponse({"ok": False, "error": "檔案格式需為 JPG/PNG/HEIC/PDF"}, status=400)
-    if file_obj.size > 10 * 1024 * 1024:
-        return JsonResponse({"ok": False, "error": "檔案大小不可超過 10MB"}, status=400)
-
-
-    _save_worker_document(profile, file_obj, category)
-    document = profile.documents.filter(category=category).first()
+    document = _save_worker_document(profile, file_obj, category)
     if not document:
         return JsonResponse({"ok": False, "error": "檔案儲存失敗"}, status=400)
 
     return JsonResponse(
         {
             "ok": True,
-            "file_url": document.file.url,
+            "file_url": document.get_absolute_url(),
             "file_name": document.file.name,
+            "preview_status": document.preview_status,
         }
     )
 
@@ -570,29 +776,197 @@ def upload_worker_document_self(request):
     if not category or not file_obj:
         return JsonResponse({"ok": False, "error": "缺少檔案或類別"}, status=400)
 
-    allowed_categories = {"id_card_front", "id_card_back", "driver_license", "bankbook"}
-    if category not in allowed_categories:
-        return JsonResponse({"ok": False, "error": "檔案類別錯誤"}, status=400)
-
-    if category in {"id_card_front", "id_card_back"}:
-        if not _is_allowed_image_upload(file_obj):
-            return JsonResponse({"ok": False, "error": "身分證檔案需為 JPG/PNG/HEIC"}, status=400)
-    else:
-        if not _is_allowed_upload(file_obj, allow_pdf=True):
-            return JsonResponse({"ok": False, "error": "檔案格式需為 JPG/PNG/HEIC/PDF"}, status=400)
-    if file_obj.size > 10 * 1024 * 1024:
-        return JsonResponse({"ok": False, "error": "檔案大小不可超過 10MB"}, status=400)
+    error = _document_upload_error(file_obj, category)
+    if error:
+        return JsonResponse({"ok": False, "error": error}, status=400)
 
-    _save_worker_document(profile, file_obj, category)
-    document = profile.documents.filter(category=category).first()
+    document = _save_worker_document(profile, file_obj, category)
     if not document:
         return JsonResponse({"ok": False, "error": "檔案儲存失敗"}, status=400)
 
     return JsonResponse(
         {
             "ok": True,
-            "file_url": document.file.url,
+            "file_url": document.get_absolute_url(),
             "file_name": document.file.name,
+            "preview_status": document.preview_status,
+        }
+    )
+
+
+def _self_upload_profile(request):
+    try:
+        profile = request.user.userprofile
+    except UserProfile.DoesNotExist:
+        return None, JsonResponse({"ok": False, "error": "找不到員工資料"}, status=404)
+    if profile.is_manager():
+        return None, JsonResponse({"ok": False, "error": "權限不足"}, status=403)
+    return profile, None
+
+
+def _purge_expired_uploads():
+    cutoff = timezone.now() - timedelta(seconds=settings.CHUNKED_UPLOAD_EXPIRE_SECONDS)
+    for upload in DocumentUpload.objects.filter(created_at__lt=cutoff)[:50]:
+        upload.discard()
+
+
+@login_required
+@require_POST
+def start_document_upload(request):
+    profile, error_response = _self_upload_profile(request)
+    if error_response:
+        return error_response
+
+    try:
+        payload = json.loads(request.body)
+        total_size = int(payload.get("size"))
+    except (json.JSONDecodeError, TypeError, ValueError):
+        return JsonResponse({"ok": False, "error": "資料格式錯誤"}, status=400)
+
+    category = payload.get("category")
+    file_name = os.path.basename(str(payload.get("file_name") or ""))[:255]
+    content_type = str(payload.get("content_type") or "")[:100]
+    checksum = str(payload.get("sha256") or "").lower()
+    if not category or not file_name or total_size <= 0:
+        return JsonResponse({"ok": False, "error": "缺少檔案或類別"}, status=400)
+    if not re.fullmatch(r"[0-9a-f]{64}", checksum):
+        return JsonResponse({"ok": False, "error": "檢查碼格式錯誤"}, status=400)
+
+    error = _document_upload_error(
+        UploadedFile(name=file_name, content_type=content_type, size=total_size),
+        category,
+    )
+    if error:
+        return JsonResponse({"ok": False, "error": error}, status=400)
+
+    _purge_expired_uploads()
+    upload = DocumentUpload.objects.create(
+        profile=profile,
+        category=category,
+        file_name=file_name,
+        content_type=content_type,
+        total_size=total_size,
+        checksum=checksum,
+    )
+    return JsonResponse(
+        {
+            "ok": True,
+            "upload_id": str(upload.id),
+            "offset": 0,
+            "chunk_size": settings.CHUNKED_UPLOAD_CHUNK_SIZE,
+        }
+    )
+
+
+@login_required
+def document_upload_status(request, upload_id):
+    profile, error_response = _self_upload_profile(request)
+    if error_response:
+        return error_response
+    upload = DocumentUpload.objects.filter(id=upload_id, profile=profile).first()
+    if not upload:
+        return JsonResponse({"ok": False, "error": "找不到上傳資料"}, status=404)
+    return JsonResponse({"ok": True, "offset": upload.received_size(), "size": upload.total_size})
+
+
+@login_required
+@require_POST
+def upload_document_chunk(request, upload_id):
+    profile, error_response = _self_upload_profile(request)
+    if error_response:
+        return error_response
+
+    try:
+        offset = int(request.headers.get("X-Upload-Offset", ""))
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "資料格式錯誤"}, status=400)
+    if length <= 0 or length > settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+        return JsonResponse({"ok": False, "error": "區塊大小錯誤"}, status=400)
+    chunk_checksum = request.headers.get("X-Chunk-SHA256", "").lower()
+
+    upload = DocumentUpload.objects.filter(id=upload_id, profile=profile).first()
+    if not upload:
+        return JsonResponse({"ok": False, "error": "找不到上傳資料"}, status=404)
+    received = upload.received_size()
+    if offset != received:
+        # 回傳目前進度，讓用戶端從正確位置續傳
+        return JsonResponse({"ok": False, "error": "續傳位置不符", "offset": received}, status=409)
+    if received + length > upload.total_size:
+        return JsonResponse({"ok": False, "error": "超過檔案大小"}, status=400)
+
+    # 先收完整個區塊再鎖定，等待用戶端傳送時不持有資料列鎖與交易
+    os.makedirs(settings.CHUNKED_UPLOAD_ROOT, exist_ok=True)
+    spool = tempfile.NamedTemporaryFile(dir=settings.CHUNKED_UPLOAD_ROOT, suffix=".chunk", delete=False)
+    try:
+        digest = hashlib.sha256()
+        with spool:
+            remaining = length
+            while remaining > 0:
+                data = request.read(min(64 * 1024, remaining))
+                if not data:
+                    break
+                spool.write(data)
+                digest.update(data)
+                remaining -= len(data)
+        if remaining:
+            return JsonResponse({"ok": False, "error": "區塊不完整", "offset": received}, status=400)
+        if chunk_checksum and digest.hexdigest() != chunk_checksum:
+            return JsonResponse({"ok": False, "error": "區塊檢查碼不符", "offset": received}, status=400)
+
+        with transaction.atomic():
+            upload = DocumentUpload.objects.select_for_update().filter(id=upload_id, profile=profile).first()
+            if not upload:
+                return JsonResponse({"ok": False, "error": "找不到上傳資料"}, status=404)
+            received = upload.received_size()
+            if offset != received:
+                return JsonResponse({"ok": False, "error": "續傳位置不符", "offset": received}, status=409)
+            with open(spool.name, "rb") as src, open(upload.temp_path(), "ab") as fh:
+                shutil.copyfileobj(src, fh)
+    finally:
+        os.unlink(spool.name)
+
+    return JsonResponse({"ok": True, "offset": upload.received_size()})
+
+
+@login_required
+@require_POST
+def complete_document_upload(request, upload_id):
+    profile, error_response = _self_upload_profile(request)
+    if error_response:
+        return error_response
+
+    with transaction.atomic():
+        upload = DocumentUpload.objects.select_for_update().filter(id=upload_id, profile=profile).first()
+        if not upload:
+            return JsonResponse({"ok": False, "error": "找不到上傳資料"}, status=404)
+        received = upload.received_size()
+        if received != upload.total_size:
+            return JsonResponse({"ok": False, "error": "檔案尚未上傳完成", "offset": received}, status=409)
+        if upload.compute_checksum() != upload.checksum:
+            upload.discard()
+            return JsonResponse({"ok": False, "error": "檔案檢查碼不符，請重新上傳"}, status=400)
+
+        with open(upload.temp_path(), "rb") as fh:
+            file_obj = UploadedFile(
+                file=fh,
+                name=upload.file_name,
+                content_type=upload.content_type,
+                size=received,
+            )
+            error = _document_upload_error(file_obj, upload.category)
+            if error:
+                upload.discard()
+                return JsonResponse({"ok": False, "error": error}, status=400)
+            document = _save_worker_document(profile, file_obj, upload.category)
+        upload.discard()
+
+    return JsonResponse(
+        {
+            "ok": True,
+            "file_url": document.get_absolute_url(),
+            "file_name": document.file.name,
+            "preview_status": document.preview_status,
         }
     )
 
@@ -614,8 +988,7 @@ def delete_worker_document(request, profile_id):
     if not document:
         return JsonResponse({"ok": True})
 
-    if document.file:
-        document.file.delete(save=False)
+    document.delete_files()
     document.delete()
     return JsonResponse({"ok": True})
 
@@ -640,12 +1013,60 @@ def delete_worker_document_self(request):
     if not document:
         return JsonResponse({"ok": True})
 
-    if document.file:
-        document.file.delete(save=False)
+    document.delete_files()
     document.delete()
     return JsonResponse({"ok": True})
 
 
+def _document_for_request(request, document_id):
+    document = WorkerDocument.objects.filter(id=document_id).select_related("profile").first()
+    if not document or not document.file:
+        raise Http404
+    if not is_store_manager(request.user) and document.profile.user_id != request.user.id:
+        return None
+    return document
+
+
+def _serve_document_file(field_file, download_name):
+    file_name = field_file.name
+    content_type = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+    accel_prefix = settings.MEDIA_ACCEL_REDIRECT_PREFIX
+    if accel_prefix:
+        # 交給 nginx internal location 傳檔（sendfile / Range / Last-Modified）
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = quote(f"{accel_prefix.rstrip('/')}/{file_name}")
+    else:
+        if not field_file.storage.exists(file_name):
+            raise Http404
+        response = FileResponse(field_file.storage.open(file_name, "rb"), content_type=content_type)
+    response["Content-Disposition"] = content_disposition_header(False, download_name)
+    response["Cache-Control"] = f"private, max-age={settings.MEDIA_DOCUMENT_MAX_AGE}"
+    return response
+
+
+@login_required
+def serve_worker_document(request, document_id, filename):
+    document = _document_for_request(request, document_id)
+    if document is None:
+        return HttpResponseForbidden("權限不足")
+    # 網址中的檔名只用來讓下載的檔名與快取鍵一致，不符時導向正確的網址
+    if filename != document.filename():
+        return redirect(document.get_absolute_url())
+    return _serve_document_file(document.file, document.filename())
+
+
+@login_required
+def serve_worker_document_preview(request, document_id, filename):
+    document = _document_for_request(request, document_id)
+    if document is None:
+        return HttpResponseForbidden("權限不足")
+    if not document.has_preview():
+        raise Http404
+    if filename != os.path.basename(document.preview.name):
+        return redirect(document.get_preview_url())
+    return _serve_document_file(document.preview, os.path.basename(document.preview.name))
+
+
 @login_required
 @user_passes_test(is_store_manager)
 @require_POST
@@ -665,6 +1086,20 @@ def reset_worker_password(request, profile_id):
 def _document_if_exists(doc):
     if not doc or not doc.file:
         return None
-    if not default_storage.exists(doc.file.name):
-        return None
+    if doc.file_size is None:
+        # 舊資料沒有檔案大小，向 storage 確認一次後回填
+        if not doc.file.storage.exists(doc.file.name):
+            return None
+        doc.file_size = doc.file.storage.size(doc.file.name)
+        doc.save(update_fields=["file_size"])
     return doc
+
+
+def _load_documents(profile):
+    first_by_category = {}
+    for doc in profile.documents.order_by("id"):
+        first_by_category.setdefault(doc.category, doc)
+    return {
+        category: _document_if_exists(first_by_category.get(category))
+        for category in DOCUMENT_CATEGORIES
+    }